@@ -0,0 +1,179 @@
+"""End-to-end benchmark: full update runs against local RPC, Pinata and 0G storage stand-ins.
+
+Each run starts a stub JSON-RPC node (benchmarks/stub_node.py) with a synthetic
+supply, a fake Pinata API (benchmarks/stub_pinata.py) and points the 0G chain
+at benchmarks/fake_zg_storage, then updates the chain in a fresh child process
+so peak RSS is measured per run. A second, warm run over the same state shows
+the cost of the unchanged-token path. Nothing leaves the machine.
+
+Run from the repository root:
+
+    python benchmarks/bench_e2e.py --supplies 100,1000,10000 --chains monad
+    python benchmarks/bench_e2e.py --supplies 100 --chains 0g-storage --zg-latency 0.2 --json results.json
+    python benchmarks/bench_e2e.py --supplies 100 --chains 0g-storage --zg-setup 1 --zg-helper
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+# Well-known development key; the stub node accepts any signature.
+BENCH_PRIVATE_KEY = "0x" + "42" * 32
+BENCH_CONTRACT = "0x" + "11" * 20
+
+
+def child_run(chain_name, result_path):
+    """Runs one cold and one warm update of ``chain_name`` in this process and writes the measurements."""
+    from nft_updater.chains import CHAINS
+    from nft_updater.engine import SharedResources, update_chain
+
+    chain = CHAINS[chain_name]
+    runs = []
+    for label in ("cold", "warm"):
+        resources = SharedResources(BENCH_PRIVATE_KEY)
+        started = time.perf_counter()
+        try:
+            committed = update_chain(chain, resources)
+        finally:
+            resources.close()
+        runs.append({
+            "run": label,
+            "seconds": time.perf_counter() - started,
+            "committed": committed,
+            "stages": resources.timings.get(chain.name, {}),
+        })
+
+    usage_self = resource.getrusage(resource.RUSAGE_SELF)
+    usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    with open(result_path, "w") as f:
+        json.dump({
+            "runs": runs,
+            # ru_maxrss is in KiB on Linux; for children it is the largest single child.
+            "peak_rss_mib": usage_self.ru_maxrss / 1024,
+            "peak_child_rss_mib": usage_children.ru_maxrss / 1024,
+            "cpu_seconds": usage_self.ru_utime + usage_self.ru_stime,
+        }, f)
+
+
+def bench(chain_name, supply, args):
+    """Starts the stand-ins, runs a child update for ``supply`` tokens and returns its measurements."""
+    import stub_node
+    import stub_pinata
+
+    node, chain_state = stub_node.serve(supply)
+    pinata, pinata_stats = stub_pinata.serve(args.pinata_latency, args.pinata_fail_every)
+    rpc_url = f"http://127.0.0.1:{node.server_port}"
+    try:
+        with tempfile.TemporaryDirectory(prefix="nft-bench-") as workdir:
+            env = dict(os.environ)
+            env.update({
+                "PRIVATE_KEY": BENCH_PRIVATE_KEY,
+                "CONTRACT_ADDRESS": BENCH_CONTRACT,
+                "ZG_CONTRACT_ADDRESS": BENCH_CONTRACT,
+                "MONAD_CONTRACT_ADDRESS": BENCH_CONTRACT,
+                "ZG_RPC_URL": rpc_url,
+                "MONAD_RPC_URL": rpc_url,
+                "ZG_INDEXER_URL": "http://127.0.0.1:1",
+                "ZG_CLI_EXECUTABLE": os.path.join(BENCH_DIR, "fake_zg_storage"),
+                "FAKE_ZG_LATENCY": str(args.zg_latency),
+                "FAKE_ZG_SETUP": str(args.zg_setup),
+                # The fake CLI doubles as the resident upload helper.
+                "ZG_UPLOAD_HELPER": os.path.join(BENCH_DIR, "fake_zg_storage") if args.zg_helper else "",
+                "PINATA_API_KEY": "bench",
+                "PINATA_API_SECRET": "bench",
+                "PINATA_BASE_URL": f"http://127.0.0.1:{pinata.server_port}/",
+                "PINATA_BACKOFF_BASE": "0",
+                "STATE_DB_PATH": os.path.join(workdir, "state.sqlite3"),
+                "DETERMINISTIC_RENDER": "1",
+                "EXPORT_ARTIFACTS_DIR": "",
+            })
+            result_path = os.path.join(workdir, "result.json")
+            log_path = os.path.join(workdir, "run.log")
+            with open(log_path, "w") as log:
+                completed = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--child", chain_name, "--result", result_path],
+                    cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+                )
+            if completed.returncode != 0 or not os.path.exists(result_path):
+                with open(log_path) as log:
+                    tail = log.read()[-2000:]
+                raise RuntimeError(f"benchmark run failed (exit {completed.returncode}):\n{tail}")
+            with open(result_path) as f:
+                result = json.load(f)
+            if args.keep_logs:
+                kept = os.path.join(args.keep_logs, f"{chain_name}-{supply}.log")
+                os.makedirs(args.keep_logs, exist_ok=True)
+                os.replace(log_path, kept)
+    finally:
+        node.shutdown()
+        pinata.shutdown()
+
+    result.update({
+        "chain": chain_name,
+        "supply": supply,
+        "rpc_requests": chain_state.requests,
+        "transactions": len(chain_state.sent),
+        "pinata_uploads": pinata_stats["uploads"],
+        "pinata_rejected": pinata_stats["rejected"],
+    })
+    return result
+
+
+def report(result):
+    cold, warm = result["runs"]
+    rate = cold["committed"] / cold["seconds"] if cold["seconds"] else 0.0
+    print(f"\n{result['chain']} x {result['supply']} tokens")
+    print(f"  cold: {cold['seconds']:8.2f}s  {rate:8.1f} tokens/s  ({cold['committed']} committed)")
+    print(f"  warm: {warm['seconds']:8.2f}s  ({warm['committed']} committed)")
+    # Busy time is summed over each stage's concurrent workers, so it can exceed the wall time.
+    for name, seconds in cold["stages"].items():
+        print(f"    {name:<16} {seconds:8.2f}s")
+    print(f"  peak RSS: {result['peak_rss_mib']:.1f} MiB (largest child {result['peak_child_rss_mib']:.1f} MiB), "
+          f"CPU {result['cpu_seconds']:.1f}s")
+    print(f"  RPC requests: {result['rpc_requests']}, transactions: {result['transactions']}, "
+          f"Pinata uploads: {result['pinata_uploads']} ({result['pinata_rejected']} rejected)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--supplies", default="100,1000,10000", help="comma-separated synthetic total supplies")
+    parser.add_argument("--chains", default="monad", help="comma-separated chains from nft_updater/chains.py")
+    parser.add_argument("--pinata-latency", type=float, default=0.05, help="seconds the fake Pinata API waits per upload")
+    parser.add_argument("--pinata-fail-every", type=int, default=0, help="reject every Nth Pinata upload with HTTP 429")
+    parser.add_argument("--zg-latency", type=float, default=0.5, help="seconds the fake zg_storage CLI takes per upload")
+    parser.add_argument("--zg-setup", type=float, default=0.0,
+                        help="seconds every fake zg_storage process spends connecting before its first upload")
+    parser.add_argument("--zg-helper", action="store_true",
+                        help="upload through resident helper processes instead of one CLI process per file")
+    parser.add_argument("--json", help="also write all results to this file")
+    parser.add_argument("--keep-logs", metavar="DIR", help="keep each run's output in DIR")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child_run(args.child, args.result)
+        return
+
+    results = []
+    for chain_name in [name.strip() for name in args.chains.split(",") if name.strip()]:
+        for supply in [int(value) for value in args.supplies.split(",") if value.strip()]:
+            result = bench(chain_name, supply, args)
+            report(result)
+            results.append(result)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
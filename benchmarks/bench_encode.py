@@ -0,0 +1,64 @@
+"""Micro-benchmark: encode time vs. bytes per token for every image encoding.
+
+Renders a sample of tokens in both styles once, then encodes them with each
+encoder from nft_updater/image_encoding.py. Reports milliseconds and bytes per
+token, the worst per-channel pixel error (0 means lossless) and the estimated
+upload time per token at the given bandwidth, so each backend can pick its
+trade-off.
+
+Run from the repository root:
+
+    python benchmarks/bench_encode.py --count 50 --mbps 20
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageChops
+
+from nft_updater.image_encoding import ENCODINGS, encode_image
+from nft_updater.render_engine import STYLE_CLASSIC, STYLE_GRADIENT, RenderEngine
+
+OWNER = "0x" + "ab" * 20
+STYLES = {STYLE_CLASSIC: "0G Wallet Status", STYLE_GRADIENT: "MONAD STATUS"}
+
+
+def max_pixel_error(original, data):
+    decoded = Image.open(io.BytesIO(data)).convert("RGB")
+    return max(high for _, high in ImageChops.difference(original, decoded).getextrema())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=30, help="tokens to encode per style and encoding")
+    parser.add_argument("--mbps", type=float, default=20.0, help="upload bandwidth for the estimated upload time")
+    parser.add_argument("--encodings", default=",".join(ENCODINGS), help="comma-separated encodings to compare")
+    args = parser.parse_args()
+
+    for style, title in STYLES.items():
+        engine = RenderEngine(style, title, deterministic=True, workers=1)
+        images = [
+            engine.render(token_id, {"tx_count": token_id * 7, "first_active_at": 1_700_000_000 + token_id * 86400}, OWNER)
+            for token_id in range(1, args.count + 1)
+        ]
+        print(f"\n{style} style, {args.count} tokens")
+        print(f"{'encoding':<16} {'ms/token':>9} {'bytes/token':>12} {'vs png':>7} {'max err':>8} {'upload ms':>10}")
+        baseline = None
+        for encoding in [name.strip() for name in args.encodings.split(",") if name.strip()]:
+            started = time.perf_counter()
+            encoded = [encode_image(img, encoding) for img in images]
+            elapsed = time.perf_counter() - started
+            size = sum(len(data) for data in encoded) / len(encoded)
+            baseline = baseline or (size if encoding == "png" else None)
+            ratio = f"{size / baseline:6.0%}" if baseline else "     -"
+            error = max(max_pixel_error(img, data) for img, data in zip(images[:5], encoded[:5]))
+            upload_ms = size * 8 / (args.mbps * 1_000_000) * 1000
+            print(f"{encoding:<16} {elapsed / len(images) * 1000:9.1f} {size:12.0f} {ratio:>7} {error:8d} {upload_ms:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Refresh tier benchmark: the cost of a day of scheduled runs when few wallets are active.
+
+Publishes every token of a stub chain (benchmarks/stub_node.py) to fake
+Pinata, then simulates ``--runs`` hourly runs: before each, the same
+``--active`` fraction of wallets sends a transaction, and the state database
+is aged by an hour so the tier intervals elapse as they would between
+scheduled jobs. Every run is a fresh process. The RPC requests, uploads,
+transactions and wall time of those runs are summed with refresh tiers off
+and on, each against its own chain and state. A final run in which every
+wallet changed shows ``REFRESH_MAX_TOKENS`` bounding the work, with the
+per-tier staleness taken from the run report.
+
+Run from the repository root:
+
+    python benchmarks/bench_refresh_tiers.py --supply 1000 --active 0.05 --runs 24
+"""
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+# Well-known development key; the stub node accepts any signature.
+BENCH_PRIVATE_KEY = "0x" + "42" * 32
+BENCH_CONTRACT = "0x" + "11" * 20
+BENCH_TIERS = "hot:2:0,warm:0.5:6,cold:0.05:24,dormant:0:168"
+
+
+def run_update(env):
+    """Runs ``update_all_nfts.py`` once in a fresh process. Returns its wall time in seconds."""
+    command = [sys.executable, "update_all_nfts.py", "--chains", "monad"]
+    started = time.perf_counter()
+    completed = subprocess.run(command, cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    seconds = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(f"update_all_nfts.py failed (exit {completed.returncode}):\n{completed.stdout[-2000:]}{completed.stderr[-2000:]}")
+    return seconds
+
+
+def age_state(path, seconds):
+    """Moves every timestamp in the state database ``seconds`` into the past, as if that much time had passed."""
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("UPDATE tokens SET updated_at = updated_at - ?", (seconds,))
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'token_activity'").fetchone():
+            conn.execute(
+                "UPDATE token_activity SET scored_at = scored_at - ?, checked_at = checked_at - ?", (seconds, seconds)
+            )
+    conn.close()
+
+
+def simulate(args, workdir, label, tiers, pinata_url, pinata_stats):
+    """Publishes every token on a new chain, then sums the cost of the hourly runs. Returns the totals and the env."""
+    import stub_node
+
+    node, chain = stub_node.serve(args.supply)
+    env = dict(os.environ)
+    env.update({
+        "PRIVATE_KEY": BENCH_PRIVATE_KEY,
+        "MONAD_CONTRACT_ADDRESS": BENCH_CONTRACT,
+        "MONAD_RPC_URL": f"http://127.0.0.1:{node.server_port}",
+        "PINATA_API_KEY": "bench",
+        "PINATA_API_SECRET": "bench",
+        "PINATA_BASE_URL": pinata_url,
+        "STATE_DB_PATH": os.path.join(workdir, f"state-{label.replace(' ', '-')}.sqlite3"),
+        "TELEMETRY_JSON": os.path.join(workdir, "report.json"),
+        "TELEMETRY_PROM": "",
+        "DETERMINISTIC_RENDER": "1",
+        "EXPORT_ARTIFACTS_DIR": "",
+        "WALLET_AGE": "0",
+        "REFRESH_TIERS": tiers,
+    })
+    # The same wallets stay active run after run.
+    active = [chain.owner(token_id) for token_id in range(1, int(chain.wallets * args.active) + 1)]
+    run_update(env)
+
+    requests, uploads, sent = chain.requests, pinata_stats["uploads"], len(chain.sent)
+    seconds = 0.0
+    for _ in range(args.runs):
+        age_state(env["STATE_DB_PATH"], 3600)
+        chain.transact(*active)
+        seconds += run_update(env)
+    figures = {
+        "seconds": seconds,
+        "requests": chain.requests - requests,
+        "uploads": pinata_stats["uploads"] - uploads,
+        "transactions": len(chain.sent) - sent,
+    }
+    return figures, env, node, chain
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--supply", type=int, default=1000, help="synthetic total supply")
+    parser.add_argument("--active", type=float, default=0.05, help="fraction of wallets that transact before every run")
+    parser.add_argument("--runs", type=int, default=24, help="hourly runs after the first full publish")
+    parser.add_argument("--budget", type=int, default=100, help="REFRESH_MAX_TOKENS of the final run")
+    args = parser.parse_args()
+
+    import stub_pinata
+
+    pinata, pinata_stats = stub_pinata.serve(0.0, 0)
+    pinata_url = f"http://127.0.0.1:{pinata.server_port}/"
+    nodes = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="nft-bench-") as workdir:
+            print(f"{args.supply} tokens, {args.active:.0%} of wallets active before each of {args.runs} hourly runs\n")
+            for label, tiers in (("tiers off", "off"), ("tiers on", BENCH_TIERS)):
+                figures, env, node, chain = simulate(args, workdir, label, tiers, pinata_url, pinata_stats)
+                nodes.append(node)
+                print(f"{label:<10} {figures['seconds']:6.2f}s  {figures['requests']:5d} RPC requests  "
+                      f"{figures['uploads']:5d} uploads  {figures['transactions']} transactions")
+
+            # Every wallet changed, but the run may only render a budget's worth, hottest first.
+            age_state(env["STATE_DB_PATH"], 6 * 3600)
+            chain.transact(*{chain.owner(token_id) for token_id in range(1, chain.wallets + 1)})
+            env["REFRESH_MAX_TOKENS"] = str(args.budget)
+            sent = len(chain.sent)
+            seconds = run_update(env)
+            print(f"\nevery wallet changed, REFRESH_MAX_TOKENS={args.budget}: {seconds:.2f}s, "
+                  f"{len(chain.sent) - sent} transactions")
+            with open(env["TELEMETRY_JSON"]) as f:
+                gauges = json.load(f)["gauges"]
+            tiers = {}
+            for gauge in gauges:
+                if gauge["name"].startswith("refresh_tier_"):
+                    tiers.setdefault(gauge["labels"]["tier"], {})[gauge["name"][len("refresh_tier_"):]] = gauge["value"]
+            for name in (tier.split(":")[0] for tier in BENCH_TIERS.split(",")):
+                values = tiers[name]
+                print(f"  {name:<8} {values['tokens']:5d} tokens  {values['due_tokens']:5d} due  "
+                      f"{values['deferred_tokens']:5d} deferred  max staleness {values['max_staleness_seconds']}s")
+    finally:
+        pinata.shutdown()
+        for node in nodes:
+            node.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Micro-benchmark: images per second for the old per-token renderer vs. the render engine.
+
+Run from the repository root:
+
+    python benchmarks/bench_render.py --count 200 --workers 4
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageFont
+
+from nft_updater.render_engine import GRADIENT_FONT_PATH, STYLE_GRADIENT, RenderEngine
+
+OWNER = "0x" + "ab" * 20
+
+
+def legacy_generate_png(token_id, stats, encode=True):
+    """The gradient renderer as it was before the engine: 800 line draws and font loads per token."""
+    width, height = 800, 800
+    img = Image.new('RGB', (width, height))
+    draw = ImageDraw.Draw(img)
+    start_color = (18, 18, 97)
+    end_color = (97, 18, 120)
+    for y in range(height):
+        ratio = y / height
+        r = int(start_color[0] * (1 - ratio) + end_color[0] * ratio)
+        g = int(start_color[1] * (1 - ratio) + end_color[1] * ratio)
+        b = int(start_color[2] * (1 - ratio) + end_color[2] * ratio)
+        draw.line([(0, y), (width, y)], fill=(r, g, b))
+    try:
+        title_font = ImageFont.truetype(GRADIENT_FONT_PATH, 70)
+        label_font = ImageFont.truetype(GRADIENT_FONT_PATH, 35)
+        value_font = ImageFont.truetype(GRADIENT_FONT_PATH, 90)
+        footer_font = ImageFont.truetype(GRADIENT_FONT_PATH, 20)
+    except IOError:
+        title_font = label_font = value_font = footer_font = ImageFont.load_default()
+    draw.text((width / 2, 100), "MONAD STATUS", font=title_font, fill=(255, 255, 255), anchor="ms")
+    draw.line([(100, 160), (width - 100, 160)], fill=(100, 100, 150), width=3)
+    draw.text((width / 2, 230), f"TOKEN ID #{token_id}", font=label_font, fill=(200, 200, 255), anchor="ms")
+    draw.text((width / 2, 400), "TRANSACTION COUNT", font=label_font, fill=(150, 160, 200), anchor="ms")
+    draw.text((width / 2, 500), str(stats['tx_count']), font=value_font, fill=(255, 255, 255), anchor="ms")
+    timestamp = f"Last Updated: {time.strftime('%Y-%m-%d %H:%M:%S UTC')}"
+    draw.text((width / 2, height - 50), timestamp, font=footer_font, fill=(120, 130, 170), anchor="ms")
+    if not encode:
+        return img
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def run(label, count, render):
+    started = time.perf_counter()
+    render(count)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {count / elapsed:8.1f} images/s  ({elapsed:.2f}s for {count})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100, help="images to render per variant")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="render processes for the pooled run")
+    args = parser.parse_args()
+
+    def legacy(count):
+        for token_id in range(1, count + 1):
+            legacy_generate_png(token_id, {"tx_count": token_id})
+
+    single = RenderEngine(STYLE_GRADIENT, "MONAD STATUS", workers=1)
+
+    def engine_single(count):
+        for token_id in range(1, count + 1):
+            single.render_encoded(token_id, {"tx_count": token_id}, OWNER)
+
+    pooled = RenderEngine(STYLE_GRADIENT, "MONAD STATUS", workers=args.workers)
+    # Warm the pool up so process start-up is not counted against throughput.
+    pooled.render_encoded(0, {"tx_count": 0}, OWNER)
+
+    def engine_pooled(count):
+        # The scripts call render_encoded from their upload worker threads; mirror that here.
+        with ThreadPoolExecutor(max_workers=args.workers) as threads:
+            list(threads.map(lambda token_id: pooled.render_encoded(token_id, {"tx_count": token_id}, OWNER),
+                             range(1, count + 1)))
+
+    def legacy_draw_only(count):
+        for token_id in range(1, count + 1):
+            legacy_generate_png(token_id, {"tx_count": token_id}, encode=False)
+
+    def engine_draw_only(count):
+        for token_id in range(1, count + 1):
+            single.render(token_id, {"tx_count": token_id}, OWNER)
+
+    # Drawing alone, without PNG encoding, shows what the cached template saves.
+    run("legacy, draw only", args.count, legacy_draw_only)
+    run("engine, draw only", args.count, engine_draw_only)
+    run("legacy generate_image", args.count, legacy)
+    run("engine, 1 process", args.count, engine_single)
+    run(f"engine, {args.workers} processes", args.count, engine_pooled)
+    pooled.close()
+
+
+if __name__ == "__main__":
+    main()
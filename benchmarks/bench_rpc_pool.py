@@ -0,0 +1,101 @@
+"""RPC endpoint pool benchmark: bulk reads over fast, slow, failing and lagging stub nodes.
+
+Starts several stub JSON-RPC nodes (benchmarks/stub_node.py) serving the same
+chain, each with injected latency, HTTP 503 failures or a lagging head, then
+times the owner and nonce reads of a full update through a single endpoint
+and through a pool of all of them. It prints where the pool sent its requests
+and checks that a requests-per-second budget is respected. Nothing leaves the
+machine.
+
+Run from the repository root:
+
+    python benchmarks/bench_rpc_pool.py --supply 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+BENCH_CONTRACT = "0x" + "11" * 20
+
+
+def read_all(spec, supply, batch_size):
+    """Reads every owner and nonce through the endpoints in ``spec``. Returns ``(seconds, owners read)``."""
+    from nft_updater.lean_rpc import LeanContract, LeanWeb3
+    from nft_updater.rpc_batch import read_owners_and_tx_counts
+
+    w3 = LeanWeb3(spec)
+    w3.is_connected()
+    contract = LeanContract(w3, BENCH_CONTRACT)
+    started = time.perf_counter()
+    _, owners, _ = read_owners_and_tx_counts(w3, contract, range(1, supply + 1), batch_size)
+    return time.perf_counter() - started, len(owners)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--supply", type=int, default=1000, help="synthetic total supply")
+    parser.add_argument("--batch-size", type=int, default=100, help="calls per JSON-RPC batch")
+    parser.add_argument("--slow-latency", type=float, default=0.25, help="seconds the slow node waits per request")
+    parser.add_argument("--fail-every", type=int, default=3, help="the failing node answers 503 to every Nth request")
+    parser.add_argument("--rps", type=float, default=2000, help="budget of the rate-limited run, in calls per second")
+    args = parser.parse_args()
+
+    import stub_node
+
+    fast, chain = stub_node.serve(args.supply, latency=0.01)
+    nodes = {
+        "fast": fast,
+        "slow": stub_node.serve(args.supply, chain=chain, latency=args.slow_latency)[0],
+        "failing": stub_node.serve(args.supply, chain=chain, latency=0.01, fail_every=args.fail_every)[0],
+        "lagging": stub_node.serve(args.supply, chain=chain, latency=0.01, lag=1000)[0],
+    }
+    urls = {name: f"http://127.0.0.1:{server.server_port}" for name, server in nodes.items()}
+    # Stub nodes all listen on 127.0.0.1, so the pool tells them apart by position.
+    labels = {name: f"127.0.0.1#{index}" for index, name in enumerate(nodes)}
+
+    def requests_by_node(before):
+        return ", ".join(f"{name} {server.stats['requests'] - before[name]}" for name, server in nodes.items())
+
+    def snapshot():
+        return {name: server.stats["requests"] for name, server in nodes.items()}
+
+    try:
+        print(f"Reading {args.supply} owners and nonces in batches of {args.batch_size}\n")
+        for name in ("slow", "failing"):
+            before = snapshot()
+            try:
+                seconds, read = read_all(urls[name], args.supply, args.batch_size)
+                print(f"{name + ' endpoint only':<26} {seconds:7.2f}s  {read} owners read  ({requests_by_node(before)})")
+            except Exception as e:
+                print(f"{name + ' endpoint only':<26} failed: {e}")
+
+        spec = ",".join(urls[name] for name in nodes)
+        before = snapshot()
+        seconds, read = read_all(spec, args.supply, args.batch_size)
+        print(f"{'pool of all four':<26} {seconds:7.2f}s  {read} owners read  ({requests_by_node(before)})")
+
+        from nft_updater.rpc_pool import pool_for
+
+        for label, stats in pool_for(spec).stats().items():
+            name = next(name for name, node_label in labels.items() if node_label == label)
+            print(f"  {name:<8} latency {stats['latency_seconds'] * 1000:7.1f}ms  error rate {stats['error_rate']:.2f}  "
+                  f"lagging {stats['lagging']}")
+
+        budget_spec = f"{urls['fast']}|{args.rps:g}"
+        seconds, read = read_all(budget_spec, args.supply, args.batch_size)
+        # Each token costs one ownerOf call; nonces are read once per distinct owner.
+        calls = args.supply + max(1, args.supply // 3)
+        print(f"\n{'budget ' + format(args.rps, 'g') + ' calls/s':<26} {seconds:7.2f}s  "
+              f"{calls / seconds:7.0f} calls/s achieved ({read} owners read)")
+    finally:
+        for server in nodes.values():
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Startup benchmark: import time and the wall time of a run where nothing changed.
+
+Scheduled runs usually find few or no changed tokens, so their cost is
+dominated by interpreter start-up, imports and the first RPC round-trips
+rather than by rendering. This measures, each in fresh processes:
+
+- ``import nft_updater.engine`` (the median of ``--repeat`` runs), and
+- ``update_all_nfts.py --chains monad`` against a stub node and fake Pinata
+  after one populating run, so every token is already up to date.
+
+Run from the repository root:
+
+    python benchmarks/bench_startup.py --supply 100 --repeat 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+# Well-known development key; the stub node accepts any signature.
+BENCH_PRIVATE_KEY = "0x" + "42" * 32
+BENCH_CONTRACT = "0x" + "11" * 20
+
+
+def timed_run(command, env):
+    """Runs ``command`` in a fresh process and returns its wall time in seconds."""
+    started = time.perf_counter()
+    completed = subprocess.run(command, cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    seconds = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} failed (exit {completed.returncode}):\n{completed.stdout[-2000:]}{completed.stderr[-2000:]}")
+    return seconds
+
+
+def imported_modules(env):
+    """Returns the heavy third-party packages a fresh ``import nft_updater.engine`` loads."""
+    probe = (
+        "import sys, nft_updater.engine; "
+        "print(' '.join(name for name in ('web3', 'eth_account', 'PIL', 'eth_abi') if name in sys.modules))"
+    )
+    completed = subprocess.run([sys.executable, "-c", probe], cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    return completed.stdout.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--supply", type=int, default=100, help="synthetic total supply of the stub chain")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh processes per measurement")
+    args = parser.parse_args()
+
+    import stub_node
+    import stub_pinata
+
+    node, chain_state = stub_node.serve(args.supply)
+    pinata, _ = stub_pinata.serve(0.0, 0)
+    rpc_url = f"http://127.0.0.1:{node.server_port}"
+    try:
+        with tempfile.TemporaryDirectory(prefix="nft-bench-") as workdir:
+            env = dict(os.environ)
+            env.update({
+                "PRIVATE_KEY": BENCH_PRIVATE_KEY,
+                "MONAD_CONTRACT_ADDRESS": BENCH_CONTRACT,
+                "MONAD_RPC_URL": rpc_url,
+                "PINATA_API_KEY": "bench",
+                "PINATA_API_SECRET": "bench",
+                "PINATA_BASE_URL": f"http://127.0.0.1:{pinata.server_port}/",
+                "STATE_DB_PATH": os.path.join(workdir, "state.sqlite3"),
+                "DETERMINISTIC_RENDER": "1",
+                "EXPORT_ARTIFACTS_DIR": "",
+            })
+
+            import_times = [
+                timed_run([sys.executable, "-c", "import nft_updater.engine"], env) for _ in range(args.repeat)
+            ]
+            print(f"import nft_updater.engine: median {statistics.median(import_times):.3f}s "
+                  f"(min {min(import_times):.3f}s over {args.repeat} runs)")
+            print(f"  heavy packages loaded at import: {', '.join(imported_modules(env)) or 'none'}")
+
+            command = [sys.executable, "update_all_nfts.py", "--chains", "monad"]
+            populate = timed_run(command, env)
+            print(f"populating run ({args.supply} tokens): {populate:.2f}s, {len(chain_state.sent)} transactions")
+
+            sent = len(chain_state.sent)
+            requests_before = chain_state.requests
+            run_times = [timed_run(command, env) for _ in range(args.repeat)]
+            print(f"no-change run: median {statistics.median(run_times):.3f}s "
+                  f"(min {min(run_times):.3f}s over {args.repeat} runs)")
+            print(f"  RPC requests per run: {(chain_state.requests - requests_before) / args.repeat:.0f}, "
+                  f"transactions sent: {len(chain_state.sent) - sent}")
+    finally:
+        node.shutdown()
+        pinata.shutdown()
+
+
+if __name__ == "__main__":
+    main()
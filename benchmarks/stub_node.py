@@ -0,0 +1,315 @@
+"""In-process JSON-RPC node for offline benchmarks.
+
+Serves just enough of the Ethereum JSON-RPC API for the update scripts:
+``totalSupply``/``ownerOf`` calls, Transfer logs, historical nonces, blocks,
+gas estimates and transaction submission with instant receipts. Batch updates
+for either contract variant are decoded and served back through ``tokenURI``
+and ``tokenDigests``. Batched requests are supported. The chain state is synthetic and deterministic:
+``supply`` tokens spread over ``supply // 3`` wallets, one mint per block.
+``StubChain.transact`` and ``StubChain.mint`` add new blocks with wallet
+activity or a mint, for exercising the follower. Several servers can share one
+chain, each with its own injected latency, failure rate (HTTP 503 on every
+``fail_every``-th request) and head lag, to exercise the RPC endpoint pool.
+"""
+import bisect
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import rlp
+from eth_abi import decode as abi_decode
+from eth_abi import encode as abi_encode
+from eth_account import Account
+from eth_utils import keccak
+
+TOTAL_SUPPLY_SELECTOR = "0x18160ddd"
+OWNER_OF_SELECTOR = "0x6352211e"
+TOKEN_URI_SELECTOR = "0xc87b56dd"
+TOKEN_DIGESTS_SELECTOR = "0x03237124"
+BATCH_SET_ROOT_HASHES_SELECTOR = "0eb6983a"
+BATCH_SET_DIGESTS_SELECTOR = "2652f5ff"
+GATEWAY_URL = "ipfs://"
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+GENESIS_TIMESTAMP = 1_700_000_000
+BLOCK_TIME = 2
+BLOCK_GAS_LIMIT = 30_000_000
+# Largest eth_getLogs block range the node accepts, like most public endpoints.
+MAX_LOG_RANGE = 10_000
+ZERO_HASH = "0x" + "00" * 32
+
+
+def _word(value):
+    return "0x" + format(value, "064x")
+
+
+class StubChain:
+    """Deterministic chain state: who owns what, wallet nonces and sent transactions."""
+
+    def __init__(self, supply, head_block=None):
+        self.supply = supply
+        self.wallets = max(1, supply // 3)
+        # Token t is minted in block t * 10, so the head sits just past the last mint.
+        self.head_block = head_block or supply * 10 + 100
+        self.mint_blocks = [token_id * 10 for token_id in range(1, supply + 1)]
+        self.lock = threading.Lock()
+        # Sent transactions in order as (hash, sender, gas used).
+        self.sent = []
+        self.receipts = {}
+        self.requests = 0
+        # token_id -> stored root hash (string contract) or (digest, format) (compact contract).
+        self.root_hashes = {}
+        self.digests = {}
+        # Blocks added after start-up: block number -> senders of its transactions.
+        self.activity = {}
+
+    def owner(self, token_id):
+        return "0x" + format(0x1000 + token_id % self.wallets, "040x")
+
+    def first_block(self, address):
+        # Each wallet sends its first transaction a few blocks before its first mint.
+        return max(1, (int(address, 16) - 0x1000 or self.wallets) * 10 - 5)
+
+    def transact(self, *addresses):
+        """Mines a block with one transaction from each of ``addresses``. Returns its number."""
+        with self.lock:
+            self.head_block += 1
+            self.activity[self.head_block] = [address.lower() for address in addresses]
+            return self.head_block
+
+    def mint(self):
+        """Mines a block minting the next token. Returns the token ID."""
+        with self.lock:
+            self.head_block += 1
+            self.supply += 1
+            self.mint_blocks.append(self.head_block)
+            self.activity[self.head_block] = []
+            return self.supply
+
+    def nonce(self, address, block):
+        address = address.lower()
+        with self.lock:
+            sent = sum(1 for _, sender, _ in self.sent if sender == address)
+            sent += sum(
+                senders.count(address) for number, senders in self.activity.items() if number <= block
+            )
+        index = int(address, 16) - 0x1000
+        if not 0 <= index < self.wallets:
+            return sent
+        if block < self.first_block(address):
+            return 0
+        return 1 + index % 50 + sent
+
+    def block_number(self, tag):
+        if tag in ("latest", "pending", "safe", "finalized", None):
+            return self.head_block
+        if tag == "earliest":
+            return 0
+        return int(tag, 16)
+
+    def block(self, number, full=False):
+        transactions = [
+            {"hash": _word(number * 1000 + index), "from": sender, "to": "0x" + "22" * 20, "blockNumber": hex(number)}
+            for index, sender in enumerate(self.activity.get(number, []))
+        ]
+        return {
+            "number": hex(number),
+            "hash": _word(number),
+            "parentHash": _word(max(0, number - 1)),
+            "timestamp": hex(GENESIS_TIMESTAMP + number * BLOCK_TIME),
+            "gasLimit": hex(BLOCK_GAS_LIMIT),
+            "gasUsed": "0x0",
+            "baseFeePerGas": "0x1",
+            "miner": "0x" + "00" * 20,
+            "transactions": transactions if full else [transaction["hash"] for transaction in transactions],
+        }
+
+    def logs(self, from_block, to_block):
+        start = bisect.bisect_left(self.mint_blocks, from_block)
+        end = bisect.bisect_right(self.mint_blocks, to_block)
+        return [
+            {
+                "address": "0x" + "11" * 20,
+                "topics": [TRANSFER_TOPIC, ZERO_HASH, "0x" + self.owner(token_id)[2:].rjust(64, "0"), _word(token_id)],
+                "data": "0x",
+                "blockNumber": hex(self.mint_blocks[token_id - 1]),
+                "blockHash": _word(self.mint_blocks[token_id - 1]),
+                "transactionHash": _word(token_id),
+                "transactionIndex": "0x0",
+                "logIndex": "0x0",
+                "removed": False,
+            }
+            for token_id in range(start + 1, end + 1)
+        ]
+
+    def apply(self, raw_tx):
+        """Stores the references set by a legacy batch-update transaction."""
+        data = rlp.decode(bytes.fromhex(raw_tx[2:]))[5].hex()
+        selector, arguments = data[:8], bytes.fromhex(data[8:])
+        with self.lock:
+            if selector == BATCH_SET_ROOT_HASHES_SELECTOR:
+                token_ids, root_hashes = abi_decode(["uint256[]", "string[]"], arguments)
+                self.root_hashes.update(zip(token_ids, root_hashes))
+            elif selector == BATCH_SET_DIGESTS_SELECTOR:
+                token_ids, digests, formats = abi_decode(["uint256[]", "bytes32[]", "bytes"], arguments)
+                self.digests.update(zip(token_ids, zip(digests, formats)))
+
+    def token_uri(self, token_id):
+        with self.lock:
+            root_hash = self.root_hashes.get(token_id)
+        return "0x" + abi_encode(["string"], [GATEWAY_URL + root_hash if root_hash else ""]).hex()
+
+    def token_digests(self, token_ids):
+        with self.lock:
+            stored = [self.digests.get(token_id, (b"\x00" * 32, 0)) for token_id in token_ids]
+        digests = [digest for digest, _ in stored]
+        formats = bytes(fmt for _, fmt in stored)
+        return "0x" + abi_encode(["bytes32[]", "bytes"], [digests, formats]).hex()
+
+    def receipt(self, tx_hash):
+        with self.lock:
+            if tx_hash.lower() not in self.receipts:
+                return None
+            sender, gas_used = self.receipts[tx_hash.lower()]
+        return {
+            "transactionHash": tx_hash,
+            "transactionIndex": "0x0",
+            "blockNumber": hex(self.head_block + 1),
+            "blockHash": _word(self.head_block + 1),
+            "from": sender,
+            "to": "0x" + "11" * 20,
+            "status": "0x1",
+            "gasUsed": hex(gas_used),
+            "cumulativeGasUsed": hex(gas_used),
+            "effectiveGasPrice": "0x1",
+            "contractAddress": None,
+            "logs": [],
+            "logsBloom": "0x" + "00" * 256,
+            "type": "0x0",
+        }
+
+    def call(self, method, params):
+        """Returns ``(result, error)`` for one JSON-RPC call."""
+        with self.lock:
+            self.requests += 1
+        if method == "eth_chainId":
+            return "0x1", None
+        if method == "net_version":
+            return "1", None
+        if method == "web3_clientVersion":
+            return "stub-node/1.0", None
+        if method == "eth_blockNumber":
+            return hex(self.head_block), None
+        if method == "eth_gasPrice":
+            return hex(10**9), None
+        if method == "eth_maxPriorityFeePerGas":
+            return hex(10**9), None
+        if method == "eth_getBlockByNumber":
+            return self.block(self.block_number(params[0]), len(params) > 1 and params[1]), None
+        if method == "eth_getTransactionCount":
+            tag = params[1] if len(params) > 1 else "latest"
+            return hex(self.nonce(params[0], self.block_number(tag))), None
+        if method == "eth_getLogs":
+            log_filter = params[0]
+            from_block = self.block_number(log_filter.get("fromBlock", "latest"))
+            to_block = self.block_number(log_filter.get("toBlock", "latest"))
+            if to_block - from_block > MAX_LOG_RANGE:
+                return None, {"code": -32005, "message": f"block range too large, max {MAX_LOG_RANGE}"}
+            return self.logs(from_block, to_block), None
+        if method == "eth_call":
+            data = params[0].get("data") or params[0].get("input") or "0x"
+            if data.startswith(TOTAL_SUPPLY_SELECTOR):
+                return _word(self.supply), None
+            if data.startswith(OWNER_OF_SELECTOR):
+                token_id = int(data[10:], 16)
+                if not 1 <= token_id <= self.supply:
+                    return None, {"code": 3, "message": "execution reverted: invalid token ID"}
+                return "0x" + self.owner(token_id)[2:].rjust(64, "0"), None
+            if data.startswith(TOKEN_URI_SELECTOR):
+                return self.token_uri(int(data[10:], 16)), None
+            if data.startswith(TOKEN_DIGESTS_SELECTOR):
+                return self.token_digests(abi_decode(["uint256[]"], bytes.fromhex(data[10:]))[0]), None
+            return None, {"code": -32000, "message": "unknown selector"}
+        if method == "eth_estimateGas":
+            # Roughly what batchUpdate costs: base cost plus storage writes per calldata byte.
+            data = params[0].get("data") or params[0].get("input") or "0x"
+            return hex(21_000 + (len(data) - 2) // 2 * 300), None
+        if method == "eth_sendRawTransaction":
+            sender = Account.recover_transaction(params[0]).lower()
+            gas_used = 21_000 + (len(params[0]) - 2) // 2 * 250
+            tx_hash = "0x" + keccak(hexstr=params[0]).hex()
+            self.apply(params[0])
+            with self.lock:
+                self.sent.append((tx_hash, sender, gas_used))
+                self.receipts[tx_hash] = (sender, gas_used)
+            return tx_hash, None
+        if method == "eth_getTransactionReceipt":
+            return self.receipt(params[0]), None
+        return None, {"code": -32601, "message": f"method {method} not supported"}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    chain = None
+    latency = 0.0
+    fail_every = 0
+    lag = 0
+    # Shared per server: {"requests": n, "failed": n}.
+    stats = None
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, call):
+        if self.lag and call.get("method") == "eth_blockNumber":
+            return {"jsonrpc": "2.0", "id": call.get("id"), "result": hex(self.chain.head_block - self.lag)}
+        result, error = self.chain.call(call.get("method"), call.get("params") or [])
+        response = {"jsonrpc": "2.0", "id": call.get("id")}
+        if error is not None:
+            response["error"] = error
+        else:
+            response["result"] = result
+        return response
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.chain.lock:
+            self.stats["requests"] += 1
+            number = self.stats["requests"]
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_every and number % self.fail_every == 0:
+            with self.chain.lock:
+                self.stats["failed"] += 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if isinstance(body, list):
+            response = [self._reply(call) for call in body]
+        else:
+            response = self._reply(body)
+        data = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve(supply, host="127.0.0.1", port=0, chain=None, latency=0.0, fail_every=0, lag=0):
+    """Starts a node for ``supply`` tokens on a background thread. Returns ``(server, chain)``.
+
+    Pass ``chain`` to serve an existing StubChain from another endpoint. The
+    server's ``stats`` dict counts its requests and injected failures.
+    """
+    chain = chain or StubChain(supply)
+    stats = {"requests": 0, "failed": 0}
+    handler = type("StubNodeHandler", (_Handler,), {
+        "chain": chain, "latency": latency, "fail_every": fail_every, "lag": lag, "stats": stats,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.stats = stats
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, chain
@@ -0,0 +1,70 @@
+"""Fake Pinata ``pinning/pinFileToIPFS`` server for offline benchmarks.
+
+Accepts multipart uploads, waits ``latency`` seconds to mimic the network and
+answers with a content-derived ``IpfsHash``. Every ``fail_every``-th request is
+rejected with HTTP 429, to exercise the uploader's retry path.
+"""
+import hashlib
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+
+def _cid_v0(data):
+    """A CIDv0-shaped ("Qm...") base58 sha2-256 multihash of ``data``."""
+    number = int.from_bytes(b"\x12\x20" + hashlib.sha256(data).digest(), "big")
+    encoded = ""
+    while number:
+        number, remainder = divmod(number, 58)
+        encoded = _BASE58_ALPHABET[remainder] + encoded
+    return encoded
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    fail_every = 0
+    counter = None
+    stats = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        number = next(self.counter)
+        if self.latency:
+            time.sleep(self.latency)
+        if not self.path.rstrip("/").endswith("pinning/pinFileToIPFS"):
+            status, response = 404, {"error": f"unknown endpoint {self.path}"}
+        elif self.fail_every and number % self.fail_every == self.fail_every - 1:
+            status, response = 429, {"error": "rate limited"}
+            self.stats["rejected"] += 1
+        else:
+            status, response = 200, {"IpfsHash": _cid_v0(body), "PinSize": len(body)}
+            self.stats["uploads"] += 1
+            self.stats["bytes"] += len(body)
+        data = json.dumps(response).encode()
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve(latency=0.0, fail_every=0, host="127.0.0.1", port=0):
+    """Starts the fake API on a background thread. Returns ``(server, stats)``; set PINATA_BASE_URL to its URL."""
+    stats = {"uploads": 0, "rejected": 0, "bytes": 0}
+    handler = type("StubPinataHandler", (_Handler,), {
+        "latency": latency, "fail_every": fail_every, "counter": itertools.count(), "stats": stats,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
@@ -0,0 +1,233 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.20;
+
+// Reuses the flattened OpenZeppelin base contracts (ERC721, Ownable, Counters, Strings).
+import "./StatusNFT.sol";
+
+/**
+ * @title WalletStatusNFTCompact
+ * @notice A variant of WalletStatusNFT that stores each token's metadata
+ * reference as a packed 32-byte digest instead of a string.
+ * @dev A 0G root hash ("0x" + 64 hex characters) or an IPFS CID (46-59
+ * characters) costs 3-4 storage slots and 128-160 bytes of calldata as a
+ * string; here it is one slot plus one byte of a shared format slot, and 65
+ * bytes of calldata. tokenURI rebuilds the original reference from the
+ * digest and its format, so off-chain readers see the same URI as before.
+ * nft_updater/cid_codec.py is the matching Python encoder and decoder.
+ */
+contract WalletStatusNFTCompact is ERC721, Ownable {
+    using Counters for Counters.Counter;
+    Counters.Counter private _tokenIdCounter;
+
+    // --- Reference formats (low 7 bits) ---
+    uint8 public constant FORMAT_NONE = 0;
+    // 0G storage root hash, rendered as "0x" + 64 lowercase hex characters.
+    uint8 public constant FORMAT_ZG_ROOT = 1;
+    // CIDv0 ("Qm..."): base58btc of the sha2-256 multihash.
+    uint8 public constant FORMAT_CID_V0 = 2;
+    // CIDv1 ("bafy..."): base32 of version 1, dag-pb codec and the sha2-256 multihash.
+    uint8 public constant FORMAT_CID_V1_DAG_PB = 3;
+    // CIDv1 ("bafk..."): base32 of version 1, raw codec and the sha2-256 multihash.
+    uint8 public constant FORMAT_CID_V1_RAW = 4;
+    // Flag: the reference is "<digest>/<tokenId>.json" inside a directory upload.
+    uint8 public constant FORMAT_DIRECTORY = 0x80;
+
+    bytes private constant _BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz";
+    bytes private constant _BASE32_ALPHABET = "abcdefghijklmnopqrstuvwxyz234567";
+
+    // Prefix of every token URI, e.g. "https://indexer-storage-testnet-turbo.0g.ai/file?root=" or "ipfs://".
+    string private _gatewayURL;
+
+    // Mapping from a tokenId to the digest of its metadata reference.
+    mapping(uint256 => bytes32) private _tokenDigests;
+
+    // One format byte per token, 32 tokens per slot, so a batch of consecutive
+    // token IDs writes each format slot once.
+    mapping(uint256 => uint256) private _packedFormats;
+
+    // Mapping to ensure each wallet can only mint one NFT.
+    mapping(address => bool) private _hasMinted;
+
+    // --- Events ---
+    event StatusNFTMinted(address indexed owner, uint256 indexed tokenId);
+    event BatchTokenRootHashesUpdated(uint256[] tokenIds);
+
+    /**
+     * @dev Sets the name, symbol and the gateway every token URI starts with.
+     */
+    constructor(string memory gatewayURL) ERC721("Wallet Status NFT", "WSNFT") Ownable(msg.sender) {
+        _gatewayURL = gatewayURL;
+    }
+
+    /**
+     * @notice Allows a user to mint their own status NFT. Each address can mint only once.
+     */
+    function mintStatusNFT() external {
+        require(!_hasMinted[msg.sender], "WalletStatusNFT: You have already minted an NFT.");
+        _hasMinted[msg.sender] = true;
+
+        _tokenIdCounter.increment();
+        uint256 tokenId = _tokenIdCounter.current();
+        _safeMint(msg.sender, tokenId);
+
+        emit StatusNFTMinted(msg.sender, tokenId);
+    }
+
+    /**
+     * @notice Sets or updates the metadata digests of many tokens in one transaction.
+     * @dev Tokens are minted sequentially and never burned, so a token exists
+     * exactly when its ID is between 1 and the total supply; checking that
+     * costs one storage read per batch instead of one per token.
+     * @param tokenIds The IDs of the tokens to update.
+     * @param digests The 32-byte digest of each token's metadata reference.
+     * @param formats One format byte per token (see the FORMAT_ constants).
+     */
+    function batchSetTokenDigests(uint256[] calldata tokenIds, bytes32[] calldata digests, bytes calldata formats)
+        external
+        onlyOwner
+    {
+        require(
+            tokenIds.length == digests.length && tokenIds.length == formats.length,
+            "WalletStatusNFT: Arrays must have the same length."
+        );
+        uint256 supply = _tokenIdCounter.current();
+        uint256 slotIndex = type(uint256).max;
+        uint256 slot;
+
+        for (uint256 i = 0; i < tokenIds.length; i++) {
+            uint256 tokenId = tokenIds[i];
+            require(tokenId != 0 && tokenId <= supply, "WalletStatusNFT: One of the tokens does not exist.");
+            _tokenDigests[tokenId] = digests[i];
+
+            uint256 index = tokenId >> 5;
+            if (index != slotIndex) {
+                if (slotIndex != type(uint256).max) {
+                    _packedFormats[slotIndex] = slot;
+                }
+                slotIndex = index;
+                slot = _packedFormats[index];
+            }
+            uint256 shift = (tokenId & 31) * 8;
+            slot = (slot & ~(uint256(0xff) << shift)) | (uint256(uint8(formats[i])) << shift);
+        }
+        if (slotIndex != type(uint256).max) {
+            _packedFormats[slotIndex] = slot;
+        }
+
+        emit BatchTokenRootHashesUpdated(tokenIds);
+    }
+
+    /**
+     * @notice Returns the stored digest and format of every token in `tokenIds`.
+     * @dev Lets the update script compare what is on-chain with one call per batch.
+     */
+    function tokenDigests(uint256[] calldata tokenIds) external view returns (bytes32[] memory digests, bytes memory formats) {
+        digests = new bytes32[](tokenIds.length);
+        formats = new bytes(tokenIds.length);
+        for (uint256 i = 0; i < tokenIds.length; i++) {
+            digests[i] = _tokenDigests[tokenIds[i]];
+            formats[i] = bytes1(_formatOf(tokenIds[i]));
+        }
+    }
+
+    /**
+     * @notice Returns the full metadata URI for a token.
+     * @dev The reference is rebuilt from the digest in its original text form.
+     */
+    function tokenURI(uint256 tokenId) public view override returns (string memory) {
+        require(_exists(tokenId), "WalletStatusNFT: URI query for nonexistent token.");
+        uint8 format = _formatOf(tokenId);
+
+        // If no digest has been set for this token yet, return an empty string.
+        if (format == FORMAT_NONE) {
+            return "";
+        }
+
+        bytes32 digest = _tokenDigests[tokenId];
+        uint8 kind = format & 0x7f;
+        string memory ref;
+        if (kind == FORMAT_ZG_ROOT) {
+            ref = Strings.toHexString(uint256(digest), 32);
+        } else if (kind == FORMAT_CID_V0) {
+            ref = _base58(abi.encodePacked(bytes2(0x1220), digest));
+        } else if (kind == FORMAT_CID_V1_DAG_PB) {
+            ref = string.concat("b", _base32(abi.encodePacked(bytes4(0x01701220), digest)));
+        } else if (kind == FORMAT_CID_V1_RAW) {
+            ref = string.concat("b", _base32(abi.encodePacked(bytes4(0x01551220), digest)));
+        } else {
+            revert("WalletStatusNFT: Unknown reference format.");
+        }
+        if ((format & FORMAT_DIRECTORY) != 0) {
+            ref = string.concat(ref, "/", Strings.toString(tokenId), ".json");
+        }
+        return string.concat(_gatewayURL, ref);
+    }
+
+    /**
+     * @dev A helper function to check if a wallet has already minted.
+     */
+    function hasMinted(address wallet) external view returns (bool) {
+        return _hasMinted[wallet];
+    }
+
+    /**
+     * @notice Returns the total number of tokens minted so far.
+     */
+    function totalSupply() public view returns (uint256) {
+        return _tokenIdCounter.current();
+    }
+
+    function _formatOf(uint256 tokenId) private view returns (uint8) {
+        return uint8(_packedFormats[tokenId >> 5] >> ((tokenId & 31) * 8));
+    }
+
+    /**
+     * @dev Base58btc (Bitcoin alphabet) encoding. The input never starts with
+     * a zero byte here, so no leading "1"s are needed.
+     */
+    function _base58(bytes memory source) private pure returns (string memory) {
+        // Little-endian base-58 digits; 34 input bytes need at most 47.
+        bytes memory digits = new bytes(64);
+        uint256 length = 1;
+        for (uint256 i = 0; i < source.length; i++) {
+            uint256 carry = uint8(source[i]);
+            for (uint256 j = 0; j < length; j++) {
+                carry += uint256(uint8(digits[j])) * 256;
+                digits[j] = bytes1(uint8(carry % 58));
+                carry /= 58;
+            }
+            while (carry > 0) {
+                digits[length++] = bytes1(uint8(carry % 58));
+                carry /= 58;
+            }
+        }
+        bytes memory result = new bytes(length);
+        for (uint256 i = 0; i < length; i++) {
+            result[i] = _BASE58_ALPHABET[uint8(digits[length - 1 - i])];
+        }
+        return string(result);
+    }
+
+    /**
+     * @dev Unpadded lowercase RFC 4648 base32 encoding, as used by CIDv1.
+     */
+    function _base32(bytes memory source) private pure returns (string memory) {
+        bytes memory result = new bytes((source.length * 8 + 4) / 5);
+        uint256 buffer;
+        uint256 bits;
+        uint256 out;
+        for (uint256 i = 0; i < source.length; i++) {
+            buffer = (buffer << 8) | uint8(source[i]);
+            bits += 8;
+            while (bits >= 5) {
+                bits -= 5;
+                result[out++] = _BASE32_ALPHABET[(buffer >> bits) & 31];
+            }
+            buffer &= (1 << bits) - 1;
+        }
+        if (bits > 0) {
+            result[out] = _BASE32_ALPHABET[(buffer << (5 - bits)) & 31];
+        }
+        return string(result);
+    }
+}
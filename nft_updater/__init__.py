@@ -0,0 +1 @@
+"""Shared helpers for the Wallet Status NFT update scripts."""
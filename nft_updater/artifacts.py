@@ -0,0 +1,64 @@
+"""In-memory artifacts, a shared scratch directory and opt-in export to disk.
+
+Images and metadata are kept as ``bytes`` and handed straight to the
+uploaders. Backends that can only take a file path (the 0G CLI) write to one
+scratch directory, on tmpfs when the runner has it, that is created once per
+process and removed at exit. Setting ``EXPORT_ARTIFACTS_DIR`` also writes every
+artifact under that directory for debugging or export.
+"""
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+
+# When set, every artifact is also written below this directory (e.g. ./metadata).
+EXPORT_ARTIFACTS_DIR = os.getenv("EXPORT_ARTIFACTS_DIR", "")
+# Parent directory for the scratch area; defaults to tmpfs when available.
+SCRATCH_PARENT = os.getenv("SCRATCH_DIR", "/dev/shm" if os.path.isdir("/dev/shm") else None)
+
+_scratch_dir = None
+_scratch_lock = threading.Lock()
+
+
+def scratch_dir():
+    """Returns the process-wide scratch directory, creating it on first use."""
+    global _scratch_dir
+    with _scratch_lock:
+        if _scratch_dir is None:
+            _scratch_dir = tempfile.mkdtemp(prefix="nft-artifacts-", dir=SCRATCH_PARENT)
+            atexit.register(shutil.rmtree, _scratch_dir, ignore_errors=True)
+        return _scratch_dir
+
+
+class ScratchFile:
+    """Context manager that writes ``data`` to a unique scratch file and removes it afterwards."""
+
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+        self.path = None
+
+    def __enter__(self):
+        fd, self.path = tempfile.mkstemp(suffix=f"-{self.name}", dir=scratch_dir())
+        with os.fdopen(fd, "wb") as f:
+            f.write(self.data)
+        return self.path
+
+    def __exit__(self, *exc):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        return False
+
+
+def export_artifact(relative_path, data):
+    """Writes an artifact below EXPORT_ARTIFACTS_DIR when export mode is enabled."""
+    if not EXPORT_ARTIFACTS_DIR:
+        return None
+    path = os.path.join(EXPORT_ARTIFACTS_DIR, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
@@ -0,0 +1,68 @@
+"""Storage backends the update engine can publish images and metadata to.
+
+A backend uploads in-memory files, says how an uploaded image is referenced
+from the metadata JSON, and exposes the executor its blocking uploads should
+run on so the pipeline can size its upload stages to match. Backends with
+``supports_directories`` can also publish a whole directory in one upload
+(see nft_updater/publishing.py).
+"""
+from nft_updater.pinata_uploader import PinataUploader
+from nft_updater.zg_upload_pool import ZgUploadPool
+
+
+class ZgStorageBackend:
+    """0G Storage through the official ``zg_storage`` CLI."""
+
+    name = "0g-storage"
+    # The contract builds tokenURI as "<indexer>/file?root=" + rootHash, which has
+    # no way to address a file inside a directory upload.
+    supports_directories = False
+
+    def __init__(self, cli_executable, rpc_url, indexer_url, keys):
+        self.indexer_url = indexer_url.rstrip("/")
+        self.pool = ZgUploadPool(cli_executable, rpc_url, indexer_url, keys)
+        self.executor = self.pool.executor
+        self.concurrency = self.pool.concurrency
+
+    def upload(self, name, data):
+        return self.pool.upload_bytes(name, data)
+
+    def image_uri(self, root_hash):
+        return f"{self.indexer_url}/file?root={root_hash}"
+
+    def cancel(self):
+        self.pool.cancel()
+
+    def close(self):
+        self.pool.close()
+
+
+class PinataBackend:
+    """IPFS pinning through Pinata's ``pinFileToIPFS`` API."""
+
+    name = "pinata"
+    supports_directories = True
+
+    def __init__(self, api_key, api_secret, base_url="https://api.pinata.cloud/"):
+        self.uploader = PinataUploader(api_key, api_secret, base_url)
+        self.executor = self.uploader.executor
+        self.concurrency = self.uploader.concurrency
+
+    def upload(self, name, data):
+        return self.uploader.upload_bytes(name, data)
+
+    def upload_directory(self, name, files):
+        return self.uploader.upload_directory(name, files)
+
+    def file_ref(self, directory_cid, filename):
+        """The reference stored for ``filename`` inside a directory upload."""
+        return f"{directory_cid}/{filename}"
+
+    def image_uri(self, cid):
+        return f"ipfs://{cid}"
+
+    def cancel(self):
+        pass
+
+    def close(self):
+        self.uploader.close()
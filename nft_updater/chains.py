@@ -0,0 +1,98 @@
+"""Chain configurations known to the update engine.
+
+Each entry describes one deployed WalletStatusNFT collection: where its RPC
+endpoint is, which environment variable holds its contract address, which
+storage backend its artifacts go to and how its images and metadata look.
+"""
+import os
+
+from nft_updater.render_settings import STYLE_CLASSIC, STYLE_GRADIENT
+
+# --- Endpoints (overridable for local testing and benchmarks) ---
+# RPC settings may list several endpoints, "url[|rps],url[|rps]"; see rpc_pool.py.
+ZG_RPC_URL = os.getenv("ZG_RPC_URL", "https://evmrpc-testnet.0g.ai/")
+ZG_INDEXER_URL = os.getenv("ZG_INDEXER_URL", "https://indexer-storage-testnet-turbo.0g.ai")
+ZG_CLI_EXECUTABLE = os.getenv("ZG_CLI_EXECUTABLE", "./zg_storage")
+MONAD_RPC_URL = os.getenv("MONAD_RPC_URL", "https://testnet-rpc.monad.xyz")
+PINATA_BASE_URL = os.getenv("PINATA_BASE_URL", "https://api.pinata.cloud/")
+
+
+class ChainConfig:
+    """Static description of one chain/collection the engine can update."""
+
+    def __init__(self, name, label, rpc_url, contract_env, backend, style, title,
+                 nft_name, description, extra_stats=None):
+        # Key used for the state store, upload journal and log prefixes.
+        self.name = name
+        self.label = label
+        self.rpc_url = rpc_url
+        self.contract_env = contract_env
+        # "0g-storage" or "pinata".
+        self.backend = backend
+        self.style = style
+        self.title = title
+        self.nft_name = nft_name
+        self.description = description
+        # Fixed fields merged into every stats dict for this chain.
+        self.extra_stats = extra_stats or {}
+
+    @property
+    def contract_address(self):
+        return os.getenv(self.contract_env)
+
+    @property
+    def compact_contract(self):
+        """True when the contract is the bytes32-digest variant (contracts/StatusNFTCompact.sol).
+
+        Set with e.g. MONAD_CONTRACT_LAYOUT=compact next to MONAD_CONTRACT_ADDRESS.
+        """
+        return os.getenv(self.contract_env.replace("_ADDRESS", "_LAYOUT"), "string").lower() == "compact"
+
+    @property
+    def start_block(self):
+        """The contract's deployment block, where the Transfer-log index starts, or None if not set.
+
+        Set with e.g. MONAD_CONTRACT_START_BLOCK next to MONAD_CONTRACT_ADDRESS.
+        """
+        value = os.getenv(self.contract_env.replace("_ADDRESS", "_START_BLOCK"), "").strip()
+        return int(value) if value else None
+
+
+CHAINS = {
+    # update_nfts.py: 0G chain, artifacts on 0G Storage.
+    "0g-storage": ChainConfig(
+        name="0g-storage",
+        label="0G",
+        rpc_url=ZG_RPC_URL,
+        contract_env="CONTRACT_ADDRESS",
+        backend="0g-storage",
+        style=STYLE_CLASSIC,
+        title="0G Wallet Status",
+        nft_name="Wallet Status NFT",
+        description="A dynamic NFT that reflects the on-chain activity of a wallet on the 0G network.",
+    ),
+    # update_nfts_0G.py: 0G chain, artifacts pinned through Pinata.
+    "0g": ChainConfig(
+        name="0g",
+        label="0G",
+        rpc_url=ZG_RPC_URL,
+        contract_env="ZG_CONTRACT_ADDRESS",
+        backend="pinata",
+        style=STYLE_GRADIENT,
+        title="MONAD STATUS",
+        nft_name="Monad Wallet Status NFT",
+        description="A dynamic NFT on the Monad network.",
+    ),
+    # update_nfts_monad.py: Monad testnet, artifacts pinned through Pinata.
+    "monad": ChainConfig(
+        name="monad",
+        label="Monad",
+        rpc_url=MONAD_RPC_URL,
+        contract_env="MONAD_CONTRACT_ADDRESS",
+        backend="pinata",
+        style=STYLE_GRADIENT,
+        title="MONAD STATUS",
+        nft_name="Monad Wallet Status NFT",
+        description="A dynamic NFT on the Monad network.",
+    ),
+}
@@ -0,0 +1,132 @@
+"""Packs metadata references into the compact contract's ``bytes32`` digests and back.
+
+``contracts/StatusNFTCompact.sol`` stores every token's reference as a 32-byte
+digest plus a one-byte format instead of a string. The formats mirror the
+contract's ``FORMAT_`` constants:
+
+- ``FORMAT_ZG_ROOT``: a 0G storage root hash, ``0x`` + 64 hex characters, decoded in lowercase.
+- ``FORMAT_CID_V0``: an IPFS CIDv0 (``Qm...``), base58btc of a sha2-256 multihash.
+- ``FORMAT_CID_V1_DAG_PB`` / ``FORMAT_CID_V1_RAW``: a base32 CIDv1 (``bafy...``
+  / ``bafk...``) with a sha2-256 multihash.
+- ``FORMAT_DIRECTORY`` is or-ed in for ``<CID>/<tokenId>.json`` references
+  from directory-mode publishing; the path is rebuilt from the token ID.
+
+Any other reference (another hash function, a path that is not the token's
+own JSON) cannot be stored compactly and raises ValueError.
+"""
+import base64
+import re
+
+FORMAT_NONE = 0
+FORMAT_ZG_ROOT = 1
+FORMAT_CID_V0 = 2
+FORMAT_CID_V1_DAG_PB = 3
+FORMAT_CID_V1_RAW = 4
+FORMAT_DIRECTORY = 0x80
+
+# Multihash header of a 32-byte sha2-256 digest.
+_SHA2_256 = b"\x12\x20"
+# CIDv1 version byte and multicodec -> format.
+_CID_V1_CODECS = {b"\x01\x70": FORMAT_CID_V1_DAG_PB, b"\x01\x55": FORMAT_CID_V1_RAW}
+_CID_V1_PREFIXES = {fmt: prefix for prefix, fmt in _CID_V1_CODECS.items()}
+
+_BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_BASE58_INDEX = {char: index for index, char in enumerate(_BASE58_ALPHABET)}
+_ROOT_HASH_PATTERN = re.compile(r"^0x[0-9a-fA-F]{64}$")
+_DIRECTORY_PATH = re.compile(r"^(?P<cid>[^/]+)/(?P<token_id>\d+)\.json$")
+
+
+def _base58_decode(text):
+    number = 0
+    for char in text:
+        if char not in _BASE58_INDEX:
+            raise ValueError(f"Invalid base58 character {char!r}")
+        number = number * 58 + _BASE58_INDEX[char]
+    data = number.to_bytes((number.bit_length() + 7) // 8, "big")
+    # Leading "1"s stand for leading zero bytes.
+    return b"\x00" * (len(text) - len(text.lstrip("1"))) + data
+
+
+def _base58_encode(data):
+    number = int.from_bytes(data, "big")
+    encoded = ""
+    while number:
+        number, remainder = divmod(number, 58)
+        encoded = _BASE58_ALPHABET[remainder] + encoded
+    return "1" * (len(data) - len(data.lstrip(b"\x00"))) + encoded
+
+
+def _base32_decode(text):
+    return base64.b32decode(text.upper() + "=" * (-len(text) % 8))
+
+
+def _base32_encode(data):
+    return base64.b32encode(data).decode("ascii").rstrip("=").lower()
+
+
+def normalize_ref(ref):
+    """Lowercases 0G root hashes, which the contract renders in lowercase hex; CIDs are left as they are."""
+    match = _DIRECTORY_PATH.match(ref)
+    plain = match.group("cid") if match else ref
+    if _ROOT_HASH_PATTERN.match(plain):
+        return ref.lower()
+    return ref
+
+
+def _encode_plain(ref):
+    """Returns ``(digest, format)`` for a reference without a path."""
+    if _ROOT_HASH_PATTERN.match(ref):
+        return bytes.fromhex(ref[2:]), FORMAT_ZG_ROOT
+    if ref.startswith("Qm"):
+        multihash = _base58_decode(ref)
+        if len(multihash) == 34 and multihash[:2] == _SHA2_256:
+            return multihash[2:], FORMAT_CID_V0
+    elif ref.startswith("b"):
+        try:
+            raw = _base32_decode(ref[1:])
+        except ValueError:
+            raw = b""
+        if len(raw) == 36 and raw[:2] in _CID_V1_CODECS and raw[2:4] == _SHA2_256:
+            return raw[4:], _CID_V1_CODECS[raw[:2]]
+    raise ValueError(f"Cannot store {ref!r} as a compact digest: only 0G root hashes and sha2-256 CIDs fit.")
+
+
+def encode_ref(token_id, ref):
+    """Packs ``token_id``'s metadata reference into ``(digest, format)`` for ``batchSetTokenDigests``."""
+    ref = normalize_ref(ref)
+    match = _DIRECTORY_PATH.match(ref)
+    if match is None:
+        return _encode_plain(ref)
+    if int(match.group("token_id")) != token_id:
+        raise ValueError(f"Directory reference {ref!r} does not point at Token ID {token_id}'s JSON.")
+    digest, fmt = _encode_plain(match.group("cid"))
+    return digest, fmt | FORMAT_DIRECTORY
+
+
+def decode_ref(token_id, digest, fmt):
+    """Rebuilds the reference text the contract's tokenURI renders, or None for FORMAT_NONE."""
+    kind = fmt & ~FORMAT_DIRECTORY
+    if kind == FORMAT_NONE:
+        return None
+    if kind == FORMAT_ZG_ROOT:
+        ref = "0x" + digest.hex()
+    elif kind == FORMAT_CID_V0:
+        ref = _base58_encode(_SHA2_256 + digest)
+    elif kind in _CID_V1_PREFIXES:
+        ref = "b" + _base32_encode(_CID_V1_PREFIXES[kind] + _SHA2_256 + digest)
+    else:
+        raise ValueError(f"Unknown compact reference format {fmt}")
+    if fmt & FORMAT_DIRECTORY:
+        ref = f"{ref}/{token_id}.json"
+    return ref
+
+
+def encode_refs(token_ids, refs):
+    """Packs a batch into the ``(digests, formats)`` arguments of ``batchSetTokenDigests``."""
+    digests = []
+    formats = bytearray()
+    for token_id, ref in zip(token_ids, refs):
+        digest, fmt = encode_ref(token_id, ref)
+        digests.append(digest)
+        formats.append(fmt)
+    return digests, bytes(formats)
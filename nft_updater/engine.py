@@ -0,0 +1,529 @@
+"""Update engine shared by every chain's update script.
+
+``update_chain`` runs the whole job for one chain: read owners and stats,
+render and upload changed tokens through the streaming pipeline, then commit
+the new root hashes on-chain. ``run_chains`` runs several chains at once in
+one process; they share a single render process pool, the font/template
+caches, the upload caches and one set of storage backends (and therefore one
+pool of HTTP connections), so the total runtime is close to that of the
+slowest chain rather than the sum of all of them.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from nft_updater.artifacts import export_artifact
+from nft_updater.backends import PinataBackend, ZgStorageBackend
+from nft_updater.chains import CHAINS, PINATA_BASE_URL, ZG_CLI_EXECUTABLE, ZG_INDEXER_URL, ZG_RPC_URL
+from nft_updater.event_indexer import USE_EVENT_INDEX, OwnerIndex
+from nft_updater.image_encoding import encoding_for, extension
+from nft_updater.journal import TX_CONFIRMED, TX_REVERTED, UploadJournal
+from nft_updater.lean_rpc import LeanContract, LeanWeb3
+from nft_updater.pipeline import changed_tokens, token_stages, update_tokens
+from nft_updater.publishing import PUBLISH_MODE, PUBLISH_MODES, DirectoryBundle
+from nft_updater.refresh_tiers import REFRESH_MAX_GAS, REFRESH_TIERS, RefreshScheduler, parse_tiers
+from nft_updater.rpc_pool import parse_endpoints, pool_for
+from nft_updater.shards import (
+    ManifestError, load_manifests, merge_state_snapshots, shard_token_ids, write_manifest, write_state_snapshot,
+)
+from nft_updater.state_store import StateStore
+from nft_updater.telemetry import metrics, profiled, write_reports
+from nft_updater.tx_scheduler import TxScheduler
+from nft_updater.upload_cache import UploadCache
+from nft_updater.wallet_age import WALLET_AGE, WalletAgeIndex
+from nft_updater.zg_upload_pool import ZG_UPLOAD_KEYS
+
+# When enabled, images carry no timestamp so identical stats give identical bytes;
+# the update time goes into the metadata JSON instead.
+DETERMINISTIC_RENDER = os.getenv("DETERMINISTIC_RENDER", "").lower() in ("1", "true", "yes")
+# Where sharded runs write their manifests and the merge step looks for them.
+SHARD_MANIFEST_DIR = os.getenv("SHARD_MANIFEST_DIR", "./shard-manifests")
+
+
+class SharedResources:
+    """Pools and caches shared by every chain updated in this process."""
+
+    def __init__(self, private_key):
+        self.private_key = private_key
+        self._lock = threading.Lock()
+        self._render_pool = None
+        self._renderers = {}
+        self._backends = {}
+        self._upload_caches = {}
+        # chain name -> {phase: seconds} for the last update of that chain.
+        self.timings = {}
+
+    def renderer(self, chain):
+        # Pillow is only loaded once a chain actually has something to render.
+        from nft_updater.render_engine import RenderEngine, create_render_pool
+
+        with self._lock:
+            key = (chain.style, chain.title, encoding_for(chain.backend))
+            if key not in self._renderers:
+                if self._render_pool is None:
+                    self._render_pool = create_render_pool()
+                self._renderers[key] = RenderEngine(
+                    chain.style, chain.title, deterministic=DETERMINISTIC_RENDER, pool=self._render_pool,
+                    encoding=key[2],
+                )
+            return self._renderers[key]
+
+    def backend(self, chain):
+        with self._lock:
+            if chain.backend not in self._backends:
+                if chain.backend == "0g-storage":
+                    self._backends[chain.backend] = ZgStorageBackend(
+                        # The storage CLI takes a single endpoint: the first one listed.
+                        ZG_CLI_EXECUTABLE, parse_endpoints(ZG_RPC_URL)[0][0], ZG_INDEXER_URL,
+                        ZG_UPLOAD_KEYS or [self.private_key],
+                    )
+                elif chain.backend == "pinata":
+                    self._backends[chain.backend] = PinataBackend(
+                        os.getenv("PINATA_API_KEY"), os.getenv("PINATA_API_SECRET"), PINATA_BASE_URL
+                    )
+                else:
+                    raise ValueError(f"Unknown storage backend: {chain.backend}")
+            return self._backends[chain.backend]
+
+    def upload_cache(self, chain):
+        with self._lock:
+            if chain.backend not in self._upload_caches:
+                self._upload_caches[chain.backend] = UploadCache(backend=chain.backend)
+            return self._upload_caches[chain.backend]
+
+    def cancel(self):
+        for backend in list(self._backends.values()):
+            backend.cancel()
+
+    def close(self):
+        for cache in self._upload_caches.values():
+            cache.report()
+            cache.close()
+        for backend in self._backends.values():
+            backend.close()
+        for renderer in self._renderers.values():
+            renderer.close()
+        if self._render_pool is not None:
+            self._render_pool.shutdown(wait=True)
+
+
+def missing_settings(chain, private_key, uploads=True):
+    """Returns the names of the environment variables ``chain`` needs but does not have."""
+    required = {"PRIVATE_KEY": private_key, chain.contract_env: chain.contract_address}
+    if uploads and chain.backend == "pinata":
+        required["PINATA_API_KEY"] = os.getenv("PINATA_API_KEY")
+        required["PINATA_API_SECRET"] = os.getenv("PINATA_API_SECRET")
+    return [name for name, value in required.items() if not value]
+
+
+def get_wallet_stats(w3, address, tx_counts=None, extra_stats=None):
+    """Fetches transaction count for a given wallet address.
+
+    If the count was already read in bulk it is taken from ``tx_counts``
+    instead of making another RPC call.
+    """
+    with metrics.timer("wallet_stats_seconds"):
+        try:
+            checksum_address = w3.to_checksum_address(address)
+            if tx_counts and checksum_address in tx_counts:
+                tx_count = tx_counts[checksum_address]
+            else:
+                metrics.count("wallet_stats_rpc_fallbacks_total")
+                tx_count = w3.eth.get_transaction_count(checksum_address)
+            return {"tx_count": tx_count, **(extra_stats or {})}
+        except Exception as e:
+            metrics.count("wallet_stats_failures_total")
+            print(f"Warning: Could not fetch stats for {address}. Error: {e}")
+            return {"tx_count": 0, **(extra_stats or {})}
+
+
+def generate_image(chain, renderer, token_id, stats, owner_address):
+    """Generates the NFT's dynamic image with the wallet's stats and returns its encoded bytes."""
+    # The background, title and labels come from the renderer's cached template;
+    # only the token's own fields are drawn, on the shared render process pool.
+    with metrics.timer("render_seconds", chain=chain.name):
+        image_bytes = renderer.render_encoded(token_id, stats, owner_address)
+    metrics.count("rendered_bytes_total", len(image_bytes), chain=chain.name)
+
+    # Only written to disk when EXPORT_ARTIFACTS_DIR is set
+    export_artifact(f"{chain.name}/images/{token_id}.{extension(renderer.encoding)}", image_bytes)
+    return image_bytes
+
+
+def generate_metadata_json(chain, backend, token_id, image_ref, stats, owner_address):
+    """Generates the metadata JSON for the NFT and returns it as bytes."""
+    started = time.perf_counter()
+    metadata = {
+        "name": f"{chain.nft_name} #{token_id}",
+        "description": chain.description,
+        "image": backend.image_uri(image_ref),
+        "owner": owner_address,
+        "attributes": [{"trait_type": "Transaction Count", "value": stats['tx_count']}]
+    }
+    first_active_at = stats.get("first_active_at")
+    if first_active_at:
+        # Marketplaces show a date trait as an age; a stored day count would freeze at the last commit.
+        metadata["attributes"].append({"display_type": "date", "trait_type": "First Activity", "value": first_active_at})
+    if DETERMINISTIC_RENDER:
+        # The image has no timestamp in this mode, so record the update time here.
+        metadata["attributes"].append({"display_type": "date", "trait_type": "Last Updated", "value": int(time.time())})
+    json_bytes = json.dumps(metadata, indent=2).encode("utf-8")
+    metrics.observe("metadata_seconds", time.perf_counter() - started, chain=chain.name)
+    export_artifact(f"{chain.name}/json/{token_id}.json", json_bytes)
+    return json_bytes
+
+
+def _connect(chain, private_key, uploads=True):
+    """Connects the lean read client to the chain's RPC. Returns ``(w3, contract)``, or None after printing why not."""
+    missing = missing_settings(chain, private_key, uploads)
+    if missing:
+        print(f"[{chain.name}] FATAL: {', '.join(missing)} environment variables must be set.")
+        return None
+
+    # Connect to the blockchain
+    w3 = LeanWeb3(chain.rpc_url)
+    if not w3.is_connected():
+        print(f"[{chain.name}] FATAL: Could not connect to {chain.label} RPC at {chain.rpc_url}.")
+        return None
+    print(f"[{chain.name}] Connected to {chain.label}.")
+    return w3, LeanContract(w3, chain.contract_address)
+
+
+def _signer(chain, private_key):
+    """Returns ``(w3, account, contract)`` backed by web3, for recovering and committing transactions.
+
+    web3 and the contract ABI are only loaded here, so runs with nothing to
+    commit never pay for them.
+    """
+    from web3 import Web3
+
+    from nft_updater.abi import COMPACT_CONTRACT_ABI, CONTRACT_ABI
+    from nft_updater.pooled_provider import PooledProvider
+
+    w3 = Web3(PooledProvider(pool_for(chain.rpc_url)))
+    account = w3.eth.account.from_key(private_key)
+    abi = COMPACT_CONTRACT_ABI if chain.compact_contract else CONTRACT_ABI
+    contract = w3.eth.contract(address=w3.to_checksum_address(chain.contract_address), abi=abi)
+    print(f"[{chain.name}] Script wallet: {account.address}")
+    return w3, account, contract
+
+
+def _commit_updates(chain, w3, contract, account, private_key, store, journal, batches, timings, max_total_gas=0):
+    """Commits ``batches`` of ``(block_number, updates)`` on-chain and records them. Returns the committed token IDs.
+
+    ``max_total_gas`` caps the gas of the whole commit; updates are committed in the order given.
+    """
+    from nft_updater.reconcile import RECONCILE_ONCHAIN, drop_unchanged
+
+    state_updates = [update for _, updates in batches for update in updates]
+    print(f"\n[{chain.name}] --- Preparing to batch update {len(state_updates)} NFTs on {chain.label} ---")
+    # Split the updates into gas-bounded chunks, send them back-to-back with
+    # local nonces and wait for all receipts together.
+    scheduler = TxScheduler(
+        w3, contract, account, private_key,
+        on_submit=lambda tx_hash, nonce, token_ids, refs: journal.record_transaction(
+            chain.name, tx_hash, nonce, token_ids, refs
+        ),
+        on_settled=lambda tx_hash, success, block_number: journal.record_outcome(
+            chain.name, tx_hash, TX_CONFIRMED if success else TX_REVERTED, block_number
+        ),
+        compact=chain.compact_contract,
+    )
+    commit_started = time.perf_counter()
+    unchanged = set()
+    if RECONCILE_ONCHAIN:
+        # Entries whose reference is already on-chain only need recording, not a transaction.
+        state_updates, unchanged = drop_unchanged(
+            w3, contract, chain.name, state_updates, chain.compact_contract, scheduler.estimate_gas
+        )
+    committed = unchanged
+    if state_updates:
+        committed |= scheduler.commit(
+            [update[0] for update in state_updates], [update[3] for update in state_updates], max_total_gas
+        )
+    timings["commit"] = time.perf_counter() - commit_started
+    metrics.set("tokens_committed", len(committed), chain=chain.name)
+
+    # Remember what was committed so unchanged tokens are skipped next run
+    for block_number, updates in batches:
+        store.record_many(chain.name, [update for update in updates if update[0] in committed], block_number)
+    journal.prune(chain.name, committed)
+    return committed
+
+
+def _report_timings(chain, timings):
+    for name, seconds in timings.items():
+        metrics.set("stage_busy_seconds", round(seconds, 3), chain=chain.name, stage=name)
+    print(f"[{chain.name}] Stage times: " + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in timings.items()))
+
+
+def update_chain(chain, resources, shard=None, manifest_dir=None, token_ids=None):
+    """Runs a full update for one chain. Returns the number of tokens committed on-chain.
+
+    With ``shard`` (``(i, N)``) only that shard's tokens are rendered and
+    uploaded, and their root hashes go to a manifest in ``manifest_dir``
+    instead of on-chain; the return value is then the number of tokens in it.
+    ``token_ids`` limits the update to those tokens (the follower's queue).
+    """
+    private_key = resources.private_key
+    connection = _connect(chain, private_key)
+    if connection is None:
+        return 0
+    w3, contract = connection
+
+    # Get the total number of NFTs minted so far using the standard totalSupply function
+    try:
+        total_supply = contract.functions.totalSupply().call()
+    except Exception as e:
+        print(f"[{chain.name}] FATAL: Could not determine total supply of NFTs using totalSupply(). Error: {e}")
+        return 0
+
+    print(f"[{chain.name}] Total NFTs minted: {total_supply}")
+    if total_supply == 0:
+        print(f"[{chain.name}] No NFTs found to update.")
+        return 0
+    # Only full runs pick their tokens by refresh tier; the follower and shards name theirs.
+    scheduled = token_ids is None and shard is None
+    if token_ids is not None:
+        token_ids = [token_id for token_id in token_ids if 1 <= token_id <= total_supply]
+    else:
+        token_ids = shard_token_ids(total_supply, shard)
+    if shard is not None:
+        print(f"[{chain.name}] Shard {shard[0]}/{shard[1]}: {len(token_ids)} of {total_supply} tokens.")
+
+    renderer = resources.renderer(chain)
+    backend = resources.backend(chain)
+    upload_cache = resources.upload_cache(chain)
+    store = StateStore()
+    # Activity tiers, kept for every committed token so the next full run knows which are hot.
+    refresh = RefreshScheduler(chain.name, store) if shard is None and parse_tiers(REFRESH_TIERS) else None
+    committed = set()
+    # Uploads and transactions are journaled as they happen so an interrupted run can resume.
+    journal = UploadJournal()
+    # Owners come from the incremental Transfer-log index instead of ownerOf per token.
+    owner_index = OwnerIndex() if USE_EVENT_INDEX else None
+    # First-activity timestamps, found by binary search over historical nonces and cached per wallet.
+    wallet_ages = WalletAgeIndex() if WALLET_AGE else None
+    enrich = None
+    if wallet_ages is not None:
+        def enrich(addresses, tx_counts, block_number):
+            try:
+                first_active = wallet_ages.first_activity(w3, chain.name, addresses, tx_counts, block_number)
+            except Exception as e:
+                # Ages are optional; an unreachable archive endpoint must not stop the update.
+                print(f"[{chain.name}] Warning: Could not look up wallet ages. Error: {e}")
+                return {}
+            return {address: {"first_active_at": timestamp} for address, timestamp in first_active.items()}
+
+    # Directory mode bundles the run's changed files into one upload per kind.
+    bundle = None
+    if PUBLISH_MODE == "directory":
+        if backend.supports_directories:
+            bundle = DirectoryBundle(chain.name, backend, upload_cache)
+        else:
+            print(f"[{chain.name}] Warning: {backend.name} cannot address files in a directory upload; publishing per file.")
+
+    def make_metadata(token_id, image_ref, stats, owner):
+        return generate_metadata_json(chain, backend, token_id, image_ref, stats, owner)
+
+    def on_uploaded(job, kind, ref):
+        journal.record_upload(chain.name, job["token_id"], job["owner"], job["stats"], kind, ref)
+
+    try:
+        # Only a run that left transactions unsettled needs the signer before committing.
+        if shard is None and journal.unsettled_transactions(chain.name):
+            signer_w3, account, _ = _signer(chain, private_key)
+            recovered = journal.recover(signer_w3, chain.name, store, account.address)
+            if recovered:
+                print(f"[{chain.name}] Recovered {recovered} tokens committed by an interrupted run.")
+
+        # Stream every changed token through the pipeline: batched owner/stats reads,
+        # then render, image upload and metadata upload stages joined by bounded queues.
+        counters = {}
+        source = changed_tokens(
+            w3, contract, total_supply, store, chain.name,
+            lambda owner, tx_counts: get_wallet_stats(w3, owner, tx_counts, chain.extra_stats),
+            counters=counters, owner_index=owner_index, enrich=enrich, token_ids=token_ids,
+            schedule=refresh if scheduled else None,
+        )
+        stages = token_stages(
+            lambda token_id, stats, owner: generate_image(chain, renderer, token_id, stats, owner),
+            make_metadata, backend.upload, upload_cache, backend.executor, backend.concurrency,
+            image_extension=extension(renderer.encoding),
+            resume=lambda job: journal.uploads(chain.name, job["token_id"], job["owner"], job["stats"]),
+            on_uploaded=on_uploaded, bundle=bundle,
+        )
+        # (token_id, owner, stats, root_hash) rows saved to the state store once committed.
+        state_updates = update_tokens(source, stages)
+        timings = resources.timings[chain.name] = {"read": counters["read_seconds"]}
+        timings.update((stage.name, stage.busy_seconds) for stage in stages)
+        if bundle is not None:
+            publish_started = time.perf_counter()
+            state_updates = sorted(state_updates + bundle.publish(make_metadata, on_uploaded), key=lambda update: update[0])
+            timings["publish"] = time.perf_counter() - publish_started
+        metrics.set("tokens_total", total_supply, chain=chain.name)
+        metrics.set("tokens_skipped_unchanged", counters["skipped_unchanged"], chain=chain.name)
+
+        print(f"\n[{chain.name}] Skipped {counters['skipped_unchanged']} unchanged NFTs.")
+        if "not_due" in counters:
+            metrics.set("tokens_not_due", counters["not_due"], chain=chain.name)
+            print(f"[{chain.name}] Left {counters['not_due']} NFTs whose refresh tier is not due yet.")
+        if owner_index is not None:
+            print(f"[{chain.name}] Tokens minted or transferred since the last run: {len(counters.get('transferred_tokens', ()))}")
+
+        if shard is not None:
+            # The merge step validates every shard's manifest and commits them all from one signer.
+            path = write_manifest(manifest_dir, chain, shard, counters["block_number"], total_supply, state_updates)
+            _report_timings(chain, timings)
+            print(f"[{chain.name}] Wrote {len(state_updates)} updates for shard {shard[0]}/{shard[1]} to {path}")
+            return len(state_updates)
+
+        if not state_updates:
+            print(f"[{chain.name}] No NFTs were successfully processed for on-chain update.")
+            return 0
+
+        if refresh is not None and scheduled:
+            # Under a gas budget the hottest tokens are committed first.
+            state_updates = refresh.order(state_updates)
+        signer_w3, account, signer_contract = _signer(chain, private_key)
+        committed = _commit_updates(
+            chain, signer_w3, signer_contract, account, private_key, store, journal,
+            [(counters["block_number"], state_updates)], timings,
+            # The follower has already dequeued its tokens, so only scheduled runs may defer any.
+            REFRESH_MAX_GAS if refresh is not None and scheduled else 0,
+        )
+        _report_timings(chain, timings)
+        return len(committed)
+    except Exception as e:
+        print(f"[{chain.name}] Error while updating: {e}")
+        return 0
+    finally:
+        if refresh is not None:
+            try:
+                refresh.save(committed)
+            except Exception as e:
+                print(f"[{chain.name}] Warning: Could not save refresh tiers. Error: {e}")
+            refresh.close()
+        store.close()
+        journal.close()
+        if bundle is not None:
+            bundle.close()
+        if owner_index is not None:
+            owner_index.close()
+        if wallet_ages is not None:
+            wallet_ages.close()
+
+
+def merge_chain(chain, resources, manifest_dir):
+    """Validates every shard manifest of ``chain`` and commits them from one signer. Returns the committed count."""
+    private_key = resources.private_key
+    # The merge only commits, so it needs no upload credentials.
+    connection = _connect(chain, private_key, uploads=False)
+    if connection is None:
+        return 0
+    w3, account, contract = _signer(chain, private_key)
+
+    store = StateStore()
+    journal = UploadJournal()
+    try:
+        recovered = journal.recover(w3, chain.name, store, account.address)
+        if recovered:
+            print(f"[{chain.name}] Recovered {recovered} tokens committed by an interrupted merge.")
+        try:
+            shards = load_manifests(manifest_dir, chain)
+        except ManifestError as e:
+            print(f"[{chain.name}] FATAL: {e}")
+            return 0
+
+        # Drop anything a recovered transaction already committed.
+        batches = [
+            (block_number, [update for update in updates if store.needs_update(chain.name, *update[:3])])
+            for block_number, updates in shards
+        ]
+        total = sum(len(updates) for _, updates in batches)
+        print(f"[{chain.name}] Merged {len(shards)} shard manifests with {total} updates.")
+        if not total:
+            print(f"[{chain.name}] No NFTs were successfully processed for on-chain update.")
+            return 0
+
+        # recover() maps a mined transaction back to owners and stats through the journaled
+        # metadata uploads, so a merge that dies after broadcasting is not committed twice.
+        for _, updates in batches:
+            for token_id, owner, stats, ref in updates:
+                if journal.uploads(chain.name, token_id, owner, stats).get("metadata") != ref:
+                    journal.record_upload(chain.name, token_id, owner, stats, "metadata", ref)
+
+        timings = resources.timings[chain.name] = {}
+        committed = _commit_updates(chain, w3, contract, account, private_key, store, journal, batches, timings)
+        _report_timings(chain, timings)
+        return len(committed)
+    except Exception as e:
+        print(f"[{chain.name}] Error while merging: {e}")
+        return 0
+    finally:
+        store.close()
+        journal.close()
+
+
+def _run_chain_profiled(fn, chain, resources, **kwargs):
+    # cProfile and pyinstrument only see the thread they were started on.
+    with profiled(chain.name):
+        return fn(chain, resources, **kwargs)
+
+
+def run_chains(chain_names, private_key=None, shard=None, manifest_dir=None, merge=False):
+    """Updates every chain in ``chain_names`` concurrently with shared pools and caches.
+
+    ``shard`` limits each chain to one shard of its tokens and writes manifests
+    to ``manifest_dir``; ``merge=True`` instead commits the manifests found there.
+    """
+    private_key = private_key or os.getenv("PRIVATE_KEY")
+    if PUBLISH_MODE not in PUBLISH_MODES:
+        raise ValueError(f"Unknown PUBLISH_MODE {PUBLISH_MODE!r}; choose one of {', '.join(PUBLISH_MODES)}.")
+    parse_tiers(REFRESH_TIERS)
+    chains = [CHAINS[name] for name in chain_names]
+    resources = SharedResources(private_key)
+    manifest_dir = manifest_dir or SHARD_MANIFEST_DIR
+    if merge:
+        fn, kwargs = merge_chain, {"manifest_dir": manifest_dir}
+    elif shard is not None:
+        fn, kwargs = update_chain, {"shard": shard, "manifest_dir": manifest_dir}
+    else:
+        fn, kwargs = update_chain, {}
+    outcome = "written to the shard manifest" if shard is not None else "committed"
+    started = time.monotonic()
+    results = {}
+    if merge:
+        # Keep the owner index, upload cache and wallet ages the shards built, so the next shards start from them.
+        merge_state_snapshots(manifest_dir)
+
+    try:
+        # Each chain drives its own pipeline on its own thread; the heavy lifting
+        # happens in the shared render and upload pools.
+        with ThreadPoolExecutor(max_workers=len(chains), thread_name_prefix="chain") as executor:
+            futures = {chain.name: executor.submit(_run_chain_profiled, fn, chain, resources, **kwargs) for chain in chains}
+            for name, future in futures.items():
+                results[name] = future.result()
+    except KeyboardInterrupt:
+        print("\nInterrupted. Cancelling pending uploads...")
+        resources.cancel()
+        raise
+    finally:
+        resources.close()
+    if shard is not None:
+        print(f"Wrote the shard's state to {write_state_snapshot(manifest_dir, shard)} for the merge step.")
+
+    print(f"\n--- Finished {len(chains)} chain(s) in {time.monotonic() - started:.1f}s ---")
+    for name, count in results.items():
+        print(f"{name}: {count} NFTs {outcome}")
+    write_reports({
+        "shard": list(shard) if shard else None,
+        "merge": merge,
+        "chains": {
+            name: {"tokens": count, "stage_seconds": resources.timings.get(name, {})}
+            for name, count in results.items()
+        },
+    })
+    return results
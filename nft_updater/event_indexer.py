@@ -0,0 +1,164 @@
+"""Incremental tokenId -> owner index built from ERC-721 ``Transfer`` logs.
+
+Instead of calling ``ownerOf`` for every token on every run, the indexer scans
+``Transfer`` events in block-range chunks and keeps a checkpoint block plus the
+current owner of every token in the state database. Later runs only scan the
+blocks added since the checkpoint, and the tokens seen in those blocks (new
+mints and transfers) are returned as a cheap change signal.
+"""
+import os
+
+from nft_updater.chains import CHAINS
+from nft_updater.lean_rpc import to_checksum_address
+from nft_updater.state_store import STATE_DB_PATH, connect_state_db
+from nft_updater.telemetry import metrics
+
+# keccak256("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+# Blocks requested per eth_getLogs call; halved automatically when the node refuses a range.
+EVENT_CHUNK_SIZE = int(os.getenv("EVENT_CHUNK_SIZE", "5000"))
+# First block to scan on an empty index for chains without their own <CONTRACT>_START_BLOCK
+# (see ChainConfig.start_block). With neither set the first sync scans from genesis.
+INDEXER_START_BLOCK = os.getenv("INDEXER_START_BLOCK", "").strip()
+# Blocks kept behind the head to stay clear of reorgs.
+INDEXER_CONFIRMATIONS = int(os.getenv("INDEXER_CONFIRMATIONS", "0"))
+# Set USE_EVENT_INDEX=0 to go back to reading ownerOf for every token.
+USE_EVENT_INDEX = os.getenv("USE_EVENT_INDEX", "1").lower() not in ("0", "false", "no")
+
+
+def start_block(chain):
+    """First block to scan for ``chain`` on an empty index: the chain's deploy block, else INDEXER_START_BLOCK."""
+    config = CHAINS.get(chain)
+    if config is not None and config.start_block is not None:
+        return config.start_block
+    if INDEXER_START_BLOCK:
+        return int(INDEXER_START_BLOCK)
+    setting = config.contract_env.replace("_ADDRESS", "_START_BLOCK") if config is not None else "INDEXER_START_BLOCK"
+    print(f"Warning: [{chain}] No start block set, so the owner index scans Transfer logs from genesis. "
+          f"Set {setting} to the contract's deployment block.")
+    return 0
+
+
+def _topic_to_int(topic):
+    return int.from_bytes(bytes(topic), "big")
+
+
+def _topic_to_address(topic):
+    return to_checksum_address("0x" + bytes(topic)[-20:].hex())
+
+
+class OwnerIndex:
+    """Persistent owner map and scan checkpoint for one or more contracts."""
+
+    def __init__(self, path=None):
+        self.path = path or STATE_DB_PATH
+        # sync() runs on a worker thread while the pipeline reads owners from the loop thread.
+        self.conn = connect_state_db(self.path, check_same_thread=False)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS index_checkpoints (
+                chain TEXT NOT NULL,
+                contract TEXT NOT NULL,
+                last_block INTEGER NOT NULL,
+                PRIMARY KEY (chain, contract)
+            );
+            CREATE TABLE IF NOT EXISTS token_owners (
+                chain TEXT NOT NULL,
+                contract TEXT NOT NULL,
+                token_id INTEGER NOT NULL,
+                owner TEXT NOT NULL,
+                block_number INTEGER NOT NULL,
+                PRIMARY KEY (chain, contract, token_id)
+            );
+            """
+        )
+        self.conn.commit()
+
+    def checkpoint(self, chain, contract_address):
+        row = self.conn.execute(
+            "SELECT last_block FROM index_checkpoints WHERE chain = ? AND contract = ?",
+            (chain, contract_address.lower()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def owners(self, chain, contract_address, token_ids=None):
+        """Returns ``{token_id: owner}`` for all indexed tokens, or only for ``token_ids``."""
+        rows = self.conn.execute(
+            "SELECT token_id, owner FROM token_owners WHERE chain = ? AND contract = ?",
+            (chain, contract_address.lower()),
+        ).fetchall()
+        owners = dict(rows)
+        if token_ids is not None:
+            owners = {token_id: owners[token_id] for token_id in token_ids if token_id in owners}
+        return owners
+
+    def _get_logs(self, w3, contract_address, from_block, to_block):
+        with metrics.timer("get_logs_seconds"):
+            return w3.eth.get_logs({
+                "address": to_checksum_address(contract_address),
+                "topics": [TRANSFER_TOPIC],
+                "fromBlock": from_block,
+                "toBlock": to_block,
+            })
+
+    def sync(self, w3, chain, contract_address, to_block=None, chunk_size=None):
+        """Scans new Transfer logs up to ``to_block`` and returns the set of token IDs they touched."""
+        contract_key = contract_address.lower()
+        chunk_size = chunk_size or EVENT_CHUNK_SIZE
+        if to_block is None:
+            to_block = w3.eth.block_number
+        to_block -= INDEXER_CONFIRMATIONS
+
+        last_block = self.checkpoint(chain, contract_address)
+        from_block = start_block(chain) if last_block is None else last_block + 1
+        changed = set()
+        scanned = 0
+
+        while from_block <= to_block:
+            chunk_end = min(from_block + chunk_size - 1, to_block)
+            try:
+                logs = self._get_logs(w3, contract_address, from_block, chunk_end)
+            except Exception as e:
+                if chunk_size == 1:
+                    raise
+                # Most providers cap the block range or result size of eth_getLogs.
+                chunk_size = max(1, chunk_size // 2)
+                print(f"Warning: eth_getLogs failed for blocks {from_block}-{chunk_end} ({e}). Retrying with {chunk_size}-block chunks.")
+                continue
+
+            rows = []
+            for log in sorted(logs, key=lambda entry: (entry["blockNumber"], entry["logIndex"])):
+                topics = log["topics"]
+                if len(topics) != 4:
+                    continue
+                token_id = _topic_to_int(topics[3])
+                rows.append((token_id, _topic_to_address(topics[2]), log["blockNumber"]))
+                changed.add(token_id)
+
+            # Apply the chunk and move the checkpoint in one transaction so a crash never skips logs.
+            with self.conn:
+                for token_id, owner, block_number in rows:
+                    if owner == ZERO_ADDRESS:
+                        self.conn.execute(
+                            "DELETE FROM token_owners WHERE chain = ? AND contract = ? AND token_id = ?",
+                            (chain, contract_key, token_id),
+                        )
+                    else:
+                        self.conn.execute(
+                            "INSERT OR REPLACE INTO token_owners (chain, contract, token_id, owner, block_number) VALUES (?, ?, ?, ?, ?)",
+                            (chain, contract_key, token_id, owner, block_number),
+                        )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO index_checkpoints (chain, contract, last_block) VALUES (?, ?, ?)",
+                    (chain, contract_key, chunk_end),
+                )
+            scanned += chunk_end - from_block + 1
+            from_block = chunk_end + 1
+
+        print(f"Owner index: scanned {scanned} new blocks, {len(changed)} tokens minted or transferred.")
+        return changed
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,235 @@
+"""Follow mode: a long-running updater that reacts to new blocks.
+
+A scheduled run re-reads every token even though only a few holders have
+sent a transaction since the last one, and leaves the NFTs stale for hours in
+between. ``follow_chains`` instead does one full catch-up pass per chain and
+then keeps an in-memory map of holder address -> token IDs (from the
+Transfer-log owner index). Every ``FOLLOW_POLL_SECONDS`` it reads the new
+blocks in one JSON-RPC batch. Tokens of holders that sent a transaction in
+them, and tokens minted or transferred in them, are queued. The queue is
+committed through the normal update path once it holds
+``FOLLOW_BATCH_SIZE`` tokens or its oldest entry has waited
+``FOLLOW_MAX_LATENCY`` seconds, so updates still go out as few, large batches.
+"""
+import os
+import threading
+import time
+
+from nft_updater.chains import CHAINS
+from nft_updater.engine import SharedResources, _connect, update_chain
+from nft_updater.event_indexer import INDEXER_CONFIRMATIONS, OwnerIndex
+from nft_updater.publishing import PUBLISH_MODE, PUBLISH_MODES
+from nft_updater.refresh_tiers import REFRESH_TIERS, parse_tiers
+from nft_updater.rpc_batch import read_owners, rpc_calls
+from nft_updater.telemetry import metrics, write_reports
+
+# Seconds between polls for new blocks.
+FOLLOW_POLL_SECONDS = float(os.getenv("FOLLOW_POLL_SECONDS", "5"))
+# Longest a queued token waits before its batch is committed, in seconds.
+FOLLOW_MAX_LATENCY = float(os.getenv("FOLLOW_MAX_LATENCY", "300"))
+# Queued tokens that trigger a commit before the latency target is reached.
+FOLLOW_BATCH_SIZE = int(os.getenv("FOLLOW_BATCH_SIZE", "200"))
+# When more blocks than this arrived since the last poll, every token is
+# queued instead of reading the blocks; unchanged tokens are still skipped.
+FOLLOW_MAX_BLOCK_GAP = int(os.getenv("FOLLOW_MAX_BLOCK_GAP", "2000"))
+# Stop after this many seconds (0 runs until interrupted), e.g. to fit a CI job limit.
+FOLLOW_RUN_SECONDS = float(os.getenv("FOLLOW_RUN_SECONDS", "0"))
+
+
+class ChainFollower:
+    """Holder map, block cursor and update queue of one chain."""
+
+    def __init__(self, chain, resources):
+        self.chain = chain
+        self.resources = resources
+        self.w3 = None
+        self.contract = None
+        self.owner_index = OwnerIndex()
+        # lowercase holder address -> token IDs it owns, and the reverse.
+        self.holdings = {}
+        self.owners = {}
+        # token_id -> monotonic time it was first queued.
+        self.pending = {}
+        self.last_block = None
+        self.committed = 0
+
+    def start(self):
+        """Runs the catch-up update and builds the holder map. Returns False if the chain is unusable."""
+        connection = _connect(self.chain, self.resources.private_key)
+        if connection is None:
+            return False
+        self.w3, self.contract = connection
+        head = self.w3.eth.block_number
+        # Blocks from here on are scanned by poll(), so nothing the catch-up pass misses is lost.
+        self.committed += update_chain(self.chain, self.resources)
+
+        self.owner_index.sync(self.w3, self.chain.name, self.contract.address, head)
+        total_supply = self.contract.functions.totalSupply().call(block_identifier=head)
+        owners = self.owner_index.owners(self.chain.name, self.contract.address)
+        missing = [token_id for token_id in range(1, total_supply + 1) if token_id not in owners]
+        if missing:
+            # Tokens minted before INDEXER_START_BLOCK or inside the confirmation lag.
+            owners.update(read_owners(self.w3, self.contract, missing, block_number=head))
+        for token_id, owner in owners.items():
+            self._set_owner(token_id, owner)
+        self.last_block = head - INDEXER_CONFIRMATIONS
+        print(f"[{self.chain.name}] Following from block {self.last_block}: {len(self.holdings)} holders of {len(self.owners)} tokens.")
+        return True
+
+    def _set_owner(self, token_id, owner):
+        previous = self.owners.pop(token_id, None)
+        if previous is not None:
+            self.holdings[previous].discard(token_id)
+            if not self.holdings[previous]:
+                del self.holdings[previous]
+        if owner is not None:
+            owner = owner.lower()
+            self.owners[token_id] = owner
+            self.holdings.setdefault(owner, set()).add(token_id)
+
+    def queue(self, token_ids):
+        now = time.monotonic()
+        for token_id in token_ids:
+            self.pending.setdefault(token_id, now)
+        metrics.set("follow_pending_tokens", len(self.pending), chain=self.chain.name)
+
+    def _senders(self, from_block, to_block):
+        """Returns the lowercase senders of every transaction in ``from_block..to_block``."""
+        numbers = range(from_block, to_block + 1)
+        blocks = rpc_calls(self.w3, [("eth_getBlockByNumber", [hex(number), True]) for number in numbers])
+        failed = [number for number, block in zip(numbers, blocks) if block is None]
+        if failed:
+            raise RuntimeError(f"Could not read {len(failed)} blocks, starting at {failed[0]}")
+        metrics.count("follow_blocks_scanned_total", len(blocks), chain=self.chain.name)
+        return {
+            transaction["from"].lower()
+            for block in blocks
+            for transaction in block["transactions"]
+            if isinstance(transaction, dict) and transaction.get("from")
+        }
+
+    def poll(self):
+        """Reads the blocks added since the last poll and queues the tokens they affect."""
+        head = self.w3.eth.block_number
+        to_block = head - INDEXER_CONFIRMATIONS
+        if to_block <= self.last_block:
+            return
+        if to_block - self.last_block > FOLLOW_MAX_BLOCK_GAP:
+            print(f"[{self.chain.name}] {to_block - self.last_block} blocks behind; queueing every token instead of reading them.")
+            active = set(self.owners)
+        else:
+            senders = self._senders(self.last_block + 1, to_block)
+            active = {token_id for sender in senders & self.holdings.keys() for token_id in self.holdings[sender]}
+            metrics.count("follow_active_holders_total", len(senders & self.holdings.keys()), chain=self.chain.name)
+
+        # Mints and transfers change the token's owner, so they are re-rendered as well.
+        touched = self.owner_index.sync(self.w3, self.chain.name, self.contract.address, head)
+        if touched:
+            owners = self.owner_index.owners(self.chain.name, self.contract.address, touched)
+            for token_id in touched:
+                self._set_owner(token_id, owners.get(token_id))
+            active |= touched
+        self.last_block = to_block
+        if active:
+            self.queue(active)
+            print(f"[{self.chain.name}] Block {to_block}: queued {len(active)} tokens ({len(self.pending)} pending).")
+
+    def due(self):
+        if not self.pending:
+            return False
+        waited = time.monotonic() - min(self.pending.values())
+        return len(self.pending) >= FOLLOW_BATCH_SIZE or waited >= FOLLOW_MAX_LATENCY
+
+    def flush(self):
+        """Updates and commits every queued token. Returns the number committed."""
+        if not self.pending:
+            return 0
+        token_ids = sorted(self.pending)
+        waited = time.monotonic() - min(self.pending.values())
+        self.pending = {}
+        metrics.set("follow_pending_tokens", 0, chain=self.chain.name)
+        metrics.observe("follow_queue_seconds", waited, chain=self.chain.name)
+        print(f"[{self.chain.name}] Updating {len(token_ids)} queued tokens (oldest waited {waited:.0f}s).")
+        committed = update_chain(self.chain, self.resources, token_ids=token_ids)
+        self.committed += committed
+        metrics.count("follow_tokens_committed_total", committed, chain=self.chain.name)
+        return committed
+
+    def close(self):
+        self.owner_index.close()
+
+
+def follow_chain(chain, resources, stop):
+    """Follows ``chain`` until ``stop`` is set. Returns the number of tokens committed."""
+    follower = ChainFollower(chain, resources)
+    try:
+        if not follower.start():
+            return 0
+        while not stop.is_set():
+            try:
+                follower.poll()
+            except Exception as e:
+                print(f"[{chain.name}] Warning: Could not read new blocks, retrying. Error: {e}")
+            if follower.due():
+                follower.flush()
+                write_reports({"follow": True, "chains": {chain.name: {"tokens": follower.committed}}})
+            stop.wait(FOLLOW_POLL_SECONDS)
+        # Commit what is still queued before shutting down.
+        follower.flush()
+        return follower.committed
+    except Exception as e:
+        print(f"[{chain.name}] Error while following: {e}")
+        return follower.committed
+    finally:
+        follower.close()
+
+
+def follow_chains(chain_names, private_key=None, run_seconds=None):
+    """Follows every chain in ``chain_names`` on its own thread with shared pools and caches.
+
+    Runs until interrupted, or for ``run_seconds`` (default ``FOLLOW_RUN_SECONDS``) when non-zero.
+    """
+    private_key = private_key or os.getenv("PRIVATE_KEY")
+    if PUBLISH_MODE not in PUBLISH_MODES:
+        raise ValueError(f"Unknown PUBLISH_MODE {PUBLISH_MODE!r}; choose one of {', '.join(PUBLISH_MODES)}.")
+    parse_tiers(REFRESH_TIERS)
+    run_seconds = FOLLOW_RUN_SECONDS if run_seconds is None else run_seconds
+    chains = [CHAINS[name] for name in chain_names]
+    resources = SharedResources(private_key)
+    stop = threading.Event()
+    results = {}
+
+    def run(chain):
+        results[chain.name] = follow_chain(chain, resources, stop)
+
+    threads = [threading.Thread(target=run, args=(chain,), name=f"follow-{chain.name}") for chain in chains]
+    for thread in threads:
+        thread.start()
+    try:
+        # Wait with a timeout so Ctrl+C reaches this thread.
+        deadline = time.monotonic() + run_seconds if run_seconds else None
+        while any(thread.is_alive() for thread in threads):
+            if deadline is not None and time.monotonic() >= deadline:
+                print("\nRun time limit reached. Committing queued tokens and stopping...")
+                stop.set()
+                deadline = None
+            for thread in threads:
+                thread.join(timeout=1)
+    except KeyboardInterrupt:
+        print("\nInterrupted. Committing queued tokens and stopping...")
+        stop.set()
+        try:
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            print("\nInterrupted again. Cancelling pending uploads...")
+            resources.cancel()
+            raise
+    finally:
+        stop.set()
+        resources.close()
+
+    for name, count in results.items():
+        print(f"{name}: {count} NFTs committed while following")
+    write_reports({"follow": True, "chains": {name: {"tokens": count} for name, count in results.items()}})
+    return results
@@ -0,0 +1,82 @@
+"""Image encoders for rendered token images.
+
+Upload time to 0G storage and Pinata grows with the bytes of every image, and
+Pillow's default PNG settings leave a lot on the table for art that is a flat
+or gradient background with a handful of text colours. The encoders here
+trade encode time for size; ``benchmarks/bench_encode.py`` measures both so
+each backend can pick its own with IMAGE_ENCODING or IMAGE_ENCODING_<BACKEND>
+(e.g. IMAGE_ENCODING_PINATA=webp-lossless).
+
+- ``png``: Pillow defaults, byte-identical to the original scripts.
+- ``png-optimized``: lossless PNG with zlib level 9 and Pillow's optimize pass.
+- ``png-palette``: quantized to at most PNG_PALETTE_COLORS colours, zlib level 9.
+- ``webp-lossless``: lossless WebP; WEBP_LOSSLESS_EFFORT trades time for size.
+- ``webp``: lossy WebP at WEBP_QUALITY, visually lossless at the default 90.
+"""
+import io
+import os
+
+PNG_PALETTE_COLORS = int(os.getenv("PNG_PALETTE_COLORS", "256"))
+WEBP_QUALITY = int(os.getenv("WEBP_QUALITY", "90"))
+# 0-100 compression effort for lossless WebP; past ~50 it costs 2-3x the time for a few percent.
+WEBP_LOSSLESS_EFFORT = int(os.getenv("WEBP_LOSSLESS_EFFORT", "50"))
+# 0 (fast) to 6 (smallest) for WebP; 6 is an order of magnitude slower for no gain on this art.
+WEBP_METHOD = int(os.getenv("WEBP_METHOD", "4"))
+
+DEFAULT_ENCODING = "png"
+
+# encoding -> (file extension, MIME type)
+ENCODINGS = {
+    "png": ("png", "image/png"),
+    "png-optimized": ("png", "image/png"),
+    "png-palette": ("png", "image/png"),
+    "webp-lossless": ("webp", "image/webp"),
+    "webp": ("webp", "image/webp"),
+}
+
+
+def encoding_for(backend):
+    """The encoding configured for a storage backend, e.g. IMAGE_ENCODING_0G_STORAGE, else IMAGE_ENCODING."""
+    variable = "IMAGE_ENCODING_" + backend.upper().replace("-", "_")
+    encoding = (os.getenv(variable) or os.getenv("IMAGE_ENCODING") or DEFAULT_ENCODING).lower()
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown image encoding {encoding!r}; choose one of {', '.join(ENCODINGS)}.")
+    return encoding
+
+
+def extension(encoding):
+    return ENCODINGS[encoding][0]
+
+
+def mime_type(filename):
+    """The Content-Type of an uploaded file, from its extension: an image encoding's, or JSON metadata."""
+    suffix = filename.rsplit(".", 1)[-1].lower()
+    if suffix == "json":
+        return "application/json"
+    for file_extension, mime in ENCODINGS.values():
+        if file_extension == suffix:
+            return mime
+    return "application/octet-stream"
+
+
+def encode_image(img, encoding=DEFAULT_ENCODING):
+    """Encodes a PIL image and returns the bytes."""
+    from PIL import Image  # Only needed here; keeps Pillow out of runs that render nothing.
+
+    buffer = io.BytesIO()
+    if encoding == "png":
+        img.save(buffer, format="PNG")
+    elif encoding == "png-optimized":
+        img.save(buffer, format="PNG", optimize=True, compress_level=9)
+    elif encoding == "png-palette":
+        # No dithering: it would speckle the gradient and defeat PNG's filters. The octree
+        # quantizer is both faster and, on this art, smaller than median cut.
+        paletted = img.quantize(PNG_PALETTE_COLORS, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+        paletted.save(buffer, format="PNG", compress_level=9)
+    elif encoding == "webp-lossless":
+        img.save(buffer, format="WEBP", lossless=True, quality=WEBP_LOSSLESS_EFFORT, method=WEBP_METHOD)
+    elif encoding == "webp":
+        img.save(buffer, format="WEBP", quality=WEBP_QUALITY, method=WEBP_METHOD)
+    else:
+        raise ValueError(f"Unknown image encoding {encoding!r}")
+    return buffer.getvalue()
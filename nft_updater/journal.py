@@ -0,0 +1,200 @@
+"""Append-only journal of uploads and submitted transactions for crash-safe runs.
+
+Every completed image or metadata upload is written to the journal as soon as
+it finishes, together with the owner and stats it was rendered for, and every
+batch transaction is journaled when it is sent and again when its receipt
+arrives. A run that dies before its final commit (a crash, a CI timeout, a
+failed gas estimate) therefore loses nothing: the next run first settles the
+transactions the previous one left behind, recording the mined ones in the
+state store, and then reuses the journaled uploads for any token whose owner
+and stats still match instead of rendering and uploading it again.
+
+Rows are only ever inserted while a run is in flight; entries for tokens that
+have been committed are pruned once the state store has recorded them.
+"""
+import json
+import threading
+import time
+
+from nft_updater.state_store import STATE_DB_PATH, _encode_stats, connect_state_db
+from nft_updater.telemetry import metrics
+
+TX_SENT = "sent"
+TX_CONFIRMED = "confirmed"
+TX_REVERTED = "reverted"
+# Never mined, and its nonce has since been used by another transaction.
+TX_DROPPED = "dropped"
+
+
+class UploadJournal:
+    """SQLite-backed journal shared by the pipeline's worker threads."""
+
+    def __init__(self, path=None):
+        self.path = path or STATE_DB_PATH
+        self.conn = connect_state_db(self.path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS journal_uploads (
+                chain TEXT NOT NULL,
+                token_id INTEGER NOT NULL,
+                owner TEXT NOT NULL,
+                stats TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                ref TEXT NOT NULL,
+                created_at INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS journal_uploads_token ON journal_uploads (chain, token_id);
+            CREATE TABLE IF NOT EXISTS journal_transactions (
+                chain TEXT NOT NULL,
+                tx_hash TEXT NOT NULL,
+                event TEXT NOT NULL,
+                nonce INTEGER,
+                token_ids TEXT NOT NULL,
+                refs TEXT NOT NULL,
+                block_number INTEGER,
+                created_at INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS journal_transactions_hash ON journal_transactions (chain, tx_hash);
+            """
+        )
+        self.conn.commit()
+
+    def _insert(self, sql, row):
+        with self.lock:
+            self.conn.execute(sql, row)
+            self.conn.commit()
+
+    # --- Uploads ---
+
+    def record_upload(self, chain, token_id, owner, stats, kind, ref):
+        """Journals a finished ``kind`` ("image" or "metadata") upload for a token."""
+        self._insert(
+            "INSERT INTO journal_uploads (chain, token_id, owner, stats, kind, ref, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (chain, token_id, owner, _encode_stats(stats), kind, ref, int(time.time())),
+        )
+
+    def uploads(self, chain, token_id, owner, stats):
+        """Returns ``{kind: ref}`` of the latest journaled uploads made for exactly this owner and stats."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT kind, ref FROM journal_uploads WHERE chain = ? AND token_id = ? AND owner = ? AND stats = ? ORDER BY rowid",
+                (chain, token_id, owner, _encode_stats(stats)),
+            ).fetchall()
+        return dict(rows)
+
+    # --- Transactions ---
+
+    def record_transaction(self, chain, tx_hash, nonce, token_ids, refs):
+        self._insert(
+            "INSERT INTO journal_transactions (chain, tx_hash, event, nonce, token_ids, refs, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (chain, tx_hash, TX_SENT, nonce, json.dumps(list(token_ids)), json.dumps(list(refs)), int(time.time())),
+        )
+
+    def record_outcome(self, chain, tx_hash, event, block_number=None):
+        """Journals how a transaction settled: TX_CONFIRMED, TX_REVERTED or TX_DROPPED."""
+        self._insert(
+            """
+            INSERT INTO journal_transactions (chain, tx_hash, event, nonce, token_ids, refs, block_number, created_at)
+            SELECT chain, tx_hash, ?, nonce, token_ids, refs, ?, ? FROM journal_transactions
+            WHERE chain = ? AND tx_hash = ? AND event = ? LIMIT 1
+            """,
+            (event, block_number, int(time.time()), chain, tx_hash, TX_SENT),
+        )
+
+    def unsettled_transactions(self, chain):
+        """Returns ``[(tx_hash, nonce, token_ids, refs)]`` for sent transactions without a journaled receipt."""
+        with self.lock:
+            rows = self.conn.execute(
+                """
+                SELECT tx_hash, nonce, token_ids, refs FROM journal_transactions AS sent
+                WHERE chain = ? AND event = ? AND NOT EXISTS (
+                    SELECT 1 FROM journal_transactions AS settled
+                    WHERE settled.chain = sent.chain AND settled.tx_hash = sent.tx_hash AND settled.event != ?
+                )
+                ORDER BY nonce
+                """,
+                (chain, TX_SENT, TX_SENT),
+            ).fetchall()
+        return [(tx_hash, nonce, json.loads(token_ids), json.loads(refs)) for tx_hash, nonce, token_ids, refs in rows]
+
+    def recover(self, w3, chain, store, sender, receipt_timeout=0):
+        """Settles the transactions a previous run left unconfirmed. Returns the number of tokens recovered.
+
+        Mined transactions have their tokens recorded in ``store`` from the
+        journaled owner and stats, so they are not committed twice. Reverted
+        and dropped ones are journaled as such; their uploads stay in the
+        journal for reuse. Transactions still pending after ``receipt_timeout``
+        seconds are left for a later run.
+        """
+        unsettled = self.unsettled_transactions(chain)
+        if not unsettled:
+            return 0
+        mined_nonce = w3.eth.get_transaction_count(sender, "latest")
+        recovered = []
+        for tx_hash, nonce, token_ids, refs in unsettled:
+            try:
+                if receipt_timeout:
+                    receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=receipt_timeout)
+                else:
+                    receipt = w3.eth.get_transaction_receipt(tx_hash)
+            except Exception as e:
+                if nonce is not None and nonce < mined_nonce:
+                    # Another transaction took this nonce, so this one can never be mined.
+                    print(f"Journaled transaction {tx_hash} (nonce {nonce}) was never mined; its tokens will be committed again.")
+                    self.record_outcome(chain, tx_hash, TX_DROPPED)
+                else:
+                    print(f"Warning: Journaled transaction {tx_hash} (nonce {nonce}) has no receipt yet: {e}")
+                continue
+            if receipt.status != 1:
+                print(f"Journaled transaction {tx_hash} reverted; its tokens will be committed again.")
+                self.record_outcome(chain, tx_hash, TX_REVERTED, receipt.blockNumber)
+                continue
+
+            updates = []
+            for token_id, ref in zip(token_ids, refs):
+                with self.lock:
+                    row = self.conn.execute(
+                        """
+                        SELECT owner, stats FROM journal_uploads
+                        WHERE chain = ? AND token_id = ? AND kind = 'metadata' AND ref = ?
+                        ORDER BY rowid DESC LIMIT 1
+                        """,
+                        (chain, token_id, ref),
+                    ).fetchone()
+                if row is not None:
+                    updates.append((token_id, row[0], json.loads(row[1]), ref))
+            store.record_many(chain, updates, receipt.blockNumber)
+            self.record_outcome(chain, tx_hash, TX_CONFIRMED, receipt.blockNumber)
+            recovered.extend(update[0] for update in updates)
+            print(f"Recovered {len(updates)} committed tokens from journaled transaction {tx_hash}.")
+        if recovered:
+            self.prune(chain, recovered)
+            metrics.count("journal_recovered_tokens_total", len(recovered), chain=chain)
+        return len(recovered)
+
+    # --- Housekeeping ---
+
+    def prune(self, chain, token_ids):
+        """Drops upload entries for committed tokens and fully settled transactions."""
+        token_ids = list(token_ids)
+        with self.lock:
+            for start in range(0, len(token_ids), 500):
+                chunk = token_ids[start:start + 500]
+                self.conn.execute(
+                    f"DELETE FROM journal_uploads WHERE chain = ? AND token_id IN ({','.join('?' * len(chunk))})",
+                    (chain, *chunk),
+                )
+            self.conn.execute(
+                """
+                DELETE FROM journal_transactions
+                WHERE chain = ? AND tx_hash IN (
+                    SELECT tx_hash FROM journal_transactions WHERE chain = ? AND event != ?
+                )
+                """,
+                (chain, chain, TX_SENT),
+            )
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,158 @@
+"""Lean JSON-RPC client for the update's read path.
+
+Importing web3 costs well over a second before the first request is sent
+(eth_account alone pulls in py_ecc, which precomputes curve tables at import
+time), and building a contract from the inline ABI adds more. A run where
+nothing changed only needs ``totalSupply``, ``ownerOf``, nonces, blocks and
+Transfer logs, so the read path uses this client instead: precomputed
+selectors, hand-rolled decoding of the few ``uint256``/``address`` results and
+the chain's endpoint pool (rpc_pool.py), shared with the batched reads in
+rpc_batch.py.
+
+``LeanWeb3`` and ``LeanContract`` mirror the small part of the web3 API the
+read helpers use (``w3.eth.block_number``, ``w3.eth.get_transaction_count``,
+``w3.eth.get_logs``, ``w3.provider``, ``w3.to_checksum_address`` and
+``contract.functions.totalSupply()/ownerOf(id).call()``), so the same helpers
+work with either. web3 itself is only imported when something is committed.
+"""
+import re
+
+from eth_hash.auto import keccak
+
+from nft_updater.rpc_pool import pool_for
+
+# keccak256("totalSupply()")[:4]
+TOTAL_SUPPLY_SELECTOR = "0x18160ddd"
+# keccak256("ownerOf(uint256)")[:4]
+OWNER_OF_SELECTOR = "0x6352211e"
+
+_ADDRESS_PATTERN = re.compile(r"^(0x)?[0-9a-fA-F]{40}$")
+
+
+class RpcError(Exception):
+    """Raised when the node answers a call with a JSON-RPC error."""
+
+
+def to_checksum_address(address):
+    """EIP-55 checksum form of a hex address."""
+    if not _ADDRESS_PATTERN.match(address):
+        raise ValueError(f"Not a hex address: {address!r}")
+    lower = address.lower().removeprefix("0x")
+    digest = keccak(lower.encode("ascii")).hex()
+    return "0x" + "".join(char.upper() if int(nibble, 16) >= 8 else char for char, nibble in zip(lower, digest))
+
+
+def _block_tag(block_identifier):
+    if block_identifier is None:
+        return "latest"
+    return hex(block_identifier) if isinstance(block_identifier, int) else block_identifier
+
+
+def _decode_int(value):
+    return int(value, 16) if isinstance(value, str) else value
+
+
+class LeanProvider:
+    """Sends single JSON-RPC requests through an endpoint pool."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.endpoint_uri = pool.url
+
+    def make_request(self, method, params):
+        return self.pool.request(method, params)
+
+
+class _LeanEth:
+    def __init__(self, provider):
+        self.provider = provider
+
+    def _request(self, method, params):
+        reply = self.provider.make_request(method, params)
+        if "error" in reply:
+            raise RpcError(f"{method} failed: {reply['error']}")
+        return reply.get("result")
+
+    @property
+    def block_number(self):
+        return int(self._request("eth_blockNumber", []), 16)
+
+    def get_transaction_count(self, address, block_identifier="latest"):
+        return int(self._request("eth_getTransactionCount", [address, _block_tag(block_identifier)]), 16)
+
+    def call(self, transaction, block_identifier="latest"):
+        return self._request("eth_call", [transaction, _block_tag(block_identifier)])
+
+    def get_logs(self, log_filter):
+        """Returns the logs with integer block numbers and indexes and ``bytes`` topics, as web3 does."""
+        params = dict(log_filter)
+        for key in ("fromBlock", "toBlock"):
+            if key in params:
+                params[key] = _block_tag(params[key])
+        logs = self._request("eth_getLogs", [params]) or []
+        return [
+            {
+                **log,
+                "blockNumber": _decode_int(log["blockNumber"]),
+                "logIndex": _decode_int(log["logIndex"]),
+                "topics": [bytes.fromhex(topic[2:]) for topic in log["topics"]],
+            }
+            for log in logs
+        ]
+
+
+class LeanWeb3:
+    """Read-only stand-in for ``Web3`` over one or more JSON-RPC endpoints (see rpc_pool.py)."""
+
+    to_checksum_address = staticmethod(to_checksum_address)
+
+    def __init__(self, rpc_url):
+        self.provider = LeanProvider(pool_for(rpc_url))
+        self.eth = _LeanEth(self.provider)
+
+    def is_connected(self):
+        """Health-checks every endpoint; True if any of them answered."""
+        return self.provider.pool.check()
+
+
+class _ContractCall:
+    def __init__(self, eth, address, data, decode):
+        self.eth = eth
+        self.address = address
+        self.data = data
+        self.decode = decode
+
+    def call(self, block_identifier="latest"):
+        return self.decode(self.eth.call({"to": self.address, "data": self.data}, block_identifier))
+
+
+def _decode_uint(result):
+    if not result or result == "0x":
+        raise RpcError("Empty result from contract call")
+    return int(result, 16)
+
+
+def _decode_address(result):
+    if not result or len(result) < 66:
+        raise RpcError("Empty result from contract call")
+    return to_checksum_address("0x" + result[-40:])
+
+
+class _ContractFunctions:
+    def __init__(self, eth, address):
+        self._eth = eth
+        self._address = address
+
+    def totalSupply(self):
+        return _ContractCall(self._eth, self._address, TOTAL_SUPPLY_SELECTOR, _decode_uint)
+
+    def ownerOf(self, token_id):
+        return _ContractCall(self._eth, self._address, OWNER_OF_SELECTOR + format(token_id, "064x"), _decode_address)
+
+
+class LeanContract:
+    """The read-only calls of WalletStatusNFT (either variant) without an ABI."""
+
+    def __init__(self, w3, address):
+        self.address = to_checksum_address(address)
+        self.functions = _ContractFunctions(w3.eth, self.address)
@@ -0,0 +1,188 @@
+"""Connection-pooled, concurrent uploader for the Pinata pinning API.
+
+All uploads share one ``requests.Session`` whose connection pool is sized to
+the worker pool, so files are sent over kept-alive connections instead of a
+fresh TLS handshake per file. Every request has a timeout, and rate-limit
+(429) and server (5xx) responses are retried with exponential backoff.
+Directory uploads stream their files from disk instead of building the
+multipart body in memory.
+"""
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from nft_updater.image_encoding import mime_type
+from nft_updater.telemetry import metrics
+
+# Maximum number of uploads (and pooled connections) in flight at once.
+PINATA_CONCURRENCY = int(os.getenv("PINATA_CONCURRENCY", "8"))
+# Seconds to wait for Pinata to accept a file before giving up on the attempt.
+PINATA_TIMEOUT = float(os.getenv("PINATA_TIMEOUT", "60"))
+# Number of retries after the first attempt for 429/5xx and connection errors.
+PINATA_MAX_RETRIES = int(os.getenv("PINATA_MAX_RETRIES", "5"))
+# Base delay in seconds for the exponential backoff between retries.
+PINATA_BACKOFF_BASE = float(os.getenv("PINATA_BACKOFF_BASE", "1.0"))
+# Upper bound for a single backoff delay, in seconds.
+PINATA_BACKOFF_MAX = float(os.getenv("PINATA_BACKOFF_MAX", "60"))
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Bytes read from a file per block while streaming a directory upload.
+STREAM_BLOCK_SIZE = 1024 * 1024
+
+
+class MultipartFileStream:
+    """A ``multipart/form-data`` body whose file parts are read from disk while it is sent.
+
+    Given ``files=``, requests encodes the whole body in memory first. This
+    object has a known length instead, so requests sends it with a
+    Content-Length header and reads it one block at a time; no more than one
+    file is open at once.
+    """
+
+    def __init__(self, parts):
+        """``parts`` are ``(part filename, path, content type)`` triples, all sent as the ``file`` field."""
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        # Each segment is either literal bytes or the path of a file to stream.
+        self._segments = []
+        for part_filename, path, content_type in parts:
+            header = (
+                f"--{self.boundary}\r\n"
+                f'Content-Disposition: form-data; name="file"; filename="{part_filename}"\r\n'
+                f"Content-Type: {content_type}\r\n\r\n"
+            )
+            self._segments += [header.encode(), path, b"\r\n"]
+        self._segments.append(f"--{self.boundary}--\r\n".encode())
+        self.len = sum(
+            len(segment) if isinstance(segment, bytes) else os.path.getsize(segment) for segment in self._segments
+        )
+        self._index = 0
+        self._file = None
+
+    def __len__(self):
+        return self.len
+
+    def __iter__(self):
+        while True:
+            block = self.read(STREAM_BLOCK_SIZE)
+            if not block:
+                return
+            yield block
+
+    def read(self, size=-1):
+        """Returns up to ``size`` bytes of the body (the rest of it when ``size`` is negative)."""
+        chunks, wanted = [], size
+        while self._index < len(self._segments) and wanted != 0:
+            segment = self._segments[self._index]
+            if isinstance(segment, bytes):
+                chunk = segment if wanted < 0 else segment[:wanted]
+                remainder = segment[len(chunk):]
+                if remainder:
+                    self._segments[self._index] = remainder
+                else:
+                    self._index += 1
+            else:
+                if self._file is None:
+                    self._file = open(segment, "rb")
+                chunk = self._file.read(wanted if wanted > 0 else -1)
+                if not chunk or wanted < 0 or len(chunk) < wanted:
+                    self._file.close()
+                    self._file = None
+                    self._index += 1
+            chunks.append(chunk)
+            if wanted > 0:
+                wanted -= len(chunk)
+        return b"".join(chunks)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class PinataUploader:
+    """Uploads files to Pinata over a shared session with a bounded worker pool."""
+
+    def __init__(self, api_key, api_secret, base_url="https://api.pinata.cloud/",
+                 concurrency=None, timeout=None, max_retries=None):
+        self.url = f"{base_url}pinning/pinFileToIPFS"
+        self.concurrency = concurrency or PINATA_CONCURRENCY
+        self.timeout = timeout or PINATA_TIMEOUT
+        self.max_retries = PINATA_MAX_RETRIES if max_retries is None else max_retries
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "pinata_api_key": api_key or "",
+            "pinata_secret_api_key": api_secret or "",
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # Worker pool used by the scripts to run per-token upload jobs concurrently.
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="pinata")
+
+    def _backoff_delay(self, attempt, response=None):
+        """Returns the delay before the next attempt, honouring Retry-After when given."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), PINATA_BACKOFF_MAX)
+        delay = PINATA_BACKOFF_BASE * (2 ** attempt)
+        return min(delay + random.uniform(0, delay / 2), PINATA_BACKOFF_MAX)
+
+    def upload_bytes(self, name, data):
+        """Uploads an in-memory file and returns its CID, or None if every attempt failed."""
+        return self._pin(name, lambda: {"files": {"file": (name, data, mime_type(name))}})
+
+    def upload_directory(self, name, files):
+        """Pins ``files`` (``(filename, path)`` pairs) as one directory and returns the directory's CID.
+
+        Pinata wraps the files in a directory when every part's filename
+        starts with the same folder, so ``<CID>/<filename>`` resolves to each file.
+        The files are streamed from disk, and re-read from the start on a retry.
+        """
+        def request():
+            body = MultipartFileStream([(f"{name}/{filename}", path, mime_type(filename)) for filename, path in files])
+            return {"data": body, "headers": {"Content-Type": body.content_type}}
+
+        return self._pin(f"{name}/ ({len(files)} files)", request)
+
+    def _pin(self, label, build_request):
+        """Posts to pinFileToIPFS with the ``build_request()`` arguments, with retries. Returns the CID, or None."""
+        for attempt in range(self.max_retries + 1):
+            response = None
+            request = build_request()
+            try:
+                response = self.session.post(self.url, timeout=self.timeout, **request)
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    raise requests.exceptions.HTTPError(f"{response.status_code} from Pinata", response=response)
+                response.raise_for_status()
+                cid = response.json()["IpfsHash"]
+                print(f"Successfully uploaded {label} to IPFS. CID: {cid}")
+                return cid
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.HTTPError) as e:
+                retryable = response is None or response.status_code in RETRYABLE_STATUS_CODES
+                if not retryable or attempt == self.max_retries:
+                    print(f"Error uploading {label} to Pinata: {e}")
+                    return None
+                delay = self._backoff_delay(attempt, response)
+                metrics.count("upload_retries_total", backend="pinata")
+                print(f"Warning: Upload of {label} failed ({e}). Retrying in {delay:.1f}s...")
+                time.sleep(delay)
+            except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+                print(f"Error uploading {label} to Pinata: {e}")
+                return None
+            finally:
+                if "data" in request:
+                    request["data"].close()
+        return None
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
@@ -0,0 +1,263 @@
+"""Asyncio streaming pipeline for the token update job.
+
+Tokens flow through bounded queues from an RPC producer to a render stage and
+then to the image and metadata upload stages, so network and CPU work overlap.
+Each queue holds at most ``PIPELINE_QUEUE_SIZE`` items, so a slow stage applies
+backpressure to the stages before it and memory stays flat whatever the total
+supply is. Only the small per-token results needed for the on-chain commit are
+kept until the end.
+"""
+import asyncio
+import inspect
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from nft_updater.render_settings import RENDER_WORKERS
+from nft_updater.rpc_batch import DEFAULT_BATCH_SIZE, read_owners, read_owners_and_tx_counts, read_tx_counts
+
+# Maximum number of items waiting between two stages.
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "32"))
+# Concurrent renders in flight (each hands off to the render process pool).
+PIPELINE_RENDER_CONCURRENCY = int(os.getenv("PIPELINE_RENDER_CONCURRENCY", str(RENDER_WORKERS)))
+# Concurrent uploads per upload stage; defaults to the uploader's own pool size.
+PIPELINE_UPLOAD_CONCURRENCY = int(os.getenv("PIPELINE_UPLOAD_CONCURRENCY", "0"))
+
+_DONE = object()
+
+
+class Stage:
+    """One pipeline step: ``fn(item)`` runs on ``concurrency`` workers.
+
+    ``fn`` may be a coroutine function or a blocking function, which then runs
+    on ``executor``. Returning None drops the item. ``busy_seconds`` sums the
+    time spent in ``fn`` across all workers.
+    """
+
+    def __init__(self, name, fn, concurrency, executor=None, owns_executor=False):
+        self.name = name
+        self.fn = fn
+        self.concurrency = max(1, concurrency)
+        self.executor = executor
+        self.owns_executor = owns_executor
+        self.busy_seconds = 0.0
+
+    async def call(self, item):
+        started = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(self.fn):
+                return await self.fn(item)
+            return await asyncio.get_running_loop().run_in_executor(self.executor, self.fn, item)
+        finally:
+            self.busy_seconds += time.perf_counter() - started
+
+    def close(self):
+        if self.owns_executor and self.executor is not None:
+            self.executor.shutdown(wait=True)
+
+
+async def run_pipeline(source, stages, sink, queue_size=None):
+    """Streams items from the async iterator ``source`` through ``stages`` into ``sink(item)``."""
+    queue_size = queue_size or PIPELINE_QUEUE_SIZE
+    queues = [asyncio.Queue(maxsize=queue_size) for _ in stages]
+
+    async def produce():
+        async for item in source:
+            await queues[0].put(item)
+        for _ in range(stages[0].concurrency):
+            await queues[0].put(_DONE)
+
+    async def run_stage(index, stage):
+        inbox = queues[index]
+        outbox = queues[index + 1] if index + 1 < len(queues) else None
+
+        async def worker():
+            while True:
+                item = await inbox.get()
+                if item is _DONE:
+                    return
+                try:
+                    result = await stage.call(item)
+                except Exception as e:
+                    print(f"Error in {stage.name} stage: {e}")
+                    continue
+                if result is None:
+                    continue
+                if outbox is not None:
+                    await outbox.put(result)
+                else:
+                    sink(result)
+
+        await asyncio.gather(*(worker() for _ in range(stage.concurrency)))
+        if outbox is not None:
+            for _ in range(stages[index + 1].concurrency):
+                await outbox.put(_DONE)
+
+    await asyncio.gather(produce(), *(run_stage(i, stage) for i, stage in enumerate(stages)))
+
+
+async def changed_tokens(w3, contract, total_supply, store, chain_name, get_stats, batch_size=None,
+                         counters=None, owner_index=None, enrich=None, token_ids=None, schedule=None):
+    """Async producer yielding a job dict for every token whose owner or stats changed.
+
+    Owners and transaction counts are read one RPC batch at a time, all pinned
+    to the same block, so only one chunk of reads is held in memory at once.
+    With an ``owner_index`` the owners come from its Transfer-log index instead
+    of ``ownerOf`` calls, and only the nonces are read over RPC.
+    ``get_stats(owner, tx_counts)`` builds the script's stats dict for an owner;
+    it runs on a worker thread, once per distinct owner of a chunk.
+    ``enrich(addresses, tx_counts, block_number)``, when given, runs once per
+    chunk on a worker thread and returns extra stats per address.
+    ``token_ids`` restricts the scan to a subset (a shard) of ``1..total_supply``.
+    ``schedule`` (nft_updater.refresh_tiers.RefreshScheduler) narrows the scan
+    to the tokens due this run, hottest first, and ends it once its render
+    budget is spent.
+    ``counters`` (a dict) receives the pinned block number, the skip count
+    (and with a ``schedule`` the count of tokens not due),
+    the set of tokens minted or transferred since the last index sync and the
+    seconds spent on RPC reads.
+    """
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    counters = counters if counters is not None else {}
+    read_started = time.perf_counter()
+    block_number = await asyncio.to_thread(lambda: w3.eth.block_number)
+    counters["block_number"] = block_number
+    counters.setdefault("skipped_unchanged", 0)
+    counters.setdefault("read_seconds", 0.0)
+
+    indexed_owners = None
+    if owner_index is not None:
+        try:
+            counters["transferred_tokens"] = await asyncio.to_thread(
+                owner_index.sync, w3, chain_name, contract.address, block_number
+            )
+            indexed_owners = owner_index.owners(chain_name, contract.address)
+        except Exception as e:
+            print(f"Warning: Owner index sync failed, falling back to ownerOf reads. Error: {e}")
+
+    counters["read_seconds"] += time.perf_counter() - read_started
+
+    all_token_ids = token_ids if token_ids is not None else range(1, total_supply + 1)
+    if schedule is not None:
+        scanned = len(all_token_ids)
+        all_token_ids = schedule.select(all_token_ids, indexed_owners)
+        counters["not_due"] = scanned - len(all_token_ids)
+    for start in range(0, len(all_token_ids), batch_size):
+        token_ids = all_token_ids[start:start + batch_size]
+        read_started = time.perf_counter()
+        if indexed_owners is None:
+            _, owners, tx_counts = await asyncio.to_thread(
+                read_owners_and_tx_counts, w3, contract, token_ids, batch_size, block_number
+            )
+        else:
+            owners = {token_id: indexed_owners[token_id] for token_id in token_ids if token_id in indexed_owners}
+            missing = [token_id for token_id in token_ids if token_id not in owners]
+            if missing:
+                # Tokens minted before INDEXER_START_BLOCK or after the confirmation lag.
+                owners.update(await asyncio.to_thread(read_owners, w3, contract, missing, batch_size, block_number))
+            tx_counts = await asyncio.to_thread(
+                read_tx_counts, w3, sorted(set(owners.values())), batch_size, block_number
+            )
+        # get_stats falls back to a blocking RPC call for counts the batch missed, so keep it off the loop.
+        owner_stats = await asyncio.to_thread(
+            lambda: {owner: get_stats(owner, tx_counts) for owner in set(owners.values())}
+        )
+        extra_stats = {}
+        if enrich is not None:
+            extra_stats = await asyncio.to_thread(enrich, sorted(set(owners.values())), tx_counts, block_number)
+        counters["read_seconds"] += time.perf_counter() - read_started
+        for token_id in token_ids:
+            owner_address = owners.get(token_id)
+            if owner_address is None:
+                print(f"Skipping Token ID {token_id}: its owner could not be read.")
+                continue
+            stats = {**owner_stats[owner_address], **extra_stats.get(owner_address, {})}
+            changed = store.needs_update(chain_name, token_id, owner_address, stats)
+            if schedule is not None:
+                if changed and not schedule.admit(token_id):
+                    # The budget is spent; this and the remaining due tokens lead the next run.
+                    return
+                schedule.checked(token_id, changed)
+            if not changed:
+                counters["skipped_unchanged"] += 1
+                continue
+            yield {"token_id": token_id, "owner": owner_address, "stats": stats}
+
+
+def token_stages(generate_image, generate_metadata_json, upload_fn, upload_cache, upload_executor,
+                 upload_concurrency, render_concurrency=None, resume=None, on_uploaded=None,
+                 image_extension="png", bundle=None):
+    """Builds the render -> upload image -> build and upload metadata stages used by the scripts.
+
+    ``resume(job)`` may return ``{kind: ref}`` of uploads an earlier run already
+    made for the job's owner and stats; those steps are skipped.
+    ``on_uploaded(job, kind, ref)`` is called after every successful upload.
+    With a ``bundle`` (nft_updater.publishing.DirectoryBundle) changed tokens
+    are handed to it instead of being uploaded one by one; they are published
+    by ``bundle.publish`` after the pipeline has finished.
+    """
+    render_concurrency = render_concurrency or PIPELINE_RENDER_CONCURRENCY
+    upload_concurrency = PIPELINE_UPLOAD_CONCURRENCY or upload_concurrency
+    render_executor = ThreadPoolExecutor(max_workers=render_concurrency, thread_name_prefix="render")
+
+    def render(job):
+        if resume is not None:
+            journaled = resume(job)
+            if "metadata" in journaled:
+                job["json_ref"] = journaled["metadata"]
+            if "image" in journaled:
+                job["image_ref"] = journaled["image"]
+        if "image_ref" not in job:
+            job["image"] = generate_image(job["token_id"], job["stats"], job["owner"])
+        return job
+
+    def upload_image(job):
+        if "image_ref" in job:
+            return job
+        token_id = job["token_id"]
+        if bundle is not None and bundle.images:
+            bundle.add_image(job, f"{token_id}.{image_extension}", job.pop("image"))
+            return job
+        image_ref = upload_cache.upload(f"{token_id}.{image_extension}", job.pop("image"), upload_fn, kind="image")
+        if not image_ref:
+            print(f"Skipping Token ID {token_id} due to image upload failure.")
+            return None
+        if on_uploaded is not None:
+            on_uploaded(job, "image", image_ref)
+        job["image_ref"] = image_ref
+        return job
+
+    def upload_metadata(job):
+        token_id = job["token_id"]
+        if "json_ref" in job:
+            print(f"Resuming Token ID {token_id} from the journal: {job['json_ref']}")
+            return (token_id, job["owner"], job["stats"], job["json_ref"])
+        if bundle is not None:
+            bundle.add(job)
+            return None
+        json_bytes = generate_metadata_json(token_id, job["image_ref"], job["stats"], job["owner"])
+        json_ref = upload_cache.upload(f"{token_id}.json", json_bytes, upload_fn, kind="metadata")
+        if not json_ref:
+            print(f"Skipping Token ID {token_id} due to metadata upload failure.")
+            return None
+        if on_uploaded is not None:
+            on_uploaded(job, "metadata", json_ref)
+        return (token_id, job["owner"], job["stats"], json_ref)
+
+    return [
+        Stage("render", render, render_concurrency, render_executor, owns_executor=True),
+        Stage("image upload", upload_image, upload_concurrency, upload_executor),
+        Stage("metadata upload", upload_metadata, upload_concurrency, upload_executor),
+    ]
+
+
+def update_tokens(source, stages, queue_size=None):
+    """Runs the pipeline to completion and returns the (token_id, owner, stats, ref) results in token order."""
+    results = []
+    try:
+        asyncio.run(run_pipeline(source, stages, results.append, queue_size))
+    finally:
+        # Also on failure, e.g. an RPC error in the source, so the render threads are not leaked.
+        for stage in stages:
+            stage.close()
+    return sorted(results, key=lambda result: result[0])
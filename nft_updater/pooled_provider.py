@@ -0,0 +1,20 @@
+"""web3 provider that sends its requests through an RpcPool.
+
+Only the signer (engine._signer) builds a web3 instance, so this module, and
+web3 with it, is imported only by runs that commit.
+"""
+from web3.providers.base import JSONBaseProvider
+
+
+class PooledProvider(JSONBaseProvider):
+    """Routes web3's requests over the chain's endpoint pool (see rpc_pool.py)."""
+
+    def __init__(self, pool):
+        super().__init__()
+        self.pool = pool
+        # rpc_batch prefers ``pool``; this keeps code that expects a URL working.
+        self.endpoint_uri = pool.url
+
+    def make_request(self, method, params):
+        # Encoded by web3 so HexBytes and other web3 types serialize as usual.
+        return self.pool.post(self.encode_rpc_request(method, params), idempotent=method != "eth_sendRawTransaction")
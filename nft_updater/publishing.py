@@ -0,0 +1,206 @@
+"""Directory-mode publishing: one upload per run instead of one per token.
+
+In the default ``file`` mode every changed token's image and metadata JSON is
+uploaded on its own, two round-trips and two pins per token. With
+``PUBLISH_MODE=directory`` the pipeline instead collects a run's changed
+images in a scratch directory and publishes them as one directory upload,
+then writes every metadata JSON (pointing at ``<imageDirCID>/<tokenId>.png``)
+into a second directory and publishes that. Each token is then set on-chain
+as ``<metadataDirCID>/<tokenId>.json``, so a run costs two uploads and two
+pins whatever the number of changed tokens. A bundle larger than
+``PUBLISH_DIRECTORY_MAX_BYTES`` is split into several directories, each
+token pointing into the one its file went to.
+
+Runs with fewer than ``PUBLISH_DIRECTORY_MIN_TOKENS`` changed tokens still
+publish per file, so small incremental runs do not re-pin a directory for a
+handful of tokens. Files whose bytes were uploaded before are taken from the
+upload cache in either mode.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from nft_updater.artifacts import scratch_dir
+from nft_updater.telemetry import metrics
+
+# "file" uploads every image and JSON on its own; "directory" bundles them per run.
+PUBLISH_MODE = os.getenv("PUBLISH_MODE", "file").lower()
+# Also bundle the images into a directory; otherwise only the metadata JSON is bundled.
+PUBLISH_DIRECTORY_IMAGES = os.getenv("PUBLISH_DIRECTORY_IMAGES", "1").lower() in ("1", "true", "yes")
+# Runs with fewer changed tokens than this publish per file even in directory mode.
+PUBLISH_DIRECTORY_MIN_TOKENS = int(os.getenv("PUBLISH_DIRECTORY_MIN_TOKENS", "10"))
+# Bundles bigger than this many bytes are uploaded as several directories.
+PUBLISH_DIRECTORY_MAX_BYTES = int(os.getenv("PUBLISH_DIRECTORY_MAX_BYTES", str(100 * 1024 * 1024)))
+
+PUBLISH_MODES = ("file", "directory")
+
+
+class DirectoryBundle:
+    """Collects the changed tokens of one run on disk and publishes them as directory uploads.
+
+    The pipeline's upload stages call ``add_image`` and ``add`` from worker
+    threads; ``publish`` runs once the pipeline has drained.
+    """
+
+    def __init__(self, chain_name, backend, upload_cache, images=None, min_tokens=None, max_bytes=None):
+        self.chain_name = chain_name
+        self.backend = backend
+        self.upload_cache = upload_cache
+        self.images = PUBLISH_DIRECTORY_IMAGES if images is None else images
+        self.min_tokens = PUBLISH_DIRECTORY_MIN_TOKENS if min_tokens is None else min_tokens
+        self.max_bytes = PUBLISH_DIRECTORY_MAX_BYTES if max_bytes is None else max_bytes
+        self.root = tempfile.mkdtemp(prefix=f"{chain_name}-bundle-", dir=scratch_dir())
+        self._lock = threading.Lock()
+        # token_id -> job dict with "owner", "stats" and either "image_ref" or "image_name".
+        self._jobs = {}
+
+    def _path(self, kind, filename):
+        return os.path.join(self.root, kind, filename)
+
+    def _write(self, kind, filename, data):
+        path = self._path(kind, filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def _read(self, kind, filename):
+        with open(self._path(kind, filename), "rb") as f:
+            return f.read()
+
+    def add_image(self, job, filename, data):
+        """Takes the image from the upload cache or sets it aside for the image directory."""
+        image_ref = self.upload_cache.cached(filename, data, kind="image")
+        if image_ref:
+            job["image_ref"] = image_ref
+        else:
+            self._write("images", filename, data)
+            job["image_name"] = filename
+
+    def add(self, job):
+        """Queues a token whose metadata is built and published in ``publish``."""
+        with self._lock:
+            self._jobs[job["token_id"]] = job
+
+    def publish(self, generate_metadata_json, on_uploaded=None):
+        """Uploads everything collected and returns ``(token_id, owner, stats, ref)`` for every published token.
+
+        Tokens whose upload failed are left out, as in per-file mode.
+        """
+        jobs = [self._jobs[token_id] for token_id in sorted(self._jobs)]
+        if not jobs:
+            return []
+        started = time.perf_counter()
+        if len(jobs) < self.min_tokens:
+            print(f"[{self.chain_name}] Only {len(jobs)} changed tokens; publishing them per file.")
+            results = self._publish_per_file(jobs, generate_metadata_json, on_uploaded)
+        else:
+            results = self._publish_directories(jobs, generate_metadata_json, on_uploaded)
+        metrics.observe("publish_seconds", time.perf_counter() - started, chain=self.chain_name)
+        return results
+
+    def _split(self, kind, files):
+        """Groups ``files`` in order into runs of at most ``max_bytes``; a larger file gets a group of its own."""
+        groups, size = [[]], 0
+        for filename in files:
+            file_size = os.path.getsize(self._path(kind, filename))
+            if groups[-1] and size + file_size > self.max_bytes:
+                groups.append([])
+                size = 0
+            groups[-1].append(filename)
+            size += file_size
+        return groups
+
+    def _publish_directory(self, kind, files, cache_kind):
+        """Uploads ``files`` (filenames in the ``kind`` subdirectory) as one or more directories.
+
+        Returns ``{filename: ref}`` for the files whose directory was published.
+        """
+        groups = self._split(kind, files)
+        refs = {}
+        for number, group in enumerate(groups, 1):
+            name = f"{self.chain_name}-{kind}" if len(groups) == 1 else f"{self.chain_name}-{kind}-{number}"
+            paths = [(filename, self._path(kind, filename)) for filename in group]
+            with metrics.timer("upload_seconds", backend=self.backend.name, kind=f"{cache_kind} directory"):
+                directory_ref = self.backend.upload_directory(name, paths)
+            if not directory_ref:
+                metrics.count("upload_failures_total", backend=self.backend.name, kind=f"{cache_kind} directory")
+                continue
+            metrics.count("uploads_total", backend=self.backend.name, kind=f"{cache_kind} directory")
+            # Identical bytes in later runs (or in per-file mode) reuse the file inside this directory.
+            for filename in group:
+                refs[filename] = self.backend.file_ref(directory_ref, filename)
+                self.upload_cache.remember(self._read(kind, filename), refs[filename], kind=cache_kind)
+            print(f"[{self.chain_name}] Published {len(group)} {cache_kind} files as directory {directory_ref}")
+        return refs
+
+    def _publish_directories(self, jobs, generate_metadata_json, on_uploaded):
+        pending_images = [job["image_name"] for job in jobs if "image_ref" not in job]
+        if pending_images:
+            image_refs = self._publish_directory("images", pending_images, "image")
+            if len(image_refs) < len(pending_images):
+                print(f"[{self.chain_name}] Skipping {len(pending_images) - len(image_refs)} tokens "
+                      f"due to image directory upload failure.")
+            published = []
+            for job in jobs:
+                if "image_ref" not in job:
+                    if job["image_name"] not in image_refs:
+                        continue
+                    job["image_ref"] = image_refs[job["image_name"]]
+                    if on_uploaded is not None:
+                        on_uploaded(job, "image", job["image_ref"])
+                published.append(job)
+            jobs = published
+
+        files = []
+        for job in jobs:
+            filename = f"{job['token_id']}.json"
+            json_bytes = generate_metadata_json(job["token_id"], job["image_ref"], job["stats"], job["owner"])
+            self._write("metadata", filename, json_bytes)
+            files.append(filename)
+        if not files:
+            return []
+        metadata_refs = self._publish_directory("metadata", files, "metadata")
+        if len(metadata_refs) < len(files):
+            print(f"[{self.chain_name}] Skipping {len(files) - len(metadata_refs)} tokens "
+                  f"due to metadata directory upload failure.")
+
+        results = []
+        for job, filename in zip(jobs, files):
+            if filename not in metadata_refs:
+                continue
+            json_ref = metadata_refs[filename]
+            if on_uploaded is not None:
+                on_uploaded(job, "metadata", json_ref)
+            results.append((job["token_id"], job["owner"], job["stats"], json_ref))
+        return results
+
+    def _publish_per_file(self, jobs, generate_metadata_json, on_uploaded):
+        def publish_one(job):
+            token_id = job["token_id"]
+            if "image_ref" not in job:
+                image_ref = self.upload_cache.upload(
+                    job["image_name"], self._read("images", job["image_name"]), self.backend.upload, kind="image"
+                )
+                if not image_ref:
+                    print(f"Skipping Token ID {token_id} due to image upload failure.")
+                    return None
+                if on_uploaded is not None:
+                    on_uploaded(job, "image", image_ref)
+                job["image_ref"] = image_ref
+            json_bytes = generate_metadata_json(token_id, job["image_ref"], job["stats"], job["owner"])
+            json_ref = self.upload_cache.upload(f"{token_id}.json", json_bytes, self.backend.upload, kind="metadata")
+            if not json_ref:
+                print(f"Skipping Token ID {token_id} due to metadata upload failure.")
+                return None
+            if on_uploaded is not None:
+                on_uploaded(job, "metadata", json_ref)
+            return (token_id, job["owner"], job["stats"], json_ref)
+
+        futures = [self.backend.executor.submit(publish_one, job) for job in jobs]
+        return [result for result in (future.result() for future in futures) if result is not None]
+
+    def close(self):
+        shutil.rmtree(self.root, ignore_errors=True)
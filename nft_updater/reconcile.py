@@ -0,0 +1,119 @@
+"""Pre-commit reconciliation against the references already stored on-chain.
+
+A token can reach the commit with the same reference it already has on-chain:
+its upload cache entry was lost, a previous run committed it but died before
+recording it in the state store, or its owner changed and changed back. The
+contract would still be sent its calldata and an SSTORE for each of them, so
+before committing the current values are read in bulk (``tokenURI`` for the
+string contract, ``tokenDigests`` for the compact one, in JSON-RPC batches)
+and unchanged entries are dropped from the batch.
+"""
+import os
+
+from eth_abi import decode as abi_decode
+from eth_abi import encode as abi_encode
+
+from nft_updater.cid_codec import decode_ref, normalize_ref
+from nft_updater.rpc_batch import rpc_calls
+from nft_updater.telemetry import metrics
+
+# Set to 0 to commit every update without reading the current values first.
+RECONCILE_ONCHAIN = os.getenv("RECONCILE_ONCHAIN", "1").lower() in ("1", "true", "yes")
+# Token IDs per tokenDigests call on the compact contract.
+RECONCILE_CHUNK = int(os.getenv("RECONCILE_CHUNK", "200"))
+# Dropped updates priced with a gas estimate; the saving for the rest is extrapolated.
+RECONCILE_GAS_SAMPLE = 200
+
+# keccak256("tokenURI(uint256)")[:4]
+TOKEN_URI_SELECTOR = "0xc87b56dd"
+# keccak256("tokenDigests(uint256[])")[:4]
+TOKEN_DIGESTS_SELECTOR = "0x03237124"
+
+
+def _read_token_uris(w3, contract, token_ids):
+    """Returns ``{token_id: uri}``; tokens whose read failed are left out."""
+    calls = [
+        ("eth_call", [{"to": contract.address, "data": TOKEN_URI_SELECTOR + format(token_id, "064x")}, "latest"])
+        for token_id in token_ids
+    ]
+    uris = {}
+    for token_id, result in zip(token_ids, rpc_calls(w3, calls)):
+        if result is None:
+            continue
+        try:
+            uris[token_id] = abi_decode(["string"], bytes.fromhex(result[2:]))[0]
+        except Exception:
+            continue
+    return uris
+
+
+def _read_compact_refs(w3, contract, token_ids):
+    """Returns ``{token_id: ref}`` from the compact contract (None when unset); failed reads are left out."""
+    chunks = [token_ids[i:i + RECONCILE_CHUNK] for i in range(0, len(token_ids), RECONCILE_CHUNK)]
+    calls = [
+        ("eth_call", [{"to": contract.address, "data": TOKEN_DIGESTS_SELECTOR + abi_encode(["uint256[]"], [chunk]).hex()}, "latest"])
+        for chunk in chunks
+    ]
+    refs = {}
+    for chunk, result in zip(chunks, rpc_calls(w3, calls)):
+        if result is None:
+            continue
+        try:
+            digests, formats = abi_decode(["bytes32[]", "bytes"], bytes.fromhex(result[2:]))
+            for token_id, digest, fmt in zip(chunk, digests, formats):
+                refs[token_id] = decode_ref(token_id, digest, fmt)
+        except Exception:
+            continue
+    return refs
+
+
+def unchanged_on_chain(w3, contract, updates, compact=False):
+    """Returns the token IDs among ``(token_id, owner, stats, ref)`` updates whose ref is already on-chain.
+
+    Tokens whose current value could not be read are treated as changed.
+    """
+    token_ids = [update[0] for update in updates]
+    if compact:
+        current = _read_compact_refs(w3, contract, token_ids)
+        # Root hashes come back in lowercase hex whatever case the storage client printed them in.
+        return {
+            token_id for token_id, _, _, ref in updates
+            if token_id in current and current[token_id] == normalize_ref(ref)
+        }
+    # The string contract returns its gateway URL followed by the stored reference.
+    current = _read_token_uris(w3, contract, token_ids)
+    return {
+        token_id for token_id, _, _, ref in updates
+        if normalize_ref(current.get(token_id, "")[-len(ref):]) == normalize_ref(ref)
+    }
+
+
+def drop_unchanged(w3, contract, chain_name, updates, compact=False, estimate_gas=None):
+    """Splits ``updates`` into those to commit and the token IDs already up to date on-chain.
+
+    ``estimate_gas(token_ids, refs)``, when given, prices the dropped entries
+    so the saving can be logged.
+    """
+    try:
+        unchanged = unchanged_on_chain(w3, contract, updates, compact)
+    except Exception as e:
+        print(f"[{chain_name}] Warning: Could not read the current on-chain values, committing everything. Error: {e}")
+        return updates, set()
+    metrics.count("reconcile_unchanged_total", len(unchanged), chain=chain_name)
+    if not unchanged:
+        return updates, unchanged
+
+    kept = [update for update in updates if update[0] not in unchanged]
+    message = f"[{chain_name}] {len(unchanged)} of {len(updates)} updates already match the on-chain value and were dropped"
+    if estimate_gas is not None:
+        sample = [update for update in updates if update[0] in unchanged][:RECONCILE_GAS_SAMPLE]
+        try:
+            # Priced as a batch of its own, minus the transaction's base cost.
+            sample_gas = max(0, estimate_gas([update[0] for update in sample], [update[3] for update in sample]) - 21_000)
+            saved = sample_gas * len(unchanged) // len(sample)
+            metrics.count("reconcile_gas_saved_total", saved, chain=chain_name)
+            message += f", saving about {saved} gas"
+        except Exception as e:
+            message += f" (gas saving not estimated: {e})"
+    print(message + ".")
+    return kept, unchanged
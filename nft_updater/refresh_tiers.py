@@ -0,0 +1,219 @@
+"""Tiered refresh scheduling: check active wallets often and dormant ones rarely.
+
+Every token carries an activity score: the number of times its owner or stats
+(in practice its ``tx_count``) changed, each change decaying with a half-life
+of ``REFRESH_HALF_LIFE_DAYS``. The score places the token in the first tier of
+``REFRESH_TIERS`` whose minimum it reaches, and the tier sets how many hours
+must pass between two checks of the token. Tiering is off unless set, e.g.:
+
+    REFRESH_TIERS="hot:2:0,warm:0.5:6,cold:0.05:24,dormant:0:168"
+
+A run only reads the tokens that are due, hottest tier first and, within a
+tier, the longest-unchecked first. Minted tokens and, with the Transfer-log
+index, tokens whose owner changed are due straight away and go before all
+others. ``REFRESH_MAX_TOKENS`` caps the tokens rendered and uploaded per chain
+and run, and ``REFRESH_MAX_GAS`` the gas their commit may use; tokens past
+either budget stay due and lead the next run. Tier sizes, due and deferred
+counts and the staleness of every tier are reported as metrics.
+"""
+import os
+import time
+
+from nft_updater.state_store import FORCE_REFRESH, STATE_DB_PATH, connect_state_db
+from nft_updater.telemetry import metrics
+
+# name:min_score:hours between checks, e.g. "hot:2:0,warm:0.5:6,cold:0.05:24,dormant:0:168".
+# Empty (the default) or "off" checks every token every run.
+REFRESH_TIERS = os.getenv("REFRESH_TIERS", "")
+# Days after which a change counts half as much towards a token's activity score.
+REFRESH_HALF_LIFE_DAYS = float(os.getenv("REFRESH_HALF_LIFE_DAYS", "7"))
+# Tokens rendered and uploaded per chain and run; 0 is unlimited.
+REFRESH_MAX_TOKENS = int(os.getenv("REFRESH_MAX_TOKENS", "0"))
+# Gas the commit of one chain may use per run; 0 is unlimited.
+REFRESH_MAX_GAS = int(os.getenv("REFRESH_MAX_GAS", "0"))
+
+
+def parse_tiers(spec):
+    """Splits ``"name:min_score:hours,..."`` into ``[(name, min_score, interval_seconds)]``, hottest first."""
+    if spec.strip().lower() in ("", "0", "off", "false", "no"):
+        return []
+    tiers = []
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        if entry.count(":") != 2:
+            raise ValueError(f"REFRESH_TIERS entries look like name:min_score:hours, not {entry.strip()!r}")
+        name, min_score, hours = (part.strip() for part in entry.split(":"))
+        tiers.append((name, float(min_score), float(hours) * 3600))
+    tiers.sort(key=lambda tier: -tier[1])
+    if not tiers or tiers[-1][1] > 0:
+        raise ValueError(f"REFRESH_TIERS needs a tier with a minimum score of 0 to hold dormant tokens: {spec!r}")
+    return tiers
+
+
+def decayed(score, since, now):
+    """``score`` as of ``now``, decayed from the time ``since`` it was last updated."""
+    return score * 0.5 ** (max(0.0, now - since) / (REFRESH_HALF_LIFE_DAYS * 86400))
+
+
+class RefreshScheduler:
+    """Activity scores, tiers and per-run budget of one chain's tokens."""
+
+    def __init__(self, chain, store, tiers=None, max_tokens=None, path=None):
+        self.chain = chain
+        self.store = store
+        self.tiers = parse_tiers(REFRESH_TIERS) if tiers is None else tiers
+        self.max_tokens = REFRESH_MAX_TOKENS if max_tokens is None else max_tokens
+        self.path = path or STATE_DB_PATH
+        self.conn = connect_state_db(self.path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS token_activity (
+                chain TEXT NOT NULL,
+                token_id INTEGER NOT NULL,
+                score REAL NOT NULL,
+                scored_at INTEGER NOT NULL,
+                checked_at INTEGER NOT NULL,
+                PRIMARY KEY (chain, token_id)
+            )
+            """
+        )
+        self.conn.commit()
+        self.now = int(time.time())
+        # token_id -> (score, scored_at, checked_at), as of the start of the run.
+        self.activity = {}
+        # token_id -> tier index, and tier index -> due token count, for the selected tokens.
+        self.tier_of = {}
+        self.due = {}
+        self.admitted = 0
+        self.unchanged = []
+        # token_id -> position in this run's priority order.
+        self.priority = {}
+
+    def _load(self):
+        rows = self.conn.execute(
+            "SELECT token_id, score, scored_at, checked_at FROM token_activity WHERE chain = ?", (self.chain,)
+        ).fetchall()
+        self.activity = {token_id: (score, scored_at, checked_at) for token_id, score, scored_at, checked_at in rows}
+
+    def tier(self, score):
+        """Index of the tier an activity score falls in."""
+        for index, (_, min_score, _) in enumerate(self.tiers):
+            if score >= min_score:
+                return index
+        return len(self.tiers) - 1
+
+    def select(self, token_ids, owners=None):
+        """Returns the tokens of ``token_ids`` due for a check this run, in the order they should be checked.
+
+        ``owners`` (token_id -> address, from the Transfer-log index) makes
+        tokens whose owner changed since their last commit due as well.
+        """
+        self._load()
+        stored = self.store.last_updates(self.chain)
+        now = self.now
+        ranked = []
+        for token_id in token_ids:
+            row = self.activity.get(token_id)
+            if row is None and token_id in stored:
+                # Committed before tiers were kept: count the last commit as one change.
+                updated_at = stored[token_id][1]
+                row = self.activity[token_id] = (1.0, updated_at, updated_at)
+            if row is None:
+                # Never committed, so never rendered: it goes first.
+                self.tier_of[token_id] = 0
+                ranked.append((-1, 0, token_id))
+                continue
+            score, scored_at, checked_at = row
+            tier = self.tier(decayed(score, scored_at, now))
+            self.tier_of[token_id] = tier
+            owner = owners.get(token_id) if owners is not None else None
+            if owner is not None and token_id in stored and owner.lower() != stored[token_id][0].lower():
+                ranked.append((-1, checked_at, token_id))
+            elif FORCE_REFRESH or now - checked_at >= self.tiers[tier][2]:
+                ranked.append((tier, checked_at, token_id))
+        ranked.sort()
+        selected = [token_id for _, _, token_id in ranked]
+        self.priority = {token_id: position for position, token_id in enumerate(selected)}
+        self.due = {}
+        for token_id in selected:
+            self.due[self.tier_of[token_id]] = self.due.get(self.tier_of[token_id], 0) + 1
+
+        print(f"[{self.chain}] Refresh tiers: " + ", ".join(
+            f"{name} {self.due.get(index, 0)}/{sum(1 for tier in self.tier_of.values() if tier == index)} due"
+            for index, (name, _, _) in enumerate(self.tiers)
+        ))
+        return selected
+
+    def admit(self, token_id):
+        """Takes one token from the run's render and upload budget. Returns False once it is spent."""
+        if self.max_tokens and self.admitted >= self.max_tokens:
+            return False
+        self.admitted += 1
+        return True
+
+    def checked(self, token_id, changed):
+        """Notes that ``token_id`` was read this run; unchanged tokens count as up to date right away.
+
+        Changed tokens only count once committed, so one that fails stays due.
+        """
+        if not changed:
+            self.unchanged.append(token_id)
+
+    def order(self, updates):
+        """Sorts ``(token_id, ...)`` updates hottest first, so a gas budget commits those first."""
+        return sorted(updates, key=lambda update: self.priority.get(update[0], -1))
+
+    def save(self, committed=()):
+        """Stores this run's checks and the changes committed for ``committed`` token IDs, then reports the tiers."""
+        now = int(time.time())
+        rows = []
+        for token_id in committed:
+            score, scored_at, _ = self.activity.get(token_id, (0.0, now, now))
+            rows.append((self.chain, token_id, decayed(score, scored_at, now) + 1, now, now))
+            self.activity[token_id] = (rows[-1][2], now, now)
+        for token_id in self.unchanged:
+            score, scored_at, _ = self.activity.get(token_id, (0.0, now, now))
+            rows.append((self.chain, token_id, score, scored_at, now))
+            self.activity[token_id] = (score, scored_at, now)
+        self.conn.executemany(
+            """
+            INSERT INTO token_activity (chain, token_id, score, scored_at, checked_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (chain, token_id) DO UPDATE SET
+                score = excluded.score,
+                scored_at = excluded.scored_at,
+                checked_at = excluded.checked_at
+            """,
+            rows,
+        )
+        self.conn.commit()
+        if self.tier_of:
+            self._report(set(committed), now)
+
+    def _report(self, committed, now):
+        checked = committed | set(self.unchanged)
+        deferred = {}
+        for token_id in self.priority:
+            if token_id not in checked:
+                deferred[self.tier_of[token_id]] = deferred.get(self.tier_of[token_id], 0) + 1
+        for index, (name, _, interval) in enumerate(self.tiers):
+            ages = [
+                now - self.activity[token_id][2]
+                for token_id, tier in self.tier_of.items()
+                if tier == index and token_id in self.activity
+            ]
+            metrics.set("refresh_tier_tokens", sum(1 for tier in self.tier_of.values() if tier == index),
+                        chain=self.chain, tier=name)
+            metrics.set("refresh_tier_due_tokens", self.due.get(index, 0), chain=self.chain, tier=name)
+            metrics.set("refresh_tier_deferred_tokens", deferred.get(index, 0), chain=self.chain, tier=name)
+            metrics.set("refresh_tier_interval_seconds", interval, chain=self.chain, tier=name)
+            # Seconds since each token of the tier was last checked, after this run.
+            metrics.set("refresh_tier_max_staleness_seconds", max(ages, default=0), chain=self.chain, tier=name)
+            metrics.set("refresh_tier_mean_staleness_seconds", round(sum(ages) / len(ages), 1) if ages else 0,
+                        chain=self.chain, tier=name)
+        if deferred:
+            print(f"[{self.chain}] {sum(deferred.values())} due tokens were not refreshed and lead the next run.")
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,171 @@
+"""Template-based NFT image renderer with a shared process pool.
+
+Everything that is the same for every token (the background, the title,
+separator lines and static labels) is drawn once into a template image per
+style. Rendering a token then copies the template and draws only the dynamic
+fields. Font objects are loaded once per process. ``render_encoded`` fans
+rendering and encoding out over a process pool so it scales with the
+available cores.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+
+from nft_updater.image_encoding import DEFAULT_ENCODING, encode_image
+from nft_updater.render_settings import RENDER_WORKERS, STYLE_CLASSIC, STYLE_GRADIENT
+
+try:
+    import numpy as np
+except ImportError:  # NumPy only speeds up building the gradient template.
+    np = None
+
+WIDTH, HEIGHT = 800, 800
+
+CLASSIC_FONT_PATH = "arial.ttf"
+GRADIENT_FONT_PATH = ".github/fonts/Poppins-Bold.ttf"
+
+
+@lru_cache(maxsize=None)
+def load_font(font_path, size):
+    """Loads a TrueType font once per process, falling back to Pillow's default font."""
+    try:
+        return ImageFont.truetype(font_path, size)
+    except IOError:
+        print(f"Warning: Font {font_path} not found. Using default font.")
+        return ImageFont.load_default()
+
+
+def gradient_background(width, height, start_color, end_color):
+    """Builds the vertical gradient used by the gradient style."""
+    if np is not None:
+        ratio = (np.arange(height, dtype=np.float64) / height)[:, None]
+        start = np.array(start_color, dtype=np.float64)
+        end = np.array(end_color, dtype=np.float64)
+        rows = (start * (1 - ratio) + end * ratio).astype(np.uint8)
+        pixels = np.broadcast_to(rows[:, None, :], (height, width, 3))
+        return Image.fromarray(np.ascontiguousarray(pixels), "RGB")
+
+    img = Image.new('RGB', (width, height))
+    draw = ImageDraw.Draw(img)
+    for y in range(height):
+        ratio = y / height
+        r = int(start_color[0] * (1 - ratio) + end_color[0] * ratio)
+        g = int(start_color[1] * (1 - ratio) + end_color[1] * ratio)
+        b = int(start_color[2] * (1 - ratio) + end_color[2] * ratio)
+        draw.line([(0, y), (width, y)], fill=(r, g, b))
+    return img
+
+
+class RenderEngine:
+    """Renders token images for one style from a cached template."""
+
+    def __init__(self, style, title, font_path=None, deterministic=False, workers=None, pool=None,
+                 encoding=DEFAULT_ENCODING):
+        self.style = style
+        self.title = title
+        self.font_path = font_path or (CLASSIC_FONT_PATH if style == STYLE_CLASSIC else GRADIENT_FONT_PATH)
+        self.deterministic = deterministic
+        # One of nft_updater.image_encoding.ENCODINGS.
+        self.encoding = encoding
+        self.workers = RENDER_WORKERS if workers is None else workers
+        self._template = None
+        # A pool passed in is shared with other engines and is closed by its owner.
+        self._pool = pool
+        self._owns_pool = pool is None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def spec(self):
+        """Picklable description of the engine, used to rebuild it in worker processes."""
+        return (self.style, self.title, self.font_path, self.deterministic, self.encoding)
+
+    def template(self):
+        if self._template is None:
+            self._template = self._build_template()
+        return self._template
+
+    def _build_template(self):
+        if self.style == STYLE_CLASSIC:
+            img = Image.new('RGB', (WIDTH, HEIGHT), color=(16, 25, 48))
+            d = ImageDraw.Draw(img)
+            d.text((50, 50), self.title, font=load_font(self.font_path, 60), fill=(255, 255, 255))
+            d.line([(50, 130), (750, 130)], fill=(70, 80, 120), width=3)
+            d.text((50, 350), "On-Chain Activity:", font=load_font(self.font_path, 40), fill=(150, 160, 200))
+            return img
+
+        img = gradient_background(WIDTH, HEIGHT, (18, 18, 97), (97, 18, 120))
+        draw = ImageDraw.Draw(img)
+        draw.text((WIDTH / 2, 100), self.title, font=load_font(self.font_path, 70), fill=(255, 255, 255), anchor="ms")
+        draw.line([(100, 160), (WIDTH - 100, 160)], fill=(100, 100, 150), width=3)
+        draw.text((WIDTH / 2, 400), "TRANSACTION COUNT", font=load_font(self.font_path, 35), fill=(150, 160, 200), anchor="ms")
+        return img
+
+    def render(self, token_id, stats, owner_address):
+        """Returns the token's image as a PIL Image."""
+        img = self.template().copy()
+        draw = ImageDraw.Draw(img)
+        timestamp = None if self.deterministic else f"Last Updated: {time.strftime('%Y-%m-%d %H:%M:%S UTC')}"
+
+        if self.style == STYLE_CLASSIC:
+            main_font = load_font(self.font_path, 40)
+            draw.text((50, 180), f"Token ID: #{token_id}", font=main_font, fill=(210, 210, 255))
+            short_address = f"{owner_address[:6]}...{owner_address[-4:]}"
+            draw.text((50, 250), f"Owner: {short_address}", font=main_font, fill=(210, 210, 255))
+            draw.text((70, 420), f"Transaction Count: {stats['tx_count']}", font=main_font, fill=(210, 210, 255))
+            if stats.get("first_active_at"):
+                draw.text((70, 490), f"Active Since: {_active_since(stats)}", font=main_font, fill=(210, 210, 255))
+            if timestamp:
+                draw.text((50, 720), timestamp, font=load_font(self.font_path, 25), fill=(120, 130, 170))
+            return img
+
+        draw.text((WIDTH / 2, 230), f"TOKEN ID #{token_id}", font=load_font(self.font_path, 35), fill=(200, 200, 255), anchor="ms")
+        draw.text((WIDTH / 2, 500), str(stats['tx_count']), font=load_font(self.font_path, 90), fill=(255, 255, 255), anchor="ms")
+        if stats.get("first_active_at"):
+            draw.text((WIDTH / 2, 620), f"ACTIVE SINCE {_active_since(stats)}", font=load_font(self.font_path, 35), fill=(150, 160, 200), anchor="ms")
+        if timestamp:
+            draw.text((WIDTH / 2, HEIGHT - 50), timestamp, font=load_font(self.font_path, 20), fill=(120, 130, 170), anchor="ms")
+        return img
+
+    def render_encoded_local(self, token_id, stats, owner_address):
+        """Renders in the calling process and returns the image bytes in the engine's encoding."""
+        return encode_image(self.render(token_id, stats, owner_address), self.encoding)
+
+    def render_encoded(self, token_id, stats, owner_address):
+        """Returns encoded image bytes, rendering on the process pool when more than one worker is configured."""
+        if self.workers <= 1:
+            return self.render_encoded_local(token_id, stats, owner_address)
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = create_render_pool(self.workers)
+        return self._pool.submit(_render_encoded_in_worker, self.spec, token_id, stats, owner_address).result()
+
+    def close(self):
+        if self._pool is not None and self._owns_pool:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+def create_render_pool(workers=None):
+    """Creates a render process pool that several engines can share."""
+    return ProcessPoolExecutor(max_workers=workers or RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _active_since(stats):
+    # A calendar date rather than an age in days, so the image stays byte-identical
+    # from one day to the next and deterministic renders keep hitting the upload cache.
+    return time.strftime('%Y-%m-%d', time.gmtime(stats["first_active_at"]))
+
+
+@lru_cache(maxsize=None)
+def _worker_engine(spec):
+    style, title, font_path, deterministic, encoding = spec
+    return RenderEngine(style, title, font_path, deterministic, workers=1, encoding=encoding)
+
+
+def _render_encoded_in_worker(spec, token_id, stats, owner_address):
+    return _worker_engine(spec).render_encoded_local(token_id, stats, owner_address)
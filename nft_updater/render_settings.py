@@ -0,0 +1,14 @@
+"""Render settings that are needed without loading the renderer.
+
+Chain configs and the pipeline only need these constants; keeping them apart
+from render_engine.py means Pillow is not imported until something is rendered.
+"""
+import os
+
+# Number of render processes; 1 renders in the calling thread.
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 1)))
+
+# Style used by update_nfts.py: solid background, Arial, left-aligned text.
+STYLE_CLASSIC = "classic"
+# Style used by the Pinata scripts: gradient background, Poppins, centred text.
+STYLE_GRADIENT = "gradient"
@@ -0,0 +1,222 @@
+"""Batched JSON-RPC reads for token owners and wallet transaction counts.
+
+The update scripts need two values per token: the owner from ``ownerOf`` and
+the owner's nonce from ``eth_getTransactionCount``. Instead of two round-trips
+per token, the helpers here send them as JSON-RPC batch requests, all pinned to
+the same block number, and fall back to one call at a time when the endpoint
+rejects batches.
+"""
+import os
+import time
+
+import requests
+
+from nft_updater.lean_rpc import OWNER_OF_SELECTOR, to_checksum_address
+from nft_updater.rpc_pool import RPC_TIMEOUT, RpcPool
+from nft_updater.rpc_pool import session as _session
+from nft_updater.telemetry import metrics
+
+# Number of calls packed into a single JSON-RPC batch request.
+DEFAULT_BATCH_SIZE = int(os.getenv("RPC_BATCH_SIZE", "100"))
+
+
+class BatchRejected(Exception):
+    """Raised when an endpoint does not accept JSON-RPC batch requests."""
+
+
+def _encode_owner_of(token_id):
+    return OWNER_OF_SELECTOR + format(token_id, "064x")
+
+
+def _decode_address(result):
+    """Decodes an ABI-encoded address return value, or None if it is empty."""
+    if not result or result == "0x" or len(result) < 66:
+        return None
+    return to_checksum_address("0x" + result[-40:])
+
+
+def _batch_target(w3):
+    """The endpoint pool behind ``w3``, or its single endpoint URL for a plain web3 provider."""
+    return getattr(w3.provider, "pool", None) or getattr(w3.provider, "endpoint_uri", None)
+
+
+def _rejects_batches(response):
+    """True for a client error such as 400 or 413, which is how endpoints without batch support answer."""
+    return response is not None and 400 <= response.status_code < 500 and response.status_code != 429
+
+
+def _post_batch(target, calls):
+    """Sends one JSON-RPC batch to ``target`` (an RpcPool or a URL) and returns the results in request order.
+
+    Individual call errors come back as None; a response that is not a batch
+    reply at all raises BatchRejected so the caller can fall back. Timeouts,
+    connection failures and server errors are raised as they are, since one
+    call at a time would only repeat them.
+    """
+    payload = [
+        {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+        for i, (method, params) in enumerate(calls)
+    ]
+    started = time.perf_counter()
+    try:
+        if isinstance(target, RpcPool):
+            # Every call in the batch counts against the endpoint's request budget.
+            replies = target.post(payload, cost=len(calls))
+        else:
+            response = _session.post(target, json=payload, timeout=RPC_TIMEOUT)
+            response.raise_for_status()
+            replies = response.json()
+    except requests.exceptions.HTTPError as e:
+        if not _rejects_batches(e.response):
+            # Server errors, rate limits and "every endpoint failed" would fail single calls just the same.
+            raise
+        metrics.count("rpc_batches_rejected_total")
+        raise BatchRejected(str(e)) from e
+    except ValueError as e:
+        # A body that is not JSON at all: the endpoint did not understand the batch.
+        metrics.count("rpc_batches_rejected_total")
+        raise BatchRejected(str(e)) from e
+    finally:
+        metrics.observe("rpc_batch_seconds", time.perf_counter() - started)
+
+    if not isinstance(replies, list):
+        metrics.count("rpc_batches_rejected_total")
+        raise BatchRejected(f"Endpoint returned a non-batch reply: {replies}")
+
+    results = [None] * len(calls)
+    for reply in replies:
+        reply_id = reply.get("id")
+        if isinstance(reply_id, int) and 0 <= reply_id < len(calls) and "error" not in reply:
+            results[reply_id] = reply.get("result")
+    metrics.count("rpc_calls_total", len(calls))
+    metrics.count("rpc_call_errors_total", sum(1 for result in results if result is None))
+    return results
+
+
+def _run_batched(target, calls, batch_size):
+    results = []
+    for start in range(0, len(calls), batch_size):
+        results.extend(_post_batch(target, calls[start:start + batch_size]))
+    return results
+
+
+def _read_owners_one_by_one(contract, token_ids, block_number):
+    owners = {}
+    for token_id in token_ids:
+        try:
+            owners[token_id] = contract.functions.ownerOf(token_id).call(block_identifier=block_number)
+        except Exception as e:
+            print(f"Warning: Could not read owner of Token ID {token_id}. Error: {e}")
+    return owners
+
+
+def _read_nonces_one_by_one(w3, addresses, block_number):
+    nonces = {}
+    for address in addresses:
+        try:
+            nonces[address] = w3.eth.get_transaction_count(address, block_identifier=block_number)
+        except Exception as e:
+            print(f"Warning: Could not fetch stats for {address}. Error: {e}")
+    return nonces
+
+
+def rpc_calls(w3, calls, batch_size=None):
+    """Runs arbitrary ``(method, params)`` calls in batches and returns their results in order.
+
+    Falls back to one request per call when the endpoint rejects batches.
+    Failed calls come back as None.
+    """
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    target = _batch_target(w3)
+    if target:
+        try:
+            return _run_batched(target, calls, batch_size)
+        except BatchRejected as e:
+            print(f"Warning: Batch request rejected, falling back to single calls. Error: {e}")
+    results = []
+    for method, params in calls:
+        try:
+            response = w3.provider.make_request(method, params)
+            results.append(response.get("result") if "error" not in response else None)
+        except Exception:
+            results.append(None)
+    return results
+
+
+def read_tx_counts(w3, addresses, batch_size=None, block_number="latest"):
+    """Reads the transaction count of every address in batched requests.
+
+    Returns a dict mapping address to count; addresses whose read failed are left out.
+    """
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    target = _batch_target(w3)
+    block_tag = hex(block_number) if isinstance(block_number, int) else block_number
+    addresses = list(addresses)
+    if target:
+        calls = [("eth_getTransactionCount", [address, block_tag]) for address in addresses]
+        try:
+            results = _run_batched(target, calls, batch_size)
+            tx_counts = {}
+            for address, result in zip(addresses, results):
+                if result is None:
+                    print(f"Warning: Could not fetch stats for {address}.")
+                    continue
+                tx_counts[address] = int(result, 16)
+            return tx_counts
+        except BatchRejected as e:
+            print(f"Warning: Batch nonce reads rejected, falling back to single calls. Error: {e}")
+    return _read_nonces_one_by_one(w3, addresses, block_number)
+
+
+def read_owners(w3, contract, token_ids, batch_size=None, block_number="latest"):
+    """Reads ``ownerOf`` for every token in batched requests.
+
+    Returns a dict mapping token ID to checksum owner address; tokens whose
+    read failed are left out.
+    """
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    target = _batch_target(w3)
+    block_tag = hex(block_number) if isinstance(block_number, int) else block_number
+    token_ids = list(token_ids)
+    if target:
+        calls = [
+            ("eth_call", [{"to": contract.address, "data": _encode_owner_of(token_id)}, block_tag])
+            for token_id in token_ids
+        ]
+        try:
+            results = _run_batched(target, calls, batch_size)
+            owners = {}
+            for token_id, result in zip(token_ids, results):
+                owner = _decode_address(result)
+                if owner is None:
+                    print(f"Warning: Could not read owner of Token ID {token_id}.")
+                    continue
+                owners[token_id] = owner
+            return owners
+        except BatchRejected as e:
+            print(f"Warning: Batch ownerOf reads rejected, falling back to single calls. Error: {e}")
+    return _read_owners_one_by_one(contract, token_ids, block_number)
+
+
+def read_owners_and_tx_counts(w3, contract, token_ids, batch_size=None, block_number=None):
+    """Reads every token's owner and every distinct owner's nonce in bulk.
+
+    All reads are pinned to ``block_number``, or to the latest block at the
+    time of the call when it is not given.
+    Owners holding several tokens are only queried once for their nonce.
+
+    Returns a tuple ``(block_number, owners, tx_counts)`` where ``owners`` maps
+    token ID to checksum address and ``tx_counts`` maps checksum address to
+    transaction count. Tokens or addresses whose reads failed are left out.
+    """
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    if block_number is None:
+        block_number = w3.eth.block_number
+    owners = read_owners(w3, contract, token_ids, batch_size, block_number)
+
+    # De-duplicate owners that hold several tokens before asking for nonces.
+    addresses = sorted(set(owners.values()))
+    tx_counts = read_tx_counts(w3, addresses, batch_size, block_number)
+
+    print(f"Read {len(owners)} owners ({len(addresses)} distinct) and their transaction counts at block {block_number}.")
+    return block_number, owners, tx_counts
@@ -0,0 +1,268 @@
+"""Pool of JSON-RPC endpoints with health tracking, failover and rate budgets.
+
+A chain's RPC setting may list several endpoints separated by commas, each
+optionally followed by ``|<requests per second>``:
+
+    MONAD_RPC_URL="https://rpc-a.example|25,https://rpc-b.example"
+
+Every endpoint gets its own pooled HTTP session and a request budget
+(``RPC_MAX_RPS`` when it has none of its own; 0 means unlimited). A batch
+spends one unit of the budget per call in it. Each request goes to the
+endpoint with the lowest expected cost: its smoothed latency, inflated by its
+recent error rate, plus the wait its budget imposes right now. Endpoints
+whose head lags the others by more than ``RPC_MAX_LAG_BLOCKS`` rank last.
+An endpoint that times out, refuses the connection, answers 5xx or 429 is
+cooled down with exponential backoff and the request moves to the next one.
+Health checks (``eth_blockNumber`` on every endpoint) run when the pool is
+created and then in the background every ``RPC_HEALTH_INTERVAL`` seconds.
+
+Pools are shared per endpoint list, so the lean read client, the batched
+reads and the web3 signer of a chain all see the same endpoint statistics.
+"""
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from nft_updater.telemetry import metrics
+
+# Per-request timeout for JSON-RPC POSTs, in seconds.
+RPC_TIMEOUT = float(os.getenv("RPC_TIMEOUT", "30"))
+# Default request budget per endpoint, in calls per second; 0 is unlimited.
+RPC_MAX_RPS = float(os.getenv("RPC_MAX_RPS", "0"))
+# Kept-alive connections per endpoint.
+RPC_POOL_CONNECTIONS = int(os.getenv("RPC_POOL_CONNECTIONS", "16"))
+# Seconds between background health checks of a multi-endpoint pool.
+RPC_HEALTH_INTERVAL = float(os.getenv("RPC_HEALTH_INTERVAL", "60"))
+# Timeout of a health check request, in seconds.
+RPC_HEALTH_TIMEOUT = float(os.getenv("RPC_HEALTH_TIMEOUT", "5"))
+# Endpoints whose head is further behind the best one rank after all others.
+RPC_MAX_LAG_BLOCKS = int(os.getenv("RPC_MAX_LAG_BLOCKS", "20"))
+# First and longest cool-down after a failed request, in seconds.
+RPC_COOLDOWN_BASE = float(os.getenv("RPC_COOLDOWN_BASE", "1"))
+RPC_COOLDOWN_MAX = float(os.getenv("RPC_COOLDOWN_MAX", "60"))
+
+# Weight of the newest sample in the latency and error averages.
+_SMOOTHING = 0.2
+# An endpoint that always fails costs this many times its latency.
+_ERROR_PENALTY = 10
+
+# Kept-alive connections for requests made outside any pool.
+session = requests.Session()
+
+
+def parse_endpoints(spec):
+    """Splits ``"url[|rps],url[|rps]"`` into ``[(url, rps)]``; rps is None when not given."""
+    endpoints = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        url, _, rps = entry.partition("|")
+        endpoints.append((url.strip(), float(rps) if rps.strip() else None))
+    return endpoints
+
+
+class Endpoint:
+    """One RPC URL: its session, request budget and health statistics."""
+
+    def __init__(self, url, rps=None, label=None):
+        self.url = url
+        self.rps = RPC_MAX_RPS if rps is None else rps
+        # Only the host goes into logs and metrics; paths often carry API keys.
+        self.label = label or urlparse(url).hostname or url
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=RPC_POOL_CONNECTIONS)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.lock = threading.Lock()
+        self.latency = 0.0
+        self.error_rate = 0.0
+        self.failures = 0
+        self.cooldown_until = 0.0
+        self.head = None
+        self.lagging = False
+        # Earliest time the budget allows the next call.
+        self._next_slot = 0.0
+
+    def wait_time(self, now=None):
+        """Seconds until the budget allows another call."""
+        if not self.rps:
+            return 0.0
+        return max(0.0, self._next_slot - (now or time.monotonic()))
+
+    def rank(self, now):
+        """Sort key: available endpoints first, then in-sync ones, then by expected cost."""
+        cost = self.latency * (1 + _ERROR_PENALTY * self.error_rate) + self.wait_time(now)
+        return (self.cooldown_until > now, self.lagging, cost)
+
+    def acquire(self, cost=1):
+        """Blocks until the budget allows ``cost`` calls and spends them."""
+        if not self.rps:
+            return
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot)
+            self._next_slot = start + cost / self.rps
+        if start > now:
+            metrics.observe("rpc_budget_wait_seconds", start - now, endpoint=self.label)
+            time.sleep(start - now)
+
+    def succeeded(self, seconds):
+        with self.lock:
+            self.latency = seconds if not self.latency else (1 - _SMOOTHING) * self.latency + _SMOOTHING * seconds
+            self.error_rate *= 1 - _SMOOTHING
+            self.failures = 0
+            self.cooldown_until = 0.0
+
+    def failed(self, retry_after=None):
+        with self.lock:
+            self.error_rate = (1 - _SMOOTHING) * self.error_rate + _SMOOTHING
+            self.failures += 1
+            backoff = min(RPC_COOLDOWN_MAX, RPC_COOLDOWN_BASE * 2 ** (self.failures - 1))
+            self.cooldown_until = time.monotonic() + max(backoff, retry_after or 0)
+
+
+class RpcPool:
+    """Routes JSON-RPC requests over one or more endpoints of the same chain."""
+
+    def __init__(self, endpoints, timeout=None):
+        if not endpoints:
+            raise ValueError("An RPC pool needs at least one endpoint.")
+        labels = [urlparse(url).hostname or url for url, _ in endpoints]
+        self.endpoints = [
+            # Two endpoints on the same host are told apart by their position.
+            Endpoint(url, rps, label if labels.count(label) == 1 else f"{label}#{index}")
+            for index, ((url, rps), label) in enumerate(zip(endpoints, labels))
+        ]
+        self.timeout = RPC_TIMEOUT if timeout is None else timeout
+        self._check_lock = threading.Lock()
+        self._last_check = 0.0
+
+    @property
+    def url(self):
+        """The first configured endpoint, for tools that take a single URL."""
+        return self.endpoints[0].url
+
+    def _ranked(self):
+        now = time.monotonic()
+        return sorted(self.endpoints, key=lambda endpoint: endpoint.rank(now))
+
+    def _maybe_check(self):
+        if len(self.endpoints) > 1 and time.monotonic() - self._last_check > RPC_HEALTH_INTERVAL:
+            if self._check_lock.acquire(blocking=False):
+                self._last_check = time.monotonic()
+                threading.Thread(target=self._background_check, name="rpc-health", daemon=True).start()
+
+    def _background_check(self):
+        try:
+            self._check()
+        finally:
+            self._check_lock.release()
+
+    def check(self):
+        """Probes every endpoint's head block. Returns True if at least one answered."""
+        with self._check_lock:
+            self._last_check = time.monotonic()
+            return self._check()
+
+    def _check(self):
+        payload = {"jsonrpc": "2.0", "id": 1, "method": "eth_blockNumber", "params": []}
+        for endpoint in self.endpoints:
+            started = time.perf_counter()
+            try:
+                response = endpoint.session.post(endpoint.url, json=payload, timeout=RPC_HEALTH_TIMEOUT)
+                response.raise_for_status()
+                endpoint.head = int(response.json()["result"], 16)
+                endpoint.succeeded(time.perf_counter() - started)
+            except Exception as e:
+                endpoint.head = None
+                endpoint.failed()
+                metrics.count("rpc_health_check_failures_total", endpoint=endpoint.label)
+                if len(self.endpoints) > 1:
+                    print(f"Warning: RPC endpoint {endpoint.label} failed its health check. Error: {e}")
+        heads = [endpoint.head for endpoint in self.endpoints if endpoint.head is not None]
+        for endpoint in self.endpoints:
+            endpoint.lagging = endpoint.head is None or (bool(heads) and max(heads) - endpoint.head > RPC_MAX_LAG_BLOCKS)
+            metrics.set("rpc_endpoint_healthy", int(not endpoint.lagging), endpoint=endpoint.label)
+        return bool(heads)
+
+    def post(self, payload, cost=1, idempotent=True):
+        """Sends ``payload`` (a JSON-able request or batch, or pre-encoded bytes) and returns the decoded reply.
+
+        Transport failures, 5xx and 429 answers move the request to the next
+        endpoint; the last error is raised when every endpoint failed. A
+        non-idempotent request (a transaction broadcast) only goes to the best
+        endpoint: one that failed may still have relayed it, and resending it
+        elsewhere would come back as "already known" or "nonce too low".
+        """
+        self._maybe_check()
+        last_error = None
+        endpoints = self._ranked()
+        if not idempotent:
+            endpoints = endpoints[:1]
+        for attempt, endpoint in enumerate(endpoints):
+            if attempt:
+                metrics.count("rpc_failovers_total", endpoint=endpoint.label)
+            endpoint.acquire(cost)
+            started = time.perf_counter()
+            try:
+                if isinstance(payload, bytes):
+                    response = endpoint.session.post(
+                        endpoint.url, data=payload, headers={"Content-Type": "application/json"}, timeout=self.timeout
+                    )
+                else:
+                    response = endpoint.session.post(endpoint.url, json=payload, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                endpoint.failed()
+                metrics.count("rpc_endpoint_errors_total", endpoint=endpoint.label, reason=type(e).__name__)
+                last_error = e
+                continue
+            seconds = time.perf_counter() - started
+            metrics.observe("rpc_request_seconds", seconds, endpoint=endpoint.label)
+            if response.status_code == 429 or response.status_code >= 500:
+                retry_after = response.headers.get("Retry-After", "")
+                endpoint.failed(float(retry_after) if retry_after.isdigit() else None)
+                metrics.count("rpc_endpoint_errors_total", endpoint=endpoint.label, reason=str(response.status_code))
+                last_error = requests.exceptions.HTTPError(
+                    f"{response.status_code} from RPC endpoint {endpoint.label}", response=response
+                )
+                continue
+            # Any other status is the request's own fault, not the endpoint's.
+            response.raise_for_status()
+            endpoint.succeeded(seconds)
+            return response.json()
+        raise last_error
+
+    def request(self, method, params):
+        """Sends one JSON-RPC call and returns the reply dict."""
+        payload = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
+        return self.post(payload, idempotent=method != "eth_sendRawTransaction")
+
+    def stats(self):
+        """Returns ``{label: {...}}`` with each endpoint's current health figures."""
+        return {
+            endpoint.label: {
+                "latency_seconds": round(endpoint.latency, 4),
+                "error_rate": round(endpoint.error_rate, 3),
+                "head": endpoint.head,
+                "lagging": endpoint.lagging,
+                "rps": endpoint.rps,
+            }
+            for endpoint in self.endpoints
+        }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool_for(spec):
+    """Returns the shared pool for an endpoint list such as a chain's ``rpc_url`` setting."""
+    with _pools_lock:
+        if spec not in _pools:
+            _pools[spec] = RpcPool(parse_endpoints(spec))
+        return _pools[spec]
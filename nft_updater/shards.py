@@ -0,0 +1,249 @@
+"""Token sharding across runners and the manifests that carry shard results.
+
+With ``--shard i/N`` a runner only renders and uploads every N-th token,
+starting at token ``i``, and writes a manifest of ``tokenId -> root hash``
+(plus the owner and stats each token was rendered for) instead of sending
+transactions. A final merge step loads and validates the manifests of all N
+shards and commits them from a single signer, so the shards never compete for
+nonces. Tokens are dealt out round-robin rather than in contiguous ranges
+because new mints, which always need a render, pile up at the highest IDs.
+
+Shards only restore the state database, so each one also leaves a snapshot of
+it next to its manifest. The merge step folds what the shards learned (upload
+cache, Transfer-log owner index, wallet ages and journaled uploads) into its
+own state database, which is the one saved for the next run.
+"""
+import glob
+import json
+import os
+import re
+
+from nft_updater.state_store import STATE_DB_PATH, connect_state_db
+
+MANIFEST_VERSION = 1
+# Root hashes from 0G storage; Pinata references are CIDs, or "<dirCID>/<tokenId>.json" in directory mode.
+_ROOT_HASH_PATTERN = re.compile(r"^0x[0-9a-fA-F]{64}$")
+_CID_PATTERN = re.compile(r"^(Qm[1-9A-HJ-NP-Za-km-z]{44}|b[a-z2-7]{20,})(/\d+\.json)?$")
+
+
+class ManifestError(ValueError):
+    """Raised when shard manifests are missing, inconsistent or malformed."""
+
+
+def parse_shard(value):
+    """Parses ``"i/N"`` (1-based, as in ``--shard 2/4``) into ``(i, N)``."""
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", value or "")
+    if not match:
+        raise ValueError(f"Shard must look like i/N, got {value!r}")
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Shard index must be between 1 and {count}, got {value!r}")
+    return index, count
+
+
+def shard_token_ids(total_supply, shard=None):
+    """The token IDs a shard is responsible for; every token when ``shard`` is None."""
+    if shard is None:
+        return range(1, total_supply + 1)
+    index, count = shard
+    return range(index, total_supply + 1, count)
+
+
+def manifest_path(manifest_dir, chain_name, shard):
+    index, count = shard
+    return os.path.join(manifest_dir, f"{chain_name}-shard-{index}-of-{count}.json")
+
+
+def write_manifest(manifest_dir, chain, shard, block_number, total_supply, updates):
+    """Writes a shard's ``(token_id, owner, stats, root_hash)`` results and returns the file path."""
+    os.makedirs(manifest_dir, exist_ok=True)
+    path = manifest_path(manifest_dir, chain.name, shard)
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "chain": chain.name,
+        "contract": chain.contract_address.lower(),
+        "shard": list(shard),
+        "block_number": block_number,
+        "total_supply": total_supply,
+        "tokens": [
+            {"token_id": token_id, "owner": owner, "stats": stats, "root_hash": root_hash}
+            for token_id, owner, stats, root_hash in updates
+        ],
+    }
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(temporary, path)
+    return path
+
+
+def _validate_ref(backend, ref):
+    if backend == "0g-storage":
+        return bool(_ROOT_HASH_PATTERN.match(ref))
+    return bool(_CID_PATTERN.match(ref))
+
+
+def load_manifests(manifest_dir, chain):
+    """Loads and validates every shard manifest for ``chain``.
+
+    Returns a list of ``(block_number, updates)`` per shard, where ``updates``
+    are ``(token_id, owner, stats, root_hash)`` tuples ready for the commit.
+    Raises ManifestError unless exactly one manifest per shard is present, all
+    of them describe the same contract and shard count with a valid block
+    number, and every token sits in the right shard exactly once with a
+    well-formed reference. Shards may be pinned to different blocks; each
+    keeps its own block number.
+    """
+    paths = sorted(glob.glob(os.path.join(manifest_dir, "**", f"{chain.name}-shard-*-of-*.json"), recursive=True))
+    if not paths:
+        raise ManifestError(f"No shard manifests for {chain.name} in {manifest_dir}.")
+
+    manifests = {}
+    counts = set()
+    for path in paths:
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ManifestError(f"Could not read {path}: {e}") from e
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("chain") != chain.name:
+            raise ManifestError(f"{path} is not a version {MANIFEST_VERSION} manifest for {chain.name}.")
+        if manifest.get("contract") != chain.contract_address.lower():
+            raise ManifestError(f"{path} was built for contract {manifest.get('contract')}, not {chain.contract_address}.")
+        shard = manifest.get("shard")
+        if (not isinstance(shard, list) or len(shard) != 2 or not all(isinstance(value, int) for value in shard)
+                or not 1 <= shard[0] <= shard[1]):
+            raise ManifestError(f"{path} has an invalid shard: {shard!r}.")
+        block_number = manifest.get("block_number")
+        if not isinstance(block_number, int) or isinstance(block_number, bool) or block_number < 0:
+            raise ManifestError(f"{path} has an invalid block number: {block_number!r}.")
+        index, count = shard
+        if index in manifests:
+            raise ManifestError(f"Shard {index}/{count} of {chain.name} appears more than once.")
+        manifests[index] = manifest
+        counts.add(count)
+
+    if len(counts) != 1:
+        raise ManifestError(f"Manifests for {chain.name} disagree on the shard count: {sorted(counts)}.")
+    count = counts.pop()
+    missing = sorted(set(range(1, count + 1)) - set(manifests))
+    if missing:
+        raise ManifestError(f"Missing manifests for {chain.name} shard(s) {', '.join(f'{i}/{count}' for i in missing)}.")
+
+    seen = set()
+    shards = []
+    for index, manifest in sorted(manifests.items()):
+        updates = []
+        for entry in manifest["tokens"]:
+            token_id = entry["token_id"]
+            if not 1 <= token_id <= manifest["total_supply"] or token_id % count != index % count:
+                raise ManifestError(f"Token ID {token_id} does not belong to shard {index}/{count}.")
+            if token_id in seen:
+                raise ManifestError(f"Token ID {token_id} appears in more than one manifest.")
+            if not _validate_ref(chain.backend, entry["root_hash"]):
+                raise ManifestError(f"Token ID {token_id} has a malformed reference: {entry['root_hash']!r}.")
+            seen.add(token_id)
+            updates.append((token_id, entry["owner"], entry["stats"], entry["root_hash"]))
+        shards.append((manifest["block_number"], updates))
+    return shards
+
+
+# --- Shard state ---
+
+# How the merge folds each table a shard fills into its own state database.
+# Committed tokens and transactions are left out: only the merge writes those.
+_STATE_MERGES = {
+    "upload_cache": "INSERT OR IGNORE INTO main.upload_cache SELECT * FROM shard.upload_cache",
+    # Keep found first blocks, and otherwise the newest "no activity up to" block.
+    "wallet_first_activity": """
+        INSERT OR REPLACE INTO main.wallet_first_activity
+        SELECT s.* FROM shard.wallet_first_activity AS s
+        LEFT JOIN main.wallet_first_activity AS m ON m.chain = s.chain AND m.address = s.address
+        WHERE m.address IS NULL
+           OR (m.first_block IS NULL AND (s.first_block IS NOT NULL OR s.checked_block > m.checked_block))
+    """,
+    "journal_uploads": """
+        INSERT INTO main.journal_uploads
+        SELECT * FROM shard.journal_uploads AS s WHERE NOT EXISTS (
+            SELECT 1 FROM main.journal_uploads AS m
+            WHERE m.chain = s.chain AND m.token_id = s.token_id AND m.kind = s.kind AND m.ref = s.ref
+              AND m.owner = s.owner AND m.stats = s.stats
+        )
+    """,
+}
+
+
+def state_snapshot_path(manifest_dir, shard):
+    index, count = shard
+    return os.path.join(manifest_dir, f"state-shard-{index}-of-{count}.sqlite3")
+
+
+def write_state_snapshot(manifest_dir, shard, path=None):
+    """Copies the state database into ``manifest_dir`` so the merge step can keep what this shard built."""
+    os.makedirs(manifest_dir, exist_ok=True)
+    snapshot = state_snapshot_path(manifest_dir, shard)
+    if os.path.exists(snapshot):
+        os.remove(snapshot)
+    conn = connect_state_db(path or STATE_DB_PATH)
+    try:
+        conn.execute("VACUUM INTO ?", (snapshot,))
+    finally:
+        conn.close()
+    return snapshot
+
+
+def _merge_owner_index(conn):
+    """Takes each contract's Transfer-log index from the shard when it was synced further than ours."""
+    rows = conn.execute("SELECT chain, contract, last_block FROM shard.index_checkpoints").fetchall()
+    for chain, contract, last_block in rows:
+        current = conn.execute(
+            "SELECT last_block FROM main.index_checkpoints WHERE chain = ? AND contract = ?", (chain, contract)
+        ).fetchone()
+        if current is not None and current[0] >= last_block:
+            continue
+        conn.execute("DELETE FROM main.token_owners WHERE chain = ? AND contract = ?", (chain, contract))
+        conn.execute(
+            "INSERT INTO main.token_owners SELECT * FROM shard.token_owners WHERE chain = ? AND contract = ?",
+            (chain, contract),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO main.index_checkpoints (chain, contract, last_block) VALUES (?, ?, ?)",
+            (chain, contract, last_block),
+        )
+
+
+def merge_state_snapshots(manifest_dir, path=None):
+    """Folds every shard's state snapshot found under ``manifest_dir`` into the state database.
+
+    Returns the number of snapshots merged.
+    """
+    snapshots = sorted(glob.glob(os.path.join(manifest_dir, "**", "state-shard-*-of-*.sqlite3"), recursive=True))
+    if not snapshots:
+        return 0
+    conn = connect_state_db(path or STATE_DB_PATH)
+    try:
+        for snapshot in snapshots:
+            conn.execute("ATTACH DATABASE ? AS shard", (snapshot,))
+            try:
+                with conn:
+                    tables = dict(conn.execute(
+                        "SELECT name, sql FROM shard.sqlite_master WHERE type = 'table'"
+                    ).fetchall())
+                    # Create what the merge has never used itself from the shard's own schema.
+                    for name, sql in conn.execute(
+                        "SELECT name, sql FROM shard.sqlite_master "
+                        "WHERE type IN ('table', 'index') AND sql IS NOT NULL AND name NOT LIKE 'sqlite_%'"
+                    ).fetchall():
+                        if not conn.execute("SELECT 1 FROM main.sqlite_master WHERE name = ?", (name,)).fetchone():
+                            conn.execute(sql)
+                    for name, statement in _STATE_MERGES.items():
+                        if name in tables:
+                            conn.execute(statement)
+                    if "index_checkpoints" in tables and "token_owners" in tables:
+                        _merge_owner_index(conn)
+            finally:
+                conn.execute("DETACH DATABASE shard")
+            print(f"Merged shard state from {snapshot}.")
+    finally:
+        conn.close()
+    return len(snapshots)
@@ -0,0 +1,101 @@
+"""Persistent per-token state used to skip NFTs whose data has not changed.
+
+Each row records, per chain and token ID, the owner and wallet stats the token
+was last rendered with and the root hash (or CID) that was committed on-chain
+for it. A token only needs a new render/upload/commit when its owner or stats
+differ from the stored row.
+"""
+import json
+import os
+import sqlite3
+import time
+
+# Location of the SQLite database. In GitHub Actions this directory is cached
+# between runs so the state survives across scheduled jobs.
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "./state/nft_state.sqlite3")
+# Seconds a connection waits for another writer (e.g. a parallel chain) before "database is locked".
+STATE_DB_BUSY_TIMEOUT = float(os.getenv("STATE_DB_BUSY_TIMEOUT", "30"))
+# Set FORCE_REFRESH=1 to ignore the stored state and re-process every token.
+FORCE_REFRESH = os.getenv("FORCE_REFRESH", "").lower() in ("1", "true", "yes")
+
+
+def connect_state_db(path, check_same_thread=True):
+    """Opens the state database at ``path`` for use next to other connections and processes.
+
+    WAL mode lets readers run while one connection writes, and the busy
+    timeout makes a second writer wait instead of failing.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=STATE_DB_BUSY_TIMEOUT, check_same_thread=check_same_thread)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def _encode_stats(stats):
+    return json.dumps(stats, sort_keys=True)
+
+
+class StateStore:
+    """SQLite-backed store of the last committed state of every token."""
+
+    def __init__(self, path=None):
+        self.path = path or STATE_DB_PATH
+        self.conn = connect_state_db(self.path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tokens (
+                chain TEXT NOT NULL,
+                token_id INTEGER NOT NULL,
+                owner TEXT NOT NULL,
+                stats TEXT NOT NULL,
+                root_hash TEXT NOT NULL,
+                block_number INTEGER,
+                updated_at INTEGER NOT NULL,
+                PRIMARY KEY (chain, token_id)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def last_updates(self, chain):
+        """Returns ``{token_id: (owner, updated_at)}`` for every stored token of ``chain``."""
+        rows = self.conn.execute("SELECT token_id, owner, updated_at FROM tokens WHERE chain = ?", (chain,)).fetchall()
+        return {token_id: (owner, updated_at) for token_id, owner, updated_at in rows}
+
+    def needs_update(self, chain, token_id, owner, stats):
+        """Returns True if the token's owner or stats changed since the last commit."""
+        if FORCE_REFRESH:
+            return True
+        row = self.conn.execute(
+            "SELECT owner, stats FROM tokens WHERE chain = ? AND token_id = ?",
+            (chain, token_id),
+        ).fetchone()
+        if row is None:
+            return True
+        return row[0].lower() != owner.lower() or row[1] != _encode_stats(stats)
+
+    def record_many(self, chain, updates, block_number=None):
+        """Stores committed tokens. ``updates`` is an iterable of (token_id, owner, stats, root_hash)."""
+        now = int(time.time())
+        self.conn.executemany(
+            """
+            INSERT INTO tokens (chain, token_id, owner, stats, root_hash, block_number, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (chain, token_id) DO UPDATE SET
+                owner = excluded.owner,
+                stats = excluded.stats,
+                root_hash = excluded.root_hash,
+                block_number = excluded.block_number,
+                updated_at = excluded.updated_at
+            """,
+            [
+                (chain, token_id, owner, _encode_stats(stats), root_hash, block_number, now)
+                for token_id, owner, stats, root_hash in updates
+            ],
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,245 @@
+"""Run telemetry: counters, gauges and latency histograms for the update job.
+
+Hot paths record into the process-wide ``metrics`` registry: RPC batches,
+wallet stats, rendering, metadata building, uploads (bytes, retries,
+failures) and the batch transactions. At the end of a run ``write_reports``
+saves a JSON report and a Prometheus textfile (for node_exporter's textfile
+collector), so a slow run can be broken down after the fact.
+
+Set PROFILE=cprofile (or PROFILE=pyinstrument, if installed) to also profile
+each chain's update thread; the profiles are written to PROFILE_DIR.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Where the end-of-run reports go; set either to an empty string to skip it.
+TELEMETRY_JSON = os.getenv("TELEMETRY_JSON", "./state/run_report.json")
+TELEMETRY_PROM = os.getenv("TELEMETRY_PROM", "./state/nft_updater.prom")
+# Optional profiler: "cprofile" or "pyinstrument".
+PROFILE = os.getenv("PROFILE", "").lower()
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./state/profiles")
+
+METRIC_PREFIX = "nft_updater_"
+# Upper bounds in seconds; wide enough for a 5 ms RPC batch and a 5 minute CLI upload.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram, cumulative like Prometheus histograms."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Estimates the ``q`` quantile by interpolating inside the bucket that holds it."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / bucket_count)
+            seen += bucket_count
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": round(self.quantile(0.5), 6),
+            "p90": round(self.quantile(0.9), 6),
+            "p99": round(self.quantile(0.99), 6),
+            "max": round(self.max, 6),
+            "buckets": {str(bound): count for bound, count in zip(self.buckets, self.counts)},
+        }
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Telemetry:
+    """Thread-safe registry of counters, gauges and histograms keyed by name and labels."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.started_at = time.time()
+
+    def count(self, name, value=1, **labels):
+        """Adds ``value`` to a counter; counter names end in ``_total``."""
+        key = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges[_key(name, labels)] = value
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Times the ``with`` block into the ``name`` histogram, whether or not it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+            self.started_at = time.time()
+
+    def snapshot(self):
+        """Returns every metric as plain JSON-serialisable data."""
+        with self.lock:
+            return {
+                "counters": [{"name": name, "labels": dict(labels), "value": value}
+                             for (name, labels), value in sorted(self.counters.items())],
+                "gauges": [{"name": name, "labels": dict(labels), "value": value}
+                           for (name, labels), value in sorted(self.gauges.items())],
+                "histograms": [{"name": name, "labels": dict(labels), **histogram.to_dict()}
+                               for (name, labels), histogram in sorted(self.histograms.items())],
+            }
+
+    def prometheus(self):
+        """Renders every metric in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            for kind, series in (("counter", self.counters), ("gauge", self.gauges)):
+                typed = set()
+                for (name, labels), value in sorted(series.items()):
+                    metric = METRIC_PREFIX + name
+                    if metric not in typed:
+                        lines.append(f"# TYPE {metric} {kind}")
+                        typed.add(metric)
+                    lines.append(f"{metric}{_format_labels(labels)} {value}")
+            typed = set()
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                metric = METRIC_PREFIX + name
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} histogram")
+                    typed.add(metric)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{metric}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{metric}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram.count}")
+                lines.append(f"{metric}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Telemetry()
+
+
+def _write_atomically(path, text):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # The textfile collector may read at any moment, so never expose a half-written file.
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as f:
+        f.write(text)
+    os.replace(temporary, path)
+
+
+def write_reports(summary=None, json_path=None, prom_path=None):
+    """Writes the JSON run report and the Prometheus textfile; ``summary`` is added to the JSON."""
+    json_path = TELEMETRY_JSON if json_path is None else json_path
+    prom_path = TELEMETRY_PROM if prom_path is None else prom_path
+    finished_at = time.time()
+    metrics.set("last_run_timestamp_seconds", int(finished_at))
+    metrics.set("run_duration_seconds", round(finished_at - metrics.started_at, 3))
+    try:
+        if json_path:
+            report = {
+                "started_at": metrics.started_at,
+                "finished_at": finished_at,
+                "duration_seconds": round(finished_at - metrics.started_at, 3),
+                "summary": summary or {},
+                **metrics.snapshot(),
+            }
+            _write_atomically(json_path, json.dumps(report, indent=2))
+            print(f"Run report written to {json_path}")
+        if prom_path:
+            _write_atomically(prom_path, metrics.prometheus())
+    except OSError as e:
+        print(f"Warning: Could not write the run report: {e}")
+
+
+@contextmanager
+def profiled(label):
+    """Profiles the ``with`` block on the current thread when PROFILE is set."""
+    if PROFILE not in ("cprofile", "pyinstrument"):
+        yield
+        return
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    if PROFILE == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("Warning: PROFILE=pyinstrument but pyinstrument is not installed. Using cProfile.")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                path = os.path.join(PROFILE_DIR, f"{label}.html")
+                with open(path, "w") as f:
+                    f.write(profiler.output_html())
+                print(f"Profile written to {path}")
+            return
+
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        path = os.path.join(PROFILE_DIR, f"{label}.prof")
+        profiler.dump_stats(path)
+        print(f"Profile written to {path} (inspect with: python -m pstats {path})")
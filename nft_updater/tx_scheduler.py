@@ -0,0 +1,209 @@
+"""Gas-bounded, pipelined submission of ``batchSetTokenRootHashes`` transactions.
+
+Against the compact contract variant the same updates are packed with
+nft_updater/cid_codec.py and sent as ``batchSetTokenDigests`` instead.
+
+Updates are split into chunks whose estimated gas stays under a budget derived
+from the block gas limit. Every chunk is signed with a locally assigned
+sequential nonce and sent straight away, without waiting for the previous
+receipt; all receipts are then awaited together. Chunks that fail to estimate,
+send or execute are re-queued on their own instead of failing the whole run.
+"""
+import os
+import time
+
+from nft_updater.cid_codec import encode_ref, encode_refs
+from nft_updater.telemetry import metrics
+
+# Fraction of the block gas limit a single chunk may use.
+TX_GAS_FRACTION = float(os.getenv("TX_GAS_FRACTION", "0.5"))
+# Explicit gas budget per chunk; overrides TX_GAS_FRACTION when set.
+TX_MAX_GAS = int(os.getenv("TX_MAX_GAS", "0"))
+# Upper bound on tokens per chunk regardless of gas.
+TX_MAX_CHUNK = int(os.getenv("TX_MAX_CHUNK", "500"))
+# The same bound for the compact contract, whose updates carry about a third of the calldata.
+TX_MAX_CHUNK_COMPACT = int(os.getenv("TX_MAX_CHUNK_COMPACT", "1500"))
+# Submission rounds before failed chunks are given up on.
+TX_MAX_ROUNDS = int(os.getenv("TX_MAX_ROUNDS", "3"))
+# Seconds to wait for each receipt.
+TX_RECEIPT_TIMEOUT = int(os.getenv("TX_RECEIPT_TIMEOUT", "300"))
+# Safety margin added on top of each gas estimate.
+GAS_BUFFER = 1.2
+
+
+class TxScheduler:
+    """Splits, signs and submits batch root-hash updates for one signer."""
+
+    def __init__(self, w3, contract, account, private_key, on_submit=None, on_settled=None, compact=False):
+        """``on_submit(tx_hash, nonce, token_ids, root_hashes)`` runs just before each chunk is broadcast
+        and ``on_settled(tx_hash, success, block_number)`` when its receipt arrives, e.g. to journal them.
+        ``compact`` targets the bytes32-digest contract variant."""
+        self.w3 = w3
+        self.contract = contract
+        self.account = account
+        self.private_key = private_key
+        self.on_submit = on_submit
+        self.on_settled = on_settled
+        self.compact = compact
+        self.max_chunk = TX_MAX_CHUNK_COMPACT if compact else TX_MAX_CHUNK
+
+    def _gas_budget(self):
+        if TX_MAX_GAS:
+            return TX_MAX_GAS
+        block_gas_limit = self.w3.eth.get_block("latest")["gasLimit"]
+        return int(block_gas_limit * TX_GAS_FRACTION / GAS_BUFFER)
+
+    def _batch_call(self, token_ids, root_hashes):
+        """The contract call that sets ``root_hashes`` for ``token_ids``."""
+        if self.compact:
+            digests, formats = encode_refs(token_ids, root_hashes)
+            return self.contract.functions.batchSetTokenDigests(token_ids, digests, formats)
+        return self.contract.functions.batchSetTokenRootHashes(token_ids, root_hashes)
+
+    def estimate_gas(self, token_ids, root_hashes):
+        return self._batch_call(token_ids, root_hashes).estimate_gas({"from": self.account.address})
+
+    def _encodable(self, items):
+        """Drops updates whose reference the compact contract cannot store."""
+        kept = []
+        for token_id, root_hash in items:
+            try:
+                encode_ref(token_id, root_hash)
+            except ValueError as e:
+                print(f"Error: Skipping Token ID {token_id}: {e}")
+                continue
+            kept.append((token_id, root_hash))
+        return kept
+
+    def _plan_chunks(self, items, budget):
+        """Splits ``items`` into (items, estimated_gas) chunks that fit the gas budget.
+
+        The first estimate sets a per-token gas figure used to size the chunks;
+        any chunk that still fails to estimate or exceeds the budget is halved.
+        """
+        if not items:
+            return []
+        probe = items[:min(len(items), self.max_chunk)]
+        try:
+            per_token = max(1, self.estimate_gas(*map(list, zip(*probe))) // len(probe))
+            chunk_size = max(1, min(self.max_chunk, budget // per_token))
+        except Exception as e:
+            print(f"Warning: Gas estimate for a {len(probe)}-token probe failed ({e}). Sizing chunks by halving.")
+            chunk_size = max(1, len(probe) // 2)
+
+        pending = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        planned = []
+        while pending:
+            chunk = pending.pop(0)
+            try:
+                estimated_gas = self.estimate_gas(*map(list, zip(*chunk)))
+            except Exception as e:
+                if len(chunk) == 1:
+                    print(f"Error: Gas estimation failed for Token ID {chunk[0][0]}: {e}")
+                    continue
+                estimated_gas = None
+            if estimated_gas is None or estimated_gas > budget:
+                if len(chunk) == 1:
+                    print(f"Error: Token ID {chunk[0][0]} alone exceeds the gas budget ({estimated_gas} > {budget}).")
+                    continue
+                middle = len(chunk) // 2
+                pending[:0] = [chunk[:middle], chunk[middle:]]
+                continue
+            planned.append((chunk, estimated_gas))
+        return planned
+
+    def commit(self, token_ids, root_hashes, max_total_gas=0):
+        """Commits all updates and returns the set of token IDs confirmed on-chain.
+
+        With ``max_total_gas`` chunks are sent in the given order only while
+        their estimated gas fits in it; the rest are left for a later run.
+        """
+        items = list(zip(token_ids, root_hashes))
+        if self.compact:
+            items = self._encodable(items)
+        # Updates actually attempted, without those the compact contract cannot store.
+        attempted = len(items)
+        budget = self._gas_budget()
+        committed = set()
+        started = time.monotonic()
+        total_gas_used = 0
+        estimated_total = 0
+        deferred = []
+
+        for round_number in range(1, TX_MAX_ROUNDS + 1):
+            if not items:
+                break
+            chunks = self._plan_chunks(items, budget)
+            print(f"Round {round_number}: {len(items)} updates in {len(chunks)} chunk(s), gas budget {budget} per chunk.")
+
+            # Assign nonces locally and send every chunk without waiting for receipts.
+            nonce = self.w3.eth.get_transaction_count(self.account.address, "pending")
+            gas_price = self.w3.eth.gas_price
+            sent = []
+            unsent = []
+            for index, (chunk, estimated_gas) in enumerate(chunks):
+                if max_total_gas and estimated_total + estimated_gas > max_total_gas:
+                    held_back = [item for remaining, _ in chunks[index:] for item in remaining]
+                    deferred.extend(held_back)
+                    metrics.count("tx_deferred_updates_total", len(held_back))
+                    print(f"Gas budget of {max_total_gas} reached; deferring {len(held_back)} updates to the next run.")
+                    break
+                chunk_token_ids, chunk_hashes = map(list, zip(*chunk))
+                try:
+                    tx_data = self._batch_call(chunk_token_ids, chunk_hashes).build_transaction({
+                        'from': self.account.address,
+                        'nonce': nonce,
+                        'gasPrice': gas_price,
+                        'gas': int(estimated_gas * GAS_BUFFER),
+                    })
+                    signed_tx = self.w3.eth.account.sign_transaction(tx_data, private_key=self.private_key)
+                    if self.on_submit is not None:
+                        # Recorded before broadcasting, so a crash right after the send cannot lose the hash.
+                        self.on_submit(signed_tx.hash.hex(), nonce, chunk_token_ids, chunk_hashes)
+                    with metrics.timer("tx_send_seconds"):
+                        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+                except Exception as e:
+                    # A send failure leaves a nonce gap, so hold back the remaining chunks for the next round.
+                    metrics.count("tx_chunks_total", len(chunks) - index, status="unsent")
+                    print(f"Error sending chunk {index + 1}/{len(chunks)}: {e}")
+                    unsent = [item for remaining, _ in chunks[index:] for item in remaining]
+                    break
+                print(f"Chunk {index + 1}/{len(chunks)} sent ({len(chunk)} tokens, nonce {nonce}). Hash: {tx_hash.hex()}")
+                sent.append((index, chunk, tx_hash))
+                estimated_total += estimated_gas
+                nonce += 1
+
+            # Wait for all receipts at once; later chunks are usually mined alongside earlier ones.
+            failed = []
+            for index, chunk, tx_hash in sent:
+                try:
+                    with metrics.timer("tx_receipt_wait_seconds"):
+                        receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=TX_RECEIPT_TIMEOUT)
+                except Exception as e:
+                    # Still pending: resending with a new nonce would queue behind it, so leave it be.
+                    metrics.count("tx_chunks_total", status="pending")
+                    print(f"Warning: No receipt for chunk {index + 1} ({tx_hash.hex()}) yet: {e}")
+                    continue
+                total_gas_used += receipt.gasUsed
+                metrics.count("tx_gas_used_total", receipt.gasUsed)
+                if self.on_settled is not None:
+                    self.on_settled(tx_hash.hex(), receipt.status == 1, receipt.blockNumber)
+                if receipt.status == 1:
+                    metrics.count("tx_chunks_total", status="confirmed")
+                    committed.update(token_id for token_id, _ in chunk)
+                    print(f"Chunk {index + 1} confirmed in block {receipt.blockNumber}. Gas used: {receipt.gasUsed}")
+                else:
+                    metrics.count("tx_chunks_total", status="reverted")
+                    print(f"Error: Chunk {index + 1} reverted. Gas used: {receipt.gasUsed}. Re-queueing.")
+                    failed.extend(chunk)
+
+            items = failed + unsent
+
+        elapsed = time.monotonic() - started
+        print(f"Committed {len(committed)} of {attempted - len(deferred)} updates. Total gas used: {total_gas_used}. "
+              f"Time to confirmation: {elapsed:.1f}s")
+        if attempted < len(token_ids):
+            print(f"Warning: {len(token_ids) - attempted} updates were skipped because their reference could not be encoded.")
+        if items:
+            print(f"Warning: {len(items)} updates could not be committed after {TX_MAX_ROUNDS} rounds.")
+        return committed
@@ -0,0 +1,106 @@
+"""Content-addressed cache of uploaded files.
+
+Files are keyed by the SHA-256 of their bytes, so an image or metadata file
+that is byte-for-byte identical to one uploaded before (for another token or
+in an earlier run) reuses the stored root hash/CID instead of being uploaded
+again. Entries live in the same SQLite database as the token state store.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from nft_updater.state_store import STATE_DB_PATH, connect_state_db
+from nft_updater.telemetry import metrics
+
+
+class UploadCache:
+    """Maps content hashes to the root hash/CID returned by a storage backend."""
+
+    def __init__(self, backend, path=None):
+        self.backend = backend
+        self.path = path or STATE_DB_PATH
+        # Uploads run on worker threads, so the connection is shared behind a lock.
+        self.conn = connect_state_db(self.path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS upload_cache (
+                backend TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                ref TEXT NOT NULL,
+                created_at INTEGER NOT NULL,
+                PRIMARY KEY (backend, content_hash)
+            )
+            """
+        )
+        self.conn.commit()
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def lookup(self, content_hash):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT ref FROM upload_cache WHERE backend = ? AND content_hash = ?",
+                (self.backend, content_hash),
+            ).fetchone()
+        return row[0] if row else None
+
+    def store(self, content_hash, ref):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO upload_cache (backend, content_hash, ref, created_at) VALUES (?, ?, ?, ?)",
+                (self.backend, content_hash, ref, int(time.time())),
+            )
+            self.conn.commit()
+
+    def cached(self, name, data, kind="file"):
+        """Returns the cached reference for ``data``, counting a hit, or None."""
+        ref = self.lookup(hashlib.sha256(data).hexdigest())
+        if ref:
+            with self.lock:
+                self.hits[kind] += 1
+            metrics.count("upload_cache_hits_total", backend=self.backend, kind=kind)
+            print(f"Upload cache hit for {name}: {ref}")
+        return ref
+
+    def remember(self, data, ref, kind="file"):
+        """Records that ``data`` was uploaded as ``ref`` by some other path than ``upload``, e.g. in a directory."""
+        with self.lock:
+            self.misses[kind] += 1
+        self.store(hashlib.sha256(data).hexdigest(), ref)
+        metrics.count("uploaded_bytes_total", len(data), backend=self.backend, kind=kind)
+
+    def upload(self, name, data, upload_fn, kind="file"):
+        """Returns the cached reference for ``data`` or uploads it with ``upload_fn(name, data)``.
+
+        Failed uploads (``upload_fn`` returning a falsy value) are not cached.
+        """
+        ref = self.cached(name, data, kind)
+        if ref:
+            return ref
+
+        with self.lock:
+            self.misses[kind] += 1
+        with metrics.timer("upload_seconds", backend=self.backend, kind=kind):
+            ref = upload_fn(name, data)
+        if ref:
+            self.store(hashlib.sha256(data).hexdigest(), ref)
+            metrics.count("uploads_total", backend=self.backend, kind=kind)
+            metrics.count("uploaded_bytes_total", len(data), backend=self.backend, kind=kind)
+        else:
+            metrics.count("upload_failures_total", backend=self.backend, kind=kind)
+        return ref
+
+    def report(self):
+        """Prints the hit rate for every kind of file seen during the run."""
+        print(f"\n--- Upload Cache Report ({self.backend}) ---")
+        kinds = sorted(set(self.hits) | set(self.misses))
+        if not kinds:
+            print("No uploads were requested.")
+        for kind in kinds:
+            total = self.hits[kind] + self.misses[kind]
+            print(f"{kind}: {self.hits[kind]}/{total} cache hits ({100.0 * self.hits[kind] / total:.1f}%)")
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,139 @@
+"""Wallet first-activity lookup by binary search over historical nonces.
+
+An account's nonce at block ``n`` is the number of transactions it had sent up
+to and including ``n``, so the block of its first outgoing transaction is the
+smallest ``n`` with a non-zero nonce. That block is found by binary-searching
+``eth_getTransactionCount(address, n)``: O(log blocks) calls and no indexer
+needed. All wallets of a chunk are searched in lockstep, so each step is one
+JSON-RPC batch. Results are cached per address in the state database, since
+first activity never changes. The endpoint must serve historical state
+(archive data); when it does not, the wallet is simply left without an age.
+"""
+import os
+import threading
+
+from nft_updater.rpc_batch import rpc_calls
+from nft_updater.state_store import STATE_DB_PATH, connect_state_db
+
+# Set WALLET_AGE=0 to skip the first-activity lookup entirely.
+WALLET_AGE = os.getenv("WALLET_AGE", "1").lower() not in ("0", "false", "no")
+
+
+class WalletAgeIndex:
+    """Persistent cache of each wallet's first-activity block and timestamp."""
+
+    def __init__(self, path=None):
+        self.path = path or STATE_DB_PATH
+        # Lookups run on the pipeline's worker threads.
+        self.conn = connect_state_db(self.path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS wallet_first_activity (
+                chain TEXT NOT NULL,
+                address TEXT NOT NULL,
+                first_block INTEGER,
+                first_timestamp INTEGER,
+                checked_block INTEGER NOT NULL,
+                PRIMARY KEY (chain, address)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def _cached(self, chain, addresses):
+        addresses = list(addresses)
+        rows = []
+        with self.lock:
+            # Stay well under SQLite's limit on bound parameters.
+            for start in range(0, len(addresses), 500):
+                chunk = addresses[start:start + 500]
+                rows += self.conn.execute(
+                    "SELECT address, first_block, first_timestamp, checked_block FROM wallet_first_activity "
+                    f"WHERE chain = ? AND address IN ({', '.join('?' * len(chunk))})",
+                    (chain, *chunk),
+                ).fetchall()
+        return {row[0]: row[1:] for row in rows}
+
+    def _save(self, chain, rows):
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO wallet_first_activity (chain, address, first_block, first_timestamp, checked_block) VALUES (?, ?, ?, ?, ?)",
+                [(chain, *row) for row in rows],
+            )
+            self.conn.commit()
+
+    def first_activity(self, w3, chain, addresses, tx_counts, head_block, batch_size=None):
+        """Returns ``{address: first_timestamp}`` (None when unknown or never active) for ``addresses``.
+
+        ``tx_counts`` are the addresses' nonces at ``head_block``; a zero nonce
+        means no outgoing transaction yet, without any search. Addresses
+        missing from it (their read failed) are left unknown and not cached.
+        """
+        cached = self._cached(chain, addresses)
+        results = {}
+        # address -> [low, high] bounds of the search for the first non-zero nonce.
+        searches = {}
+        new_rows = []
+
+        for address in addresses:
+            first_block, first_timestamp, checked_block = cached.get(address, (None, None, None))
+            if first_block is not None:
+                results[address] = first_timestamp
+                continue
+            if address not in tx_counts:
+                # The nonce read failed; a missing count says nothing about activity.
+                results[address] = None
+                continue
+            if tx_counts[address] == 0:
+                results[address] = None
+                new_rows.append((address, None, None, head_block))
+                continue
+            # A previous run saw a zero nonce at checked_block, so the first tx is after it.
+            low = 0 if checked_block is None else checked_block + 1
+            searches[address] = [low, head_block]
+
+        while True:
+            pending = [(address, bounds) for address, bounds in searches.items() if bounds[0] < bounds[1]]
+            if not pending:
+                break
+            middles = [(bounds[0] + bounds[1]) // 2 for _, bounds in pending]
+            replies = rpc_calls(
+                w3,
+                [("eth_getTransactionCount", [address, hex(middle)]) for (address, _), middle in zip(pending, middles)],
+                batch_size,
+            )
+            for (address, bounds), middle, reply in zip(pending, middles, replies):
+                if reply is None:
+                    # Historical state is not available for this block; give up on this wallet for now.
+                    print(f"Warning: Could not read the nonce of {address} at block {middle}. Wallet age unavailable.")
+                    del searches[address]
+                    results[address] = None
+                elif int(reply, 16) > 0:
+                    bounds[1] = middle
+                else:
+                    bounds[0] = middle + 1
+
+        first_blocks = {address: bounds[0] for address, bounds in searches.items()}
+        blocks = sorted(set(first_blocks.values()))
+        replies = rpc_calls(w3, [("eth_getBlockByNumber", [hex(block), False]) for block in blocks], batch_size)
+        timestamps = {
+            block: int(reply["timestamp"], 16)
+            for block, reply in zip(blocks, replies)
+            if reply and reply.get("timestamp")
+        }
+
+        for address, first_block in first_blocks.items():
+            timestamp = timestamps.get(first_block)
+            results[address] = timestamp
+            if timestamp is not None:
+                new_rows.append((address, first_block, timestamp, head_block))
+
+        if new_rows:
+            self._save(chain, new_rows)
+        if searches:
+            print(f"Wallet age: resolved first activity for {len(first_blocks)} wallets.")
+        return results
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,378 @@
+"""Bounded pool of concurrent 0G Storage CLI uploads.
+
+Each upload runs ``zg_storage upload`` as its own subprocess with a per-job
+timeout; a job that overruns is killed rather than stalling the run. The CLI
+signs an on-chain submission with the uploader key, so concurrent jobs that
+share a key would race for the same nonce. To avoid that, every key has a lock
+that is held for the nonce-sensitive start of a job: until the CLI prints a
+line matching ``ZG_NONCE_RELEASE_PATTERN``, ``ZG_NONCE_WINDOW`` seconds pass,
+or the process exits, whichever comes first. Supplying several keys through
+``ZG_UPLOAD_KEYS`` partitions jobs across signers so they never wait on each
+other.
+
+Starting the CLI for every file repeats its RPC and indexer handshake each
+time. With ``ZG_UPLOAD_HELPER`` pointing at a build of
+tools/zg_upload_helper, the pool instead keeps up to ``concurrency``
+resident helper processes, each connected once and bound to one key. Files
+are sent to an idle helper as JSON lines and come back as structured results
+(``{"id", "root"}`` or ``{"id", "error"}``); a ``submitted`` event releases the
+key lock as the CLI's log line does. If a helper cannot be started, the pool
+falls back to one CLI process per file.
+"""
+import collections
+import itertools
+import json
+import os
+import queue
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from nft_updater.artifacts import ScratchFile
+from nft_updater.telemetry import metrics
+
+# Maximum number of CLI processes running at once.
+ZG_UPLOAD_CONCURRENCY = int(os.getenv("ZG_UPLOAD_CONCURRENCY", "4"))
+# Seconds an upload may take before its process is killed.
+ZG_UPLOAD_TIMEOUT = float(os.getenv("ZG_UPLOAD_TIMEOUT", "400"))
+# Longest time a job holds its key's lock while the CLI submits its transaction.
+ZG_NONCE_WINDOW = float(os.getenv("ZG_NONCE_WINDOW", "20"))
+# CLI output that signals the signed transaction has been sent, releasing the key early.
+ZG_NONCE_RELEASE_PATTERN = os.getenv(
+    "ZG_NONCE_RELEASE_PATTERN", r"(?i)(succeeded to send transaction|transaction hash|tx hash|receipt)"
+)
+# Optional comma-separated list of extra signer keys to spread uploads over.
+ZG_UPLOAD_KEYS = [k.strip() for k in os.getenv("ZG_UPLOAD_KEYS", "").split(",") if k.strip()]
+# Resident upload helper (tools/zg_upload_helper); empty runs the CLI once per file.
+ZG_UPLOAD_HELPER = os.getenv("ZG_UPLOAD_HELPER", "")
+# Seconds a helper may take to connect before the pool falls back to the CLI.
+ZG_HELPER_START_TIMEOUT = float(os.getenv("ZG_HELPER_START_TIMEOUT", "60"))
+
+ROOT_HASH_PATTERN = re.compile(r"root(?:\s*hash)?\s*[=:]?\s*(0x[0-9a-fA-F]{64})", re.IGNORECASE)
+
+
+def parse_root_hash(output):
+    """Extracts the root hash from the CLI output, or returns None."""
+    for line in output.splitlines():
+        if "Root hash" in line or "file uploaded, root =" in line:
+            return line.split()[-1]
+    match = ROOT_HASH_PATTERN.search(output)
+    return match.group(1) if match else None
+
+
+class HelperError(Exception):
+    """Raised when an upload helper exits, fails to start or stops answering."""
+
+
+class UploadHelper:
+    """One resident helper process, connected once and bound to one signer key.
+
+    It uploads one file at a time; the pool runs several for concurrency.
+    """
+
+    def __init__(self, executable, rpc_url, indexer_url, key, key_index):
+        self.key_index = key_index
+        # The key goes through the environment so it never shows up in process listings.
+        self.process = subprocess.Popen(
+            [executable, "serve", "--url", rpc_url, "--indexer", indexer_url],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1,
+            env={**os.environ, "ZG_HELPER_KEY": key},
+        )
+        self.messages = queue.Queue()
+        # The helper's own log, kept for error reports.
+        self.log = collections.deque(maxlen=20)
+        self._ids = itertools.count(1)
+        threading.Thread(target=self._read_messages, daemon=True).start()
+        threading.Thread(target=self._read_log, daemon=True).start()
+
+    def _read_messages(self):
+        for line in self.process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(message, dict):
+                self.messages.put(message)
+        self.messages.put(None)
+
+    def _read_log(self):
+        for line in self.process.stderr:
+            self.log.append(line.rstrip())
+
+    def _next_message(self, deadline):
+        try:
+            message = self.messages.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            raise HelperError("timed out") from None
+        if message is None:
+            raise HelperError(f"exited with code {self.process.wait()}: {' | '.join(self.log)}")
+        return message
+
+    def wait_ready(self, timeout):
+        message = self._next_message(time.monotonic() + timeout)
+        if message.get("event") != "ready":
+            raise HelperError(message.get("error") or f"unexpected first message {message}")
+
+    def upload(self, file_path, timeout, on_submitted):
+        """Uploads ``file_path`` and returns the helper's result dict (``root`` or ``error``).
+
+        ``on_submitted`` is called when the helper reports the storage
+        transaction as sent. Raises HelperError if the helper dies or times out.
+        """
+        request_id = next(self._ids)
+        try:
+            self.process.stdin.write(json.dumps({"id": request_id, "file": os.path.abspath(file_path)}) + "\n")
+            self.process.stdin.flush()
+        except OSError as e:
+            raise HelperError(f"stopped accepting requests: {e}") from e
+        deadline = time.monotonic() + timeout
+        while True:
+            message = self._next_message(deadline)
+            if message.get("id") != request_id:
+                continue
+            if message.get("event") == "submitted":
+                on_submitted()
+                continue
+            return message
+
+    def close(self, timeout=10):
+        """Asks the helper to exit by closing its input; kills it if it does not."""
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+    def kill(self):
+        self.process.kill()
+        self.process.wait()
+
+
+class ZgUploadPool:
+    """Runs 0G Storage CLI uploads on a bounded pool of worker threads."""
+
+    def __init__(self, cli_executable, rpc_url, indexer_url, keys,
+                 concurrency=None, timeout=None, nonce_window=None, helper_executable=None):
+        self.cli_executable = cli_executable
+        self.helper_executable = ZG_UPLOAD_HELPER if helper_executable is None else helper_executable
+        self.rpc_url = rpc_url
+        self.indexer_url = indexer_url
+        self.keys = [k for k in keys if k]
+        self.timeout = timeout or ZG_UPLOAD_TIMEOUT
+        self.nonce_window = ZG_NONCE_WINDOW if nonce_window is None else nonce_window
+        self.release_pattern = re.compile(ZG_NONCE_RELEASE_PATTERN)
+
+        self._key_locks = [threading.Lock() for _ in self.keys]
+        self._key_cycle = itertools.cycle(range(len(self.keys)))
+        self._cycle_lock = threading.Lock()
+        self._processes = set()
+        self._processes_lock = threading.Lock()
+        self.cancelled = threading.Event()
+        self.concurrency = concurrency or ZG_UPLOAD_CONCURRENCY
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="zg-upload")
+        # Idle helpers, and every helper started, so cancel() can reach the busy ones too.
+        self._idle_helpers = queue.SimpleQueue()
+        self._helpers = set()
+        self._helpers_lock = threading.Lock()
+
+    def _next_key(self):
+        with self._cycle_lock:
+            index = next(self._key_cycle)
+        return self.keys[index], self._key_locks[index]
+
+    def _take_helper(self):
+        """Returns an idle helper, starting one if fewer than ``concurrency`` run. None disables helpers."""
+        try:
+            return self._idle_helpers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._cycle_lock:
+            index = next(self._key_cycle)
+        started = time.monotonic()
+        try:
+            helper = UploadHelper(self.helper_executable, self.rpc_url, self.indexer_url, self.keys[index], index)
+        except OSError as e:
+            self._disable_helpers(e)
+            return None
+        try:
+            helper.wait_ready(ZG_HELPER_START_TIMEOUT)
+        except HelperError as e:
+            helper.kill()
+            self._disable_helpers(e)
+            return None
+        metrics.count("zg_helper_starts_total")
+        metrics.observe("zg_helper_start_seconds", time.monotonic() - started)
+        with self._helpers_lock:
+            self._helpers.add(helper)
+        return helper
+
+    def _disable_helpers(self, error):
+        if self.helper_executable:
+            print(f"Warning: 0G upload helper unavailable ({error}); uploading with one CLI process per file.")
+        self.helper_executable = ""
+
+    def _discard_helper(self, helper):
+        helper.kill()
+        with self._helpers_lock:
+            self._helpers.discard(helper)
+
+    def upload_file(self, file_path):
+        """Uploads one file and returns its root hash, or None on failure."""
+        if self.cancelled.is_set():
+            return None
+        if self.helper_executable:
+            helper = self._take_helper()
+            if helper is not None:
+                return self._upload_with_helper(helper, file_path)
+        return self._upload_with_cli(file_path)
+
+    def _upload_with_helper(self, helper, file_path):
+        key_lock = self._key_locks[helper.key_index]
+        waited = time.monotonic()
+        key_lock.acquire()
+        lock_held = [True]
+        # The nonce-window timer and the helper's "submitted" event may both try to release.
+        release_guard = threading.Lock()
+        started = time.monotonic()
+        metrics.observe("zg_key_wait_seconds", started - waited)
+
+        def release():
+            with release_guard:
+                if lock_held[0]:
+                    lock_held[0] = False
+                    key_lock.release()
+
+        # Hold the key only for the nonce-sensitive part of the upload.
+        window = threading.Timer(self.nonce_window, release)
+        window.start()
+        try:
+            if self.cancelled.is_set():
+                self._idle_helpers.put(helper)
+                return None
+            try:
+                result = helper.upload(file_path, self.timeout, release)
+            except HelperError as e:
+                self._discard_helper(helper)
+                if "timed out" in str(e):
+                    metrics.count("upload_timeouts_total", backend="0g-storage")
+                print(f"Error: 0G upload helper failed while uploading {file_path}: {e}")
+                return None
+            finally:
+                metrics.observe("zg_helper_seconds", time.monotonic() - started)
+            self._idle_helpers.put(helper)
+
+            if self.cancelled.is_set():
+                return None
+            root_hash = result.get("root")
+            if root_hash:
+                print(f"Successfully uploaded {file_path} through the upload helper: {root_hash}")
+                return root_hash
+            print(f"Error: 0G upload helper failed to upload {file_path}: {result.get('error', result)}")
+            return None
+        finally:
+            window.cancel()
+            release()
+
+    def _upload_with_cli(self, file_path):
+        """Uploads one file through a CLI process of its own and returns its root hash, or None on failure."""
+        key, key_lock = self._next_key()
+        command = [
+            self.cli_executable,
+            "upload",
+            "--url", self.rpc_url,
+            "--indexer", self.indexer_url,
+            "--key", key,
+            "--file", file_path,
+        ]
+        # Never echo the signing key into the logs.
+        printable = " ".join("***" if part == key else part for part in command)
+
+        waited = time.monotonic()
+        key_lock.acquire()
+        lock_held = True
+        started = time.monotonic()
+        metrics.observe("zg_key_wait_seconds", started - waited)
+        try:
+            if self.cancelled.is_set():
+                return None
+            print(f"Executing command: {printable}")
+            process = subprocess.Popen(
+                command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+            )
+            with self._processes_lock:
+                self._processes.add(process)
+
+            output_lines = []
+            submitted = threading.Event()
+
+            def read_output():
+                for line in process.stdout:
+                    output_lines.append(line)
+                    if self.release_pattern.search(line):
+                        submitted.set()
+                submitted.set()
+
+            reader = threading.Thread(target=read_output, daemon=True)
+            reader.start()
+
+            # Hold the key only for the nonce-sensitive part of the upload.
+            submitted.wait(self.nonce_window)
+            key_lock.release()
+            lock_held = False
+
+            try:
+                process.wait(timeout=max(0.0, self.timeout - (time.monotonic() - started)))
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+                metrics.count("upload_timeouts_total", backend="0g-storage")
+                print(f"Error: 0G CLI timed out while uploading {file_path}. Process killed.")
+                return None
+            finally:
+                reader.join(timeout=5)
+                with self._processes_lock:
+                    self._processes.discard(process)
+                metrics.observe("zg_cli_seconds", time.monotonic() - started)
+
+            output = "".join(output_lines)
+            if self.cancelled.is_set():
+                return None
+            if process.returncode != 0:
+                print(f"Error: 0G CLI failed to upload {file_path}.")
+                print("Output:", output)
+                return None
+
+            root_hash = parse_root_hash(output)
+            if root_hash:
+                print(f"Successfully extracted root hash for {file_path}: {root_hash}")
+                return root_hash
+            print(f"Error: Could not find root hash in CLI output for {file_path}.")
+            print("Output:", output)
+            return None
+        finally:
+            if lock_held:
+                key_lock.release()
+
+    def upload_bytes(self, name, data):
+        """Uploads an in-memory file through a temporary file in the shared scratch directory."""
+        with ScratchFile(name, data) as file_path:
+            return self.upload_file(file_path)
+
+    def cancel(self):
+        """Stops queued jobs from starting and kills every running CLI and helper process."""
+        self.cancelled.set()
+        with self._processes_lock:
+            for process in list(self._processes):
+                process.kill()
+        with self._helpers_lock:
+            for helper in list(self._helpers):
+                helper.process.kill()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        with self._helpers_lock:
+            helpers, self._helpers = list(self._helpers), set()
+        for helper in helpers:
+            helper.close()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(TESTS_DIR)
+sys.path.insert(0, REPO_ROOT)
+# The stub JSON-RPC node and fake Pinata API live with the benchmarks.
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
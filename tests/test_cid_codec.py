@@ -0,0 +1,102 @@
+import hashlib
+
+import pytest
+
+from nft_updater import reconcile
+from nft_updater.cid_codec import (
+    FORMAT_CID_V0,
+    FORMAT_CID_V1_DAG_PB,
+    FORMAT_CID_V1_RAW,
+    FORMAT_DIRECTORY,
+    FORMAT_NONE,
+    FORMAT_ZG_ROOT,
+    decode_ref,
+    encode_ref,
+    encode_refs,
+)
+
+# sha2-256 of b"hello" and the references other tools derive from it.
+HELLO_DIGEST = hashlib.sha256(b"hello").digest()
+CID_V0 = "QmRN6wdp1S2A5EtjW9A3M1vKSBuQQGcgvuhoMUoEz4iiT5"
+CID_V1_DAG_PB = "bafybeibm6jg3ux5qumhcn2b3flc3tyu6dmlb4xa7u5bf44yegnrjhc4yeq"
+CID_V1_RAW = "bafkreibm6jg3ux5qumhcn2b3flc3tyu6dmlb4xa7u5bf44yegnrjhc4yeq"
+ZG_ROOT = "0x" + HELLO_DIGEST.hex()
+
+
+@pytest.mark.parametrize("ref, fmt", [
+    (CID_V0, FORMAT_CID_V0),
+    (CID_V1_DAG_PB, FORMAT_CID_V1_DAG_PB),
+    (CID_V1_RAW, FORMAT_CID_V1_RAW),
+    (ZG_ROOT, FORMAT_ZG_ROOT),
+])
+def test_round_trip(ref, fmt):
+    digest, encoded_fmt = encode_ref(7, ref)
+    assert (digest, encoded_fmt) == (HELLO_DIGEST, fmt)
+    assert decode_ref(7, digest, encoded_fmt) == ref
+
+
+@pytest.mark.parametrize("cid", [CID_V0, CID_V1_DAG_PB, CID_V1_RAW])
+def test_directory_round_trip(cid):
+    ref = f"{cid}/42.json"
+    digest, fmt = encode_ref(42, ref)
+    assert fmt & FORMAT_DIRECTORY
+    assert decode_ref(42, digest, fmt) == ref
+
+
+def test_mixed_case_root_decodes_in_lowercase():
+    mixed = "0x" + HELLO_DIGEST.hex().upper()
+    digest, fmt = encode_ref(1, mixed)
+    assert fmt == FORMAT_ZG_ROOT
+    assert decode_ref(1, digest, fmt) == ZG_ROOT
+
+
+def test_unset_decodes_to_none():
+    assert decode_ref(1, b"\x00" * 32, FORMAT_NONE) is None
+
+
+@pytest.mark.parametrize("ref", [
+    # Too short for a root hash.
+    ZG_ROOT[:-1],
+    # Not base58 ("0" and "l" are excluded from the alphabet).
+    "Qm0000000000000000000000000000000000000000000l",
+    # A valid CIDv0 with its last character changed decodes to the wrong length or prefix.
+    CID_V0[:-4],
+    # CIDv1 with an identity multihash instead of sha2-256.
+    "bafkqaaa",
+    # Not a reference at all.
+    "ipfs://" + CID_V0,
+    "",
+    # A directory path that is not this token's JSON.
+    f"{CID_V0}/43.json",
+    f"{CID_V0}/metadata/42.json",
+])
+def test_rejects_refs_that_do_not_fit(ref):
+    with pytest.raises(ValueError):
+        encode_ref(42, ref)
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        decode_ref(1, HELLO_DIGEST, 9)
+
+
+def test_encode_refs_packs_a_batch():
+    digests, formats = encode_refs([1, 2], [CID_V0, ZG_ROOT])
+    assert digests == [HELLO_DIGEST, HELLO_DIGEST]
+    assert formats == bytes([FORMAT_CID_V0, FORMAT_ZG_ROOT])
+
+
+def test_reconcile_matches_mixed_case_root_on_compact_contract(monkeypatch):
+    monkeypatch.setattr(reconcile, "_read_compact_refs", lambda w3, contract, token_ids: {1: ZG_ROOT, 2: None})
+    updates = [(1, "0xowner", {}, "0x" + HELLO_DIGEST.hex().upper()), (2, "0xowner", {}, ZG_ROOT)]
+    assert reconcile.unchanged_on_chain(None, None, updates, compact=True) == {1}
+
+
+def test_reconcile_matches_mixed_case_root_on_string_contract(monkeypatch):
+    monkeypatch.setattr(reconcile, "_read_token_uris", lambda w3, contract, token_ids: {
+        1: "https://indexer.example/file?root=" + ZG_ROOT,
+        2: "ipfs://" + CID_V0.lower(),
+    })
+    updates = [(1, "0xowner", {}, ZG_ROOT.upper().replace("0X", "0x")), (2, "0xowner", {}, CID_V0)]
+    # CIDs are case-sensitive, so only the root hash matches.
+    assert reconcile.unchanged_on_chain(None, None, updates) == {1}
@@ -0,0 +1,19 @@
+from nft_updater import event_indexer
+from nft_updater.event_indexer import start_block
+
+
+def test_start_block_prefers_the_chain_deploy_block(monkeypatch):
+    monkeypatch.setattr(event_indexer, "INDEXER_START_BLOCK", "50")
+    monkeypatch.setenv("MONAD_CONTRACT_START_BLOCK", "1200")
+    monkeypatch.delenv("ZG_CONTRACT_START_BLOCK", raising=False)
+
+    assert start_block("monad") == 1200
+    assert start_block("0g") == 50
+
+
+def test_start_block_warns_before_scanning_from_genesis(monkeypatch, capsys):
+    monkeypatch.setattr(event_indexer, "INDEXER_START_BLOCK", "")
+    monkeypatch.setenv("MONAD_CONTRACT_START_BLOCK", "")
+
+    assert start_block("monad") == 0
+    assert "MONAD_CONTRACT_START_BLOCK" in capsys.readouterr().out
@@ -0,0 +1,148 @@
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from nft_updater.journal import TX_DROPPED, TX_REVERTED, UploadJournal
+from nft_updater.pipeline import token_stages, update_tokens
+from nft_updater.state_store import StateStore
+from nft_updater.upload_cache import UploadCache
+
+SENDER = "0x" + "42" * 20
+OWNER = "0x0000000000000000000000000000000000001001"
+STATS = {"tx_count": 5}
+
+
+class StubEth:
+    """Receipt source for ``recover``: ``receipts`` maps a hash to its status, ``mined_nonce`` is the sender's nonce."""
+
+    def __init__(self, receipts, mined_nonce=0):
+        self.receipts = receipts
+        self.mined_nonce = mined_nonce
+
+    def get_transaction_count(self, address, block_identifier="latest"):
+        return self.mined_nonce
+
+    def get_transaction_receipt(self, tx_hash):
+        if tx_hash not in self.receipts:
+            raise LookupError(f"Transaction {tx_hash} not found")
+        return SimpleNamespace(status=self.receipts[tx_hash], blockNumber=77)
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    journal, store = UploadJournal(path), StateStore(path)
+    yield journal, store
+    journal.close()
+    store.close()
+
+
+def _journal_commit(journal, tx_hash, nonce, token_ids):
+    """Journals the uploads and the sent transaction of a commit that never saw its receipt."""
+    for token_id in token_ids:
+        journal.record_upload("monad", token_id, OWNER, STATS, "image", f"image-{token_id}")
+        journal.record_upload("monad", token_id, OWNER, STATS, "metadata", f"json-{token_id}")
+    journal.record_transaction("monad", tx_hash, nonce, token_ids, [f"json-{token_id}" for token_id in token_ids])
+
+
+def test_confirmed_but_unrecorded_transaction_is_recovered(db):
+    journal, store = db
+    _journal_commit(journal, "0xaa", 3, [1, 2])
+    w3 = SimpleNamespace(eth=StubEth({"0xaa": 1}, mined_nonce=4))
+
+    assert journal.recover(w3, "monad", store, SENDER) == 2
+
+    assert not store.needs_update("monad", 1, OWNER, STATS)
+    assert not store.needs_update("monad", 2, OWNER, STATS)
+    assert journal.unsettled_transactions("monad") == []
+    # Committed tokens have nothing left to resume.
+    assert journal.uploads("monad", 1, OWNER, STATS) == {}
+
+
+def test_reverted_transaction_keeps_its_uploads_for_the_next_commit(db):
+    journal, store = db
+    _journal_commit(journal, "0xbb", 3, [1])
+    w3 = SimpleNamespace(eth=StubEth({"0xbb": 0}, mined_nonce=4))
+
+    assert journal.recover(w3, "monad", store, SENDER) == 0
+
+    assert store.needs_update("monad", 1, OWNER, STATS)
+    assert journal.unsettled_transactions("monad") == []
+    events = journal.conn.execute("SELECT event FROM journal_transactions WHERE tx_hash = '0xbb'").fetchall()
+    assert (TX_REVERTED,) in events
+    assert journal.uploads("monad", 1, OWNER, STATS) == {"image": "image-1", "metadata": "json-1"}
+
+
+def test_pending_transaction_is_left_for_a_later_run(db):
+    journal, store = db
+    _journal_commit(journal, "0xcc", 3, [1])
+    # Nonce 3 is not mined yet, so the transaction may still be.
+    w3 = SimpleNamespace(eth=StubEth({}, mined_nonce=3))
+
+    assert journal.recover(w3, "monad", store, SENDER) == 0
+    assert [tx[0] for tx in journal.unsettled_transactions("monad")] == ["0xcc"]
+
+    # Once a later transaction used nonce 3, this one can never be mined.
+    w3.eth.mined_nonce = 4
+    assert journal.recover(w3, "monad", store, SENDER) == 0
+    assert journal.unsettled_transactions("monad") == []
+    events = journal.conn.execute("SELECT event FROM journal_transactions WHERE tx_hash = '0xcc'").fetchall()
+    assert (TX_DROPPED,) in events
+    assert store.needs_update("monad", 1, OWNER, STATS)
+
+
+def test_prune_drops_committed_uploads_and_settled_transactions(db):
+    journal, store = db
+    _journal_commit(journal, "0xdd", 1, [1, 2])
+    journal.record_outcome("monad", "0xdd", TX_REVERTED, 9)
+
+    journal.prune("monad", [1])
+
+    assert journal.uploads("monad", 1, OWNER, STATS) == {}
+    assert journal.uploads("monad", 2, OWNER, STATS) == {"image": "image-2", "metadata": "json-2"}
+    assert journal.conn.execute("SELECT COUNT(*) FROM journal_transactions").fetchone() == (0,)
+
+
+def test_resume_skips_uploads_the_journal_already_has(db, tmp_path):
+    journal, _ = db
+    # Token 1 died after its image upload, token 2 after its metadata upload; token 3 is new.
+    journal.record_upload("monad", 1, OWNER, STATS, "image", "image-1")
+    journal.record_upload("monad", 2, OWNER, STATS, "image", "image-2")
+    journal.record_upload("monad", 2, OWNER, STATS, "metadata", "json-2")
+    # An upload made for other stats is not reused.
+    journal.record_upload("monad", 3, OWNER, {"tx_count": 4}, "image", "stale-image-3")
+    rendered, uploaded = [], []
+
+    def generate_image(token_id, stats, owner):
+        rendered.append(token_id)
+        return f"image bytes {token_id}".encode()
+
+    def upload(name, data):
+        uploaded.append(name)
+        return f"new-{name}"
+
+    async def source():
+        for token_id in (1, 2, 3):
+            yield {"token_id": token_id, "owner": OWNER, "stats": dict(STATS)}
+
+    cache = UploadCache(backend="test", path=str(tmp_path / "state.sqlite3"))
+    executor = ThreadPoolExecutor(max_workers=2)
+    stages = token_stages(
+        generate_image, lambda token_id, image_ref, stats, owner: f"{token_id} {image_ref}".encode(), upload, cache,
+        executor, 2,
+        resume=lambda job: journal.uploads("monad", job["token_id"], job["owner"], job["stats"]),
+        on_uploaded=lambda job, kind, ref: journal.record_upload("monad", job["token_id"], job["owner"], job["stats"], kind, ref),
+    )
+    results = update_tokens(source(), stages)
+    executor.shutdown()
+    cache.close()
+
+    assert results == [
+        (1, OWNER, STATS, "new-1.json"),
+        (2, OWNER, STATS, "json-2"),
+        (3, OWNER, STATS, "new-3.json"),
+    ]
+    assert rendered == [3]
+    assert sorted(uploaded) == ["1.json", "3.json", "3.png"]
+    assert journal.uploads("monad", 3, OWNER, STATS) == {"image": "new-3.png", "metadata": "new-3.json"}
@@ -0,0 +1,131 @@
+import pytest
+from urllib3 import encode_multipart_formdata
+
+import stub_pinata
+from nft_updater import pinata_uploader
+from nft_updater.pinata_uploader import MultipartFileStream, PinataUploader
+from nft_updater.publishing import DirectoryBundle
+from nft_updater.upload_cache import UploadCache
+
+OWNER = "0x0000000000000000000000000000000000001001"
+
+
+@pytest.fixture
+def pinata():
+    server, stats = stub_pinata.serve(fail_every=2)
+    uploader = PinataUploader("key", "secret", f"http://127.0.0.1:{server.server_port}/", max_retries=2)
+    yield uploader, stats
+    uploader.close()
+    server.shutdown()
+
+
+def _write_files(directory, sizes):
+    files = []
+    for number, size in enumerate(sizes, 1):
+        path = directory / f"{number}.png"
+        path.write_bytes(bytes([number]) * size)
+        files.append((f"{number}.png", str(path)))
+    return files
+
+
+# --- Streamed multipart body ---
+
+def test_stream_matches_an_in_memory_multipart_body(tmp_path, monkeypatch):
+    monkeypatch.setattr(pinata_uploader, "STREAM_BLOCK_SIZE", 7)
+    files = _write_files(tmp_path, [30, 0, 5])
+    body = MultipartFileStream([(f"bundle/{filename}", path, "image/png") for filename, path in files])
+
+    streamed = b"".join(body)
+
+    fields = []
+    for filename, path in files:
+        with open(path, "rb") as f:
+            fields.append(("file", (f"bundle/{filename}", f.read(), "image/png")))
+    expected, content_type = encode_multipart_formdata(fields, boundary=body.boundary)
+    assert streamed == expected
+    assert len(body) == len(expected)
+    assert body.content_type == content_type
+
+
+def test_stream_reads_whole_and_partial_blocks(tmp_path):
+    files = _write_files(tmp_path, [10])
+    whole = MultipartFileStream([("a/1.png", files[0][1], "image/png")])
+    pieces = MultipartFileStream([("a/1.png", files[0][1], "image/png")])
+
+    assert len(whole.read()) == len(whole)
+    assert whole.read() == b""
+    read = []
+    while piece := pieces.read(3):
+        assert len(piece) <= 3
+        read.append(piece)
+    assert len(b"".join(read)) == len(pieces)
+
+
+def test_directory_upload_is_streamed_again_on_a_retry(tmp_path, pinata):
+    uploader, stats = pinata
+    files = _write_files(tmp_path, [2000, 3000])
+
+    # The stub rejects every second request, so the second upload needs a retry.
+    assert uploader.upload_directory("first", files)
+    assert uploader.upload_directory("second", files)
+
+    assert stats["rejected"] == 1
+    assert stats["uploads"] == 2
+
+
+# --- Directory bundles ---
+
+class RecordingBackend:
+    """A directory backend that records each upload's files and fails the directories named in ``failing``."""
+
+    name = "test"
+
+    def __init__(self, failing=()):
+        self.directories = []
+        self.failing = set(failing)
+
+    def upload_directory(self, name, files):
+        self.directories.append((name, [filename for filename, _ in files]))
+        if name in self.failing:
+            return None
+        return f"dir-{name}"
+
+    def file_ref(self, directory_ref, filename):
+        return f"{directory_ref}/{filename}"
+
+
+def _publish(tmp_path, backend, max_bytes, image_sizes):
+    cache = UploadCache("test", str(tmp_path / "state.sqlite3"))
+    bundle = DirectoryBundle("monad", backend, cache, images=True, min_tokens=0, max_bytes=max_bytes)
+    for token_id, size in enumerate(image_sizes, 1):
+        job = {"token_id": token_id, "owner": OWNER, "stats": {"tx_count": token_id}}
+        bundle.add_image(job, f"{token_id}.png", bytes([token_id]) * size)
+        bundle.add(job)
+    results = bundle.publish(lambda token_id, image_ref, stats, owner: f'{{"image": "{image_ref}"}}'.encode())
+    bundle.close()
+    cache.close()
+    return results
+
+
+def test_bundle_above_the_byte_cap_is_split_into_directories(tmp_path):
+    backend = RecordingBackend()
+
+    results = _publish(tmp_path, backend, 250, [100, 100, 100, 400, 50])
+
+    # A file larger than the cap still gets a directory of its own.
+    assert backend.directories[:4] == [
+        ("monad-images-1", ["1.png", "2.png"]),
+        ("monad-images-2", ["3.png"]),
+        ("monad-images-3", ["4.png"]),
+        ("monad-images-4", ["5.png"]),
+    ]
+    assert [ref for _, _, _, ref in results] == [f"dir-monad-metadata/{token_id}.json" for token_id in range(1, 6)]
+
+
+def test_failed_directory_skips_only_its_own_tokens(tmp_path):
+    backend = RecordingBackend(failing={"monad-images-2"})
+
+    results = _publish(tmp_path, backend, 250, [100, 100, 200, 100])
+
+    assert [token_id for token_id, _, _, _ in results] == [1, 2, 4]
+    assert backend.directories[-1] == ("monad-metadata", ["1.json", "2.json", "4.json"])
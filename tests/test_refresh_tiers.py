@@ -0,0 +1,208 @@
+import pytest
+from web3 import Web3
+
+import stub_node
+from nft_updater import refresh_tiers, tx_scheduler
+from nft_updater.abi import CONTRACT_ABI
+from nft_updater.pooled_provider import PooledProvider
+from nft_updater.refresh_tiers import RefreshScheduler, decayed, parse_tiers
+from nft_updater.rpc_pool import RpcPool
+from nft_updater.state_store import StateStore
+from nft_updater.tx_scheduler import TxScheduler
+
+PRIVATE_KEY = "0x" + "42" * 32
+CONTRACT = "0x" + "11" * 20
+OWNER = "0x0000000000000000000000000000000000001001"
+OTHER_OWNER = "0x0000000000000000000000000000000000002000"
+HOUR, DAY = 3600, 86400
+NOW = 1_700_000_000
+TIERS = [("hot", 2.0, 0), ("warm", 0.5, 6 * HOUR), ("dormant", 0.0, 168 * HOUR)]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Pins the wall clock used for scoring and for the state store's commit times."""
+    monkeypatch.setattr(refresh_tiers.time, "time", lambda: NOW)
+    monkeypatch.setattr(refresh_tiers, "REFRESH_HALF_LIFE_DAYS", 7.0)
+    return NOW
+
+
+@pytest.fixture
+def db(tmp_path, clock):
+    path = str(tmp_path / "state.sqlite3")
+    store = StateStore(path)
+    yield path, store
+    store.close()
+
+
+def _scheduler(db, **kwargs):
+    path, store = db
+    return RefreshScheduler("monad", store, tiers=TIERS, path=path, **kwargs)
+
+
+def _set_activity(scheduler, rows):
+    """Stores ``{token_id: (score, scored_at, checked_at)}`` as an earlier run would have."""
+    with scheduler.conn:
+        scheduler.conn.executemany(
+            "INSERT INTO token_activity VALUES ('monad', ?, ?, ?, ?)",
+            [(token_id, *row) for token_id, row in rows.items()],
+        )
+
+
+# --- Scores and tiers ---
+
+def test_score_halves_every_half_life(clock):
+    assert decayed(4.0, NOW, NOW) == 4.0
+    assert decayed(4.0, NOW - 7 * DAY, NOW) == pytest.approx(2.0)
+    assert decayed(4.0, NOW - 14 * DAY, NOW) == pytest.approx(1.0)
+    # A score stamped in the future (clock skew) is not inflated.
+    assert decayed(4.0, NOW + DAY, NOW) == 4.0
+
+
+def test_tiers_are_parsed_hottest_first():
+    assert parse_tiers("dormant:0:168, hot:2:0,warm:0.5:6") == [
+        ("hot", 2.0, 0.0), ("warm", 0.5, 6.0 * HOUR), ("dormant", 0.0, 168.0 * HOUR)
+    ]
+    assert parse_tiers("") == parse_tiers("off") == []
+    with pytest.raises(ValueError, match="name:min_score:hours"):
+        parse_tiers("hot:2")
+    with pytest.raises(ValueError, match="minimum score of 0"):
+        parse_tiers("hot:2:0,warm:0.5:6")
+
+
+def test_score_places_a_token_in_the_first_tier_it_reaches(db):
+    scheduler = _scheduler(db)
+
+    assert [scheduler.tier(score) for score in (5.0, 2.0, 1.9, 0.5, 0.49, 0.0)] == [0, 0, 1, 1, 2, 2]
+    scheduler.close()
+
+
+# --- Selection ---
+
+def test_only_due_tokens_are_selected_hottest_and_stalest_first(db):
+    scheduler = _scheduler(db)
+    _set_activity(scheduler, {
+        1: (4.0, NOW - HOUR, NOW - HOUR),           # hot: due every run
+        2: (1.0, NOW - 2 * HOUR, NOW - 2 * HOUR),   # warm, checked 2h ago: not due
+        3: (1.0, NOW - 7 * HOUR, NOW - 7 * HOUR),   # warm, checked 7h ago: due
+        4: (1.0, NOW - 9 * HOUR, NOW - 9 * HOUR),   # warm and checked longer ago than 3
+        5: (0.1, NOW - 8 * DAY, NOW - 8 * DAY),     # dormant, past its week
+        6: (0.0, NOW - DAY, NOW - DAY),             # dormant, checked yesterday: not due
+        # Hot a month ago, decayed to dormant since, and checked yesterday: not due.
+        7: (4.0, NOW - 30 * DAY, NOW - DAY),
+    })
+
+    # Token 8 was never committed, so it is rendered first.
+    assert scheduler.select(range(1, 9)) == [8, 1, 4, 3, 5]
+    assert scheduler.tier_of[7] == 2
+    assert scheduler.due == {0: 2, 1: 2, 2: 1}
+    scheduler.close()
+
+
+def test_token_committed_before_tiers_counts_its_last_commit_as_one_change(db):
+    _, store = db
+    store.record_many("monad", [(1, OWNER, {"tx_count": 1}, "bafyref")])
+    scheduler = _scheduler(db)
+
+    assert scheduler.select([1]) == []
+    assert scheduler.tier_of[1] == 1
+
+    scheduler.now = NOW + 6 * HOUR
+    assert scheduler.select([1]) == [1]
+    scheduler.close()
+
+
+def test_new_owner_makes_a_token_due_before_every_tier(db):
+    _, store = db
+    store.record_many("monad", [(1, OWNER, {"tx_count": 1}, "bafyref"), (2, OWNER, {"tx_count": 1}, "bafyref")])
+    scheduler = _scheduler(db)
+    _set_activity(scheduler, {1: (4.0, NOW, NOW - HOUR), 2: (0.0, NOW, NOW)})
+
+    # Owner addresses compare case-insensitively.
+    assert scheduler.select([1, 2], owners={1: OWNER.upper(), 2: OTHER_OWNER}) == [2, 1]
+    scheduler.close()
+
+
+def test_force_refresh_selects_every_token(db, monkeypatch):
+    scheduler = _scheduler(db)
+    _set_activity(scheduler, {1: (0.0, NOW, NOW), 2: (1.0, NOW, NOW)})
+    monkeypatch.setattr(refresh_tiers, "FORCE_REFRESH", True)
+
+    assert scheduler.select([1, 2]) == [2, 1]
+    scheduler.close()
+
+
+def test_admit_stops_at_the_render_budget(db):
+    scheduler = _scheduler(db, max_tokens=2)
+    unlimited = _scheduler(db, max_tokens=0)
+
+    assert [scheduler.admit(token_id) for token_id in (1, 2, 3)] == [True, True, False]
+    assert all(unlimited.admit(token_id) for token_id in range(100))
+    scheduler.close()
+    unlimited.close()
+
+
+# --- Saving a run ---
+
+def test_save_scores_commits_and_keeps_failed_changes_due(db):
+    scheduler = _scheduler(db)
+    _set_activity(scheduler, {
+        1: (1.0, NOW - 7 * DAY, NOW - DAY),
+        2: (1.0, NOW - 7 * DAY, NOW - DAY),
+        3: (1.0, NOW - 7 * DAY, NOW - DAY),
+    })
+    assert scheduler.select([1, 2, 3]) == [1, 2, 3]
+    # Token 1 changed and was committed, 2 was unchanged, 3 changed but its commit failed.
+    scheduler.checked(1, changed=True)
+    scheduler.checked(2, changed=False)
+    scheduler.checked(3, changed=True)
+    scheduler.save(committed=[1])
+    scheduler.close()
+
+    scheduler = _scheduler(db)
+    scheduler._load()
+    assert scheduler.activity[1] == (pytest.approx(1.5), NOW, NOW)
+    assert scheduler.activity[2] == (1.0, NOW - 7 * DAY, NOW)
+    assert scheduler.activity[3] == (1.0, NOW - 7 * DAY, NOW - DAY)
+    assert scheduler.select([1, 2, 3]) == [3]
+    scheduler.close()
+
+
+# --- Gas budget ---
+
+@pytest.fixture
+def node():
+    server, chain = stub_node.serve(12)
+    yield server, chain
+    server.shutdown()
+
+
+def test_gas_budget_commits_the_hottest_updates_and_defers_the_rest(db, node, monkeypatch):
+    server, chain = node
+    # Four string-contract updates fit in one chunk.
+    monkeypatch.setattr(tx_scheduler, "TX_MAX_GAS", 300_000)
+    w3 = Web3(PooledProvider(RpcPool([(f"http://127.0.0.1:{server.server_port}", None)])))
+    contract = w3.eth.contract(address=Web3.to_checksum_address(CONTRACT), abi=CONTRACT_ABI)
+    transactions = TxScheduler(w3, contract, w3.eth.account.from_key(PRIVATE_KEY), PRIVATE_KEY)
+    token_ids = list(range(1, 13))
+    scheduler = _scheduler(db)
+    # All warm and due, and still warm once committed; the higher the token ID, the longer since its last check.
+    _set_activity(scheduler, {token_id: (0.6, NOW, NOW - 6 * HOUR - token_id * HOUR) for token_id in token_ids})
+    assert scheduler.select(token_ids) == token_ids[::-1]
+
+    updates = scheduler.order([(token_id, "0x" + format(token_id, "064x")) for token_id in token_ids])
+    first_chunk_gas = transactions._plan_chunks(updates, 300_000)[0][1]
+    committed = transactions.commit(
+        [token_id for token_id, _ in updates], [ref for _, ref in updates], max_total_gas=first_chunk_gas + 1
+    )
+
+    assert len(chain.sent) == 1
+    assert committed == set(token_ids[::-1][:len(committed)])
+    assert 0 < len(committed) < len(token_ids)
+    scheduler.save(committed)
+    scheduler.close()
+
+    # The deferred tokens stay due and lead the next run.
+    scheduler = _scheduler(db)
+    assert scheduler.select(token_ids) == [token_id for token_id in token_ids[::-1] if token_id not in committed]
+    scheduler.close()
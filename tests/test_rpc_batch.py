@@ -0,0 +1,89 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import stub_node
+from nft_updater.rpc_batch import BatchRejected, _post_batch, rpc_calls
+
+BLOCK_NUMBER = ("eth_blockNumber", [])
+
+
+class _NoBatchHandler(BaseHTTPRequestHandler):
+    """Answers single calls and refuses batches with HTTP 400, like endpoints without batch support."""
+
+    protocol_version = "HTTP/1.1"
+    requests = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).requests += 1
+        if isinstance(body, list):
+            status, data = 400, b'{"error": "batch requests are not supported"}'
+        else:
+            status, data = 200, json.dumps({"jsonrpc": "2.0", "id": body["id"], "result": "0x10"}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class _Provider:
+    """A minimal plain-URL provider, as rpc_calls sees a non-pooled web3."""
+
+    def __init__(self, url):
+        self.endpoint_uri = url
+
+    def make_request(self, method, params):
+        response = requests.post(self.endpoint_uri, json={"jsonrpc": "2.0", "id": 1, "method": method, "params": params})
+        return response.json()
+
+
+@pytest.fixture
+def no_batch_url():
+    handler = type("NoBatchHandler", (_NoBatchHandler,), {"requests": 0})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", handler
+    server.shutdown()
+
+
+def test_batch_refused_with_a_client_error_falls_back_to_single_calls(no_batch_url):
+    url, handler = no_batch_url
+    w3 = SimpleNamespace(provider=_Provider(url))
+
+    with pytest.raises(BatchRejected):
+        _post_batch(url, [BLOCK_NUMBER] * 3)
+    assert rpc_calls(w3, [BLOCK_NUMBER] * 3) == ["0x10"] * 3
+    # The rejected batch plus one request per call.
+    assert handler.requests == 2 + 3
+
+
+def test_server_error_is_raised_instead_of_retried_one_call_at_a_time():
+    server, _ = stub_node.serve(10, fail_every=1)
+    url = f"http://127.0.0.1:{server.server_port}"
+    w3 = SimpleNamespace(provider=_Provider(url))
+    try:
+        with pytest.raises(requests.exceptions.HTTPError):
+            rpc_calls(w3, [BLOCK_NUMBER] * 5)
+        assert server.stats["requests"] == 1
+    finally:
+        server.shutdown()
+
+
+def test_unreachable_endpoint_is_not_treated_as_a_batch_rejection():
+    server, _ = stub_node.serve(10)
+    url = f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        _post_batch(url, [BLOCK_NUMBER])
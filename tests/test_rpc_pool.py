@@ -0,0 +1,148 @@
+import socket
+import time
+
+import pytest
+import requests
+
+import stub_node
+from nft_updater import rpc_pool
+from nft_updater.rpc_pool import RpcPool
+
+BLOCK_NUMBER = {"jsonrpc": "2.0", "id": 1, "method": "eth_blockNumber", "params": []}
+
+
+@pytest.fixture
+def nodes():
+    """Starts stub nodes on demand; ``nodes(**kwargs)`` returns ``(server, url)``."""
+    servers = []
+    chain = stub_node.StubChain(10)
+
+    def start(**kwargs):
+        server, _ = stub_node.serve(10, chain=chain, **kwargs)
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_port}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+@pytest.fixture
+def dead_url():
+    """A local URL nothing listens on, so connections are refused."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+def quiet_pool(urls, timeout=5):
+    """A pool over ``urls`` that starts no background health checks during the test."""
+    pool = RpcPool([(url, None) for url in urls], timeout=timeout)
+    pool._last_check = time.monotonic()
+    return pool
+
+
+def test_fails_over_to_the_next_endpoint(nodes, dead_url):
+    server, url = nodes()
+    pool = quiet_pool([dead_url, url])
+
+    reply = pool.post(BLOCK_NUMBER)
+
+    assert int(reply["result"], 16) == server.RequestHandlerClass.chain.head_block
+    dead, live = pool.endpoints
+    assert dead.cooldown_until > time.monotonic()
+    assert dead.error_rate > 0
+    assert server.stats["requests"] == 1
+    # While cooled down, the failed endpoint ranks last and is not tried first.
+    pool.post(BLOCK_NUMBER)
+    assert server.stats["requests"] == 2
+    assert pool._ranked()[0] is live
+
+
+def test_endpoint_returns_after_its_cooldown(nodes, monkeypatch):
+    monkeypatch.setattr(rpc_pool, "RPC_COOLDOWN_BASE", 0.2)
+    flaky, flaky_url = nodes(fail_every=1)
+    steady, steady_url = nodes(latency=0.05)
+    pool = quiet_pool([flaky_url, steady_url])
+
+    pool.post(BLOCK_NUMBER)
+    assert flaky.stats["failed"] == 1
+    assert steady.stats["requests"] == 1
+
+    # Still cooling down: the request skips the flaky endpoint.
+    flaky.RequestHandlerClass.fail_every = 0
+    pool.post(BLOCK_NUMBER)
+    assert flaky.stats["requests"] == 1
+
+    time.sleep(0.25)
+    pool.post(BLOCK_NUMBER)
+    assert flaky.stats["requests"] == 2
+    assert pool.endpoints[0].cooldown_until == 0.0
+
+
+def test_per_endpoint_budget_spaces_requests(nodes):
+    _, url = nodes()
+    pool = RpcPool([(url, 50.0)])
+
+    started = time.monotonic()
+    for _ in range(10):
+        pool.post(BLOCK_NUMBER)
+    # A batch spends one unit per call in it.
+    pool.post([BLOCK_NUMBER] * 10, cost=10)
+    elapsed = time.monotonic() - started
+
+    # 20 calls at 50 per second: the last one may start 0.38s after the first.
+    assert elapsed >= 0.36
+
+
+def test_budget_of_one_endpoint_does_not_slow_another(nodes):
+    _, limited_url = nodes()
+    _, free_url = nodes()
+    pool = RpcPool([(limited_url, 2.0), (free_url, None)])
+    limited, free = pool.endpoints
+
+    limited.acquire()
+    # The limited endpoint's next slot is half a second away, so the free one ranks first.
+    assert pool._ranked()[0] is free
+    assert free.wait_time() == 0.0
+    assert limited.wait_time() > 0.4
+
+
+def test_raises_when_every_endpoint_fails(nodes, dead_url):
+    _, failing_url = nodes(fail_every=1)
+    pool = quiet_pool([dead_url, failing_url])
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        pool.post(BLOCK_NUMBER)
+    assert all(endpoint.cooldown_until > time.monotonic() for endpoint in pool.endpoints)
+
+
+def test_raises_when_no_endpoint_is_reachable(dead_url):
+    pool = quiet_pool([dead_url])
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        pool.post(BLOCK_NUMBER)
+
+
+def test_transaction_broadcast_is_not_failed_over(nodes):
+    failing, failing_url = nodes(fail_every=1)
+    other, other_url = nodes()
+    pool = quiet_pool([failing_url, other_url])
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        pool.request("eth_sendRawTransaction", ["0x00"])
+    assert failing.stats["requests"] == 1
+    assert other.stats["requests"] == 0
+
+
+def test_health_check_marks_lagging_endpoint(nodes, monkeypatch):
+    monkeypatch.setattr(rpc_pool, "RPC_MAX_LAG_BLOCKS", 5)
+    _, synced_url = nodes()
+    _, lagging_url = nodes(lag=100)
+    pool = RpcPool([(lagging_url, None), (synced_url, None)])
+
+    assert pool.check()
+    lagging, synced = pool.endpoints
+    assert lagging.lagging and not synced.lagging
+    assert pool._ranked()[0] is synced
@@ -0,0 +1,243 @@
+import json
+import os
+import shutil
+
+import pytest
+import web3.eth
+
+import stub_node
+from nft_updater import engine, journal, reconcile, state_store
+from nft_updater.chains import ChainConfig
+from nft_updater.event_indexer import OwnerIndex
+from nft_updater.render_settings import STYLE_GRADIENT
+from nft_updater.shards import (
+    ManifestError, load_manifests, merge_state_snapshots, parse_shard, shard_token_ids, write_manifest,
+    write_state_snapshot,
+)
+from nft_updater.state_store import StateStore
+from nft_updater.upload_cache import UploadCache
+
+PRIVATE_KEY = "0x" + "42" * 32
+CONTRACT = "0x" + "11" * 20
+OWNER = "0x0000000000000000000000000000000000001001"
+
+
+def _cid(token_id):
+    return "Qm" + "1" * 43 + "23456789ABCD"[token_id]
+
+
+def _updates(token_ids):
+    return [(token_id, OWNER, {"tx_count": token_id}, _cid(token_id)) for token_id in token_ids]
+
+
+@pytest.fixture
+def state_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "state.sqlite3")
+    monkeypatch.setattr(state_store, "STATE_DB_PATH", path)
+    monkeypatch.setattr(journal, "STATE_DB_PATH", path)
+    return path
+
+
+@pytest.fixture
+def node():
+    server, chain = stub_node.serve(10)
+    yield server, chain
+    server.shutdown()
+
+
+def _chain(url, name="monad"):
+    return ChainConfig(
+        name=name, label="Monad", rpc_url=url, contract_env="MONAD_CONTRACT_ADDRESS", backend="pinata",
+        style=STYLE_GRADIENT, title="MONAD STATUS", nft_name="Monad Wallet Status NFT", description="Test collection.",
+    )
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    monkeypatch.setenv("MONAD_CONTRACT_ADDRESS", CONTRACT)
+    return _chain("http://127.0.0.1:1")
+
+
+def _write_shards(manifest_dir, chain, count, total_supply=10, block_numbers=None):
+    paths = []
+    for index in range(1, count + 1):
+        token_ids = shard_token_ids(total_supply, (index, count))
+        block_number = block_numbers[index - 1] if block_numbers else 100
+        paths.append(write_manifest(manifest_dir, chain, (index, count), block_number, total_supply, _updates(token_ids)))
+    return paths
+
+
+def _edit(path, **fields):
+    with open(path) as f:
+        manifest = json.load(f)
+    manifest.update(fields)
+    with open(path, "w") as f:
+        json.dump(manifest, f)
+
+
+# --- Shard assignment ---
+
+def test_parse_shard():
+    assert parse_shard("2/4") == (2, 4)
+    assert parse_shard(" 1 / 1 ") == (1, 1)
+    for value in ("0/4", "5/4", "2", "a/b", "1/0", ""):
+        with pytest.raises(ValueError):
+            parse_shard(value)
+
+
+def test_tokens_are_dealt_round_robin():
+    shards = [list(shard_token_ids(10, (index, 3))) for index in (1, 2, 3)]
+
+    assert shards == [[1, 4, 7, 10], [2, 5, 8], [3, 6, 9]]
+    assert list(shard_token_ids(10)) == list(range(1, 11))
+
+
+# --- Manifests ---
+
+def test_manifests_round_trip_with_each_shard_block(tmp_path, chain):
+    _write_shards(str(tmp_path), chain, 3, block_numbers=[100, 104, 102])
+
+    shards = load_manifests(str(tmp_path), chain)
+
+    assert [block_number for block_number, _ in shards] == [100, 104, 102]
+    assert [update[0] for update in shards[1][1]] == [2, 5, 8]
+    assert shards[0][1][0] == (1, OWNER, {"tx_count": 1}, _cid(1))
+
+
+def test_missing_shard_is_rejected(tmp_path, chain):
+    paths = _write_shards(str(tmp_path), chain, 3)
+    os.remove(paths[1])
+
+    with pytest.raises(ManifestError, match="Missing manifests .* 2/3"):
+        load_manifests(str(tmp_path), chain)
+
+
+def test_no_manifests_at_all_is_rejected(tmp_path, chain):
+    with pytest.raises(ManifestError, match="No shard manifests"):
+        load_manifests(str(tmp_path), chain)
+
+
+def test_duplicate_shard_is_rejected(tmp_path, chain):
+    paths = _write_shards(str(tmp_path), chain, 2)
+    # The same shard downloaded twice, e.g. from a re-run job.
+    os.makedirs(tmp_path / "rerun")
+    shutil.copy(paths[0], tmp_path / "rerun")
+
+    with pytest.raises(ManifestError, match="more than once"):
+        load_manifests(str(tmp_path), chain)
+
+
+def test_shard_count_mismatch_is_rejected(tmp_path, chain):
+    _write_shards(str(tmp_path), chain, 2)
+    write_manifest(str(tmp_path), chain, (3, 3), 100, 10, _updates([3, 6, 9]))
+
+    with pytest.raises(ManifestError, match="disagree on the shard count"):
+        load_manifests(str(tmp_path), chain)
+
+
+def test_manifest_for_another_chain_or_contract_is_rejected(tmp_path, chain):
+    paths = _write_shards(str(tmp_path), chain, 2)
+
+    _edit(paths[0], chain="0g")
+    with pytest.raises(ManifestError, match="not a version"):
+        load_manifests(str(tmp_path), chain)
+
+    _edit(paths[0], chain="monad", contract="0x" + "22" * 20)
+    with pytest.raises(ManifestError, match="built for contract"):
+        load_manifests(str(tmp_path), chain)
+
+
+@pytest.mark.parametrize("block_number", [None, -1, "100", 1.5])
+def test_invalid_block_number_is_rejected(tmp_path, chain, block_number):
+    paths = _write_shards(str(tmp_path), chain, 2)
+    _edit(paths[1], block_number=block_number)
+
+    with pytest.raises(ManifestError, match="invalid block number"):
+        load_manifests(str(tmp_path), chain)
+
+
+def test_invalid_shard_field_is_rejected(tmp_path, chain):
+    paths = _write_shards(str(tmp_path), chain, 2)
+    _edit(paths[1], shard=[3, 2])
+
+    with pytest.raises(ManifestError, match="invalid shard"):
+        load_manifests(str(tmp_path), chain)
+
+
+def test_token_in_the_wrong_shard_is_rejected(tmp_path, chain):
+    write_manifest(str(tmp_path), chain, (1, 2), 100, 10, _updates([1, 2]))
+    write_manifest(str(tmp_path), chain, (2, 2), 100, 10, _updates([4]))
+
+    with pytest.raises(ManifestError, match="does not belong to shard 1/2"):
+        load_manifests(str(tmp_path), chain)
+
+
+def test_malformed_reference_is_rejected(tmp_path, chain):
+    write_manifest(str(tmp_path), chain, (1, 1), 100, 10, [(1, OWNER, {"tx_count": 1}, "0x" + "ab" * 32)])
+
+    with pytest.raises(ManifestError, match="malformed reference"):
+        load_manifests(str(tmp_path), chain)
+
+
+# --- Shard state ---
+
+def test_merge_keeps_what_each_shard_built(tmp_path):
+    merged = str(tmp_path / "merge.sqlite3")
+    manifest_dir = str(tmp_path / "manifests")
+    StateStore(merged).close()
+    for index, last_block in ((1, 500), (2, 700)):
+        path = str(tmp_path / f"shard{index}.sqlite3")
+        index_db = OwnerIndex(path)
+        with index_db.conn:
+            index_db.conn.execute("INSERT INTO index_checkpoints VALUES ('monad', ?, ?)", (CONTRACT, last_block))
+            index_db.conn.execute(
+                "INSERT INTO token_owners VALUES ('monad', ?, 1, ?, ?)", (CONTRACT, f"owner-at-{last_block}", last_block)
+            )
+        index_db.close()
+        cache = UploadCache("pinata", path)
+        cache.store(f"hash{index}", _cid(index))
+        cache.close()
+        write_state_snapshot(os.path.join(manifest_dir, f"art{index}"), (index, 2), path)
+
+    assert merge_state_snapshots(manifest_dir, merged) == 2
+
+    index_db = OwnerIndex(merged)
+    assert index_db.checkpoint("monad", CONTRACT) == 700
+    assert index_db.owners("monad", CONTRACT) == {1: "owner-at-700"}
+    assert index_db.conn.execute("SELECT content_hash FROM upload_cache ORDER BY content_hash").fetchall() == [
+        ("hash1",), ("hash2",)
+    ]
+    index_db.close()
+
+
+class Crash(BaseException):
+    """Stands in for the process dying: not caught by the engine's ``except Exception``."""
+
+
+def test_merge_that_dies_after_broadcasting_is_recovered_without_a_second_commit(
+        tmp_path, state_db, node, monkeypatch):
+    server, stub = node
+    monkeypatch.setenv("MONAD_CONTRACT_ADDRESS", CONTRACT)
+    # Without the journal, only reconciling against the contract would catch the duplicate.
+    monkeypatch.setattr(reconcile, "RECONCILE_ONCHAIN", False)
+    chain = _chain(f"http://127.0.0.1:{server.server_port}")
+    manifest_dir = str(tmp_path / "manifests")
+    write_manifest(manifest_dir, chain, (1, 2), 100, 10, _updates([1, 3, 5]))
+    write_manifest(manifest_dir, chain, (2, 2), 101, 10, _updates([2, 4]))
+    resources = engine.SharedResources(PRIVATE_KEY)
+
+    def die(*args, **kwargs):
+        raise Crash()
+
+    with monkeypatch.context() as patch:
+        patch.setattr(web3.eth.Eth, "wait_for_transaction_receipt", die)
+        with pytest.raises(Crash):
+            engine.merge_chain(chain, resources, manifest_dir)
+    assert len(stub.sent) == 1
+
+    assert engine.merge_chain(chain, resources, manifest_dir) == 0
+    assert len(stub.sent) == 1
+    store = StateStore()
+    assert set(store.last_updates("monad")) == {1, 2, 3, 4, 5}
+    assert not store.needs_update("monad", 3, OWNER, {"tx_count": 3})
+    store.close()
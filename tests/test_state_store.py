@@ -0,0 +1,104 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from nft_updater import state_store
+from nft_updater.state_store import StateStore, connect_state_db
+
+OWNER = "0x00000000000000000000000000000000000010aB"
+OTHER_OWNER = "0x0000000000000000000000000000000000002000"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = StateStore(str(tmp_path / "state.sqlite3"))
+    yield store
+    store.close()
+
+
+def test_unknown_token_needs_an_update(store):
+    assert store.needs_update("monad", 1, OWNER, {"tx_count": 3})
+
+
+def test_recorded_token_is_skipped_until_its_owner_or_stats_change(store):
+    store.record_many("monad", [(1, OWNER, {"tx_count": 3, "first_active_at": 100}, "bafyref")], block_number=7)
+
+    # Owners compare case-insensitively and stats regardless of key order.
+    assert not store.needs_update("monad", 1, OWNER.lower(), {"first_active_at": 100, "tx_count": 3})
+    assert store.needs_update("monad", 1, OTHER_OWNER, {"tx_count": 3, "first_active_at": 100})
+    assert store.needs_update("monad", 1, OWNER, {"tx_count": 4, "first_active_at": 100})
+    # Rows are kept per chain.
+    assert store.needs_update("0g", 1, OWNER, {"tx_count": 3, "first_active_at": 100})
+
+
+def test_record_many_replaces_the_previous_row(store):
+    store.record_many("monad", [(1, OWNER, {"tx_count": 3}, "bafyold")], block_number=7)
+    store.record_many("monad", [(1, OTHER_OWNER, {"tx_count": 5}, "bafynew")], block_number=9)
+
+    rows = store.conn.execute("SELECT owner, root_hash, block_number FROM tokens WHERE chain = 'monad'").fetchall()
+    assert rows == [(OTHER_OWNER, "bafynew", 9)]
+    assert not store.needs_update("monad", 1, OTHER_OWNER, {"tx_count": 5})
+    assert list(store.last_updates("monad")) == [1]
+
+
+def test_force_refresh_updates_unchanged_tokens(store, monkeypatch):
+    store.record_many("monad", [(1, OWNER, {"tx_count": 3}, "bafyref")])
+    monkeypatch.setattr(state_store, "FORCE_REFRESH", True)
+
+    assert store.needs_update("monad", 1, OWNER, {"tx_count": 3})
+
+
+def test_connections_use_wal_and_the_busy_timeout(tmp_path, monkeypatch):
+    monkeypatch.setattr(state_store, "STATE_DB_BUSY_TIMEOUT", 12.5)
+    conn = connect_state_db(str(tmp_path / "nested" / "state.sqlite3"))
+
+    assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    assert conn.execute("PRAGMA busy_timeout").fetchone() == (12500,)
+    conn.close()
+
+
+def _hold_write_lock(path, seconds):
+    """Starts a writer that keeps the database locked for ``seconds``; returns once it holds the lock."""
+    locked = threading.Event()
+
+    def hold():
+        conn = connect_state_db(path)
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("INSERT INTO tokens VALUES ('monad', 1, 'a', '{}', 'r', NULL, 0)")
+        locked.set()
+        time.sleep(seconds)
+        conn.commit()
+        conn.close()
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    locked.wait()
+    return thread
+
+
+def test_second_writer_waits_for_the_first(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    StateStore(path).close()
+    writer = _hold_write_lock(path, 0.3)
+
+    store = StateStore(path)
+    store.record_many("monad", [(2, OWNER, {"tx_count": 1}, "bafyref")])
+    writer.join()
+
+    assert set(store.last_updates("monad")) == {1, 2}
+    store.close()
+
+
+def test_second_writer_gives_up_after_the_busy_timeout(tmp_path, monkeypatch):
+    path = str(tmp_path / "state.sqlite3")
+    StateStore(path).close()
+    monkeypatch.setattr(state_store, "STATE_DB_BUSY_TIMEOUT", 0.05)
+    writer = _hold_write_lock(path, 0.5)
+
+    store = StateStore(path)
+    with pytest.raises(sqlite3.OperationalError, match="locked"):
+        store.record_many("monad", [(2, OWNER, {"tx_count": 1}, "bafyref")])
+    writer.join()
+    store.close()
@@ -0,0 +1,177 @@
+import pytest
+from web3 import Web3
+
+import stub_node
+from nft_updater import tx_scheduler
+from nft_updater.abi import COMPACT_CONTRACT_ABI, CONTRACT_ABI
+from nft_updater.pooled_provider import PooledProvider
+from nft_updater.rpc_pool import RpcPool
+from nft_updater.tx_scheduler import TxScheduler
+
+# Well-known development key; the stub node accepts any signature.
+PRIVATE_KEY = "0x" + "42" * 32
+CONTRACT = "0x" + "11" * 20
+TOKEN_IDS = list(range(1, 13))
+ROOT_HASHES = ["0x" + format(token_id, "064x") for token_id in TOKEN_IDS]
+
+
+@pytest.fixture
+def node():
+    server, chain = stub_node.serve(len(TOKEN_IDS))
+    yield server, chain
+    server.shutdown()
+
+
+@pytest.fixture
+def scheduler(node, monkeypatch):
+    """A scheduler against the stub node whose ``submitted`` list holds ``(tx_hash, nonce, token_ids)``."""
+    server, _ = node
+    # Four string-contract updates fit in one chunk.
+    monkeypatch.setattr(tx_scheduler, "TX_MAX_GAS", 300_000)
+    pool = RpcPool([(f"http://127.0.0.1:{server.server_port}", None)])
+    w3 = Web3(PooledProvider(pool))
+    account = w3.eth.account.from_key(PRIVATE_KEY)
+    contract = w3.eth.contract(address=Web3.to_checksum_address(CONTRACT), abi=CONTRACT_ABI)
+    submitted = []
+    scheduler = TxScheduler(
+        w3, contract, account, PRIVATE_KEY,
+        on_submit=lambda tx_hash, nonce, token_ids, refs: submitted.append((tx_hash.lower(), nonce, token_ids)),
+    )
+    scheduler.submitted = submitted
+    return scheduler
+
+
+def _broadcast(scheduler, chain):
+    """``(nonce, token_ids)`` of the submitted chunks the node actually received, in order."""
+    received = {tx_hash for tx_hash, _, _ in chain.sent}
+    broadcast = {}
+    for tx_hash, nonce, token_ids in scheduler.submitted:
+        # A chunk resent with the nonce of its failed send is the same signed transaction.
+        if tx_hash in received:
+            broadcast.setdefault(tx_hash, (nonce, token_ids))
+    return list(broadcast.values())
+
+
+def _fail_sends(scheduler, should_fail):
+    """Makes ``send_raw_transaction`` raise for the calls (numbered from 1) where ``should_fail(n)`` is true."""
+    send = scheduler.w3.eth.send_raw_transaction
+    calls = []
+
+    def flaky_send(raw_transaction):
+        calls.append(raw_transaction)
+        if should_fail(len(calls)):
+            raise ConnectionError("broadcast failed")
+        return send(raw_transaction)
+
+    scheduler.w3.eth.send_raw_transaction = flaky_send
+    return calls
+
+
+def test_chunks_fit_the_gas_budget_and_use_sequential_nonces(scheduler, node):
+    _, chain = node
+
+    committed = scheduler.commit(TOKEN_IDS, ROOT_HASHES)
+
+    assert committed == set(TOKEN_IDS)
+    broadcast = _broadcast(scheduler, chain)
+    assert len(broadcast) > 1
+    assert [nonce for nonce, _ in broadcast] == list(range(broadcast[0][0], broadcast[0][0] + len(broadcast)))
+    assert sorted(token_id for _, token_ids in broadcast for token_id in token_ids) == TOKEN_IDS
+    assert chain.root_hashes == dict(zip(TOKEN_IDS, ROOT_HASHES))
+
+
+def test_chunks_are_halved_until_their_estimate_succeeds(scheduler, node):
+    _, chain = node
+    estimate = scheduler.estimate_gas
+    estimated_sizes = []
+
+    def estimate_small_chunks(token_ids, root_hashes):
+        estimated_sizes.append(len(token_ids))
+        if len(token_ids) > 2:
+            raise ValueError("out of gas")
+        return estimate(token_ids, root_hashes)
+
+    scheduler.estimate_gas = estimate_small_chunks
+    committed = scheduler.commit(TOKEN_IDS, ROOT_HASHES)
+
+    assert committed == set(TOKEN_IDS)
+    assert all(len(token_ids) <= 2 for _, token_ids in _broadcast(scheduler, chain))
+    # The failed 12-token probe sized chunks at 6, which were then halved to 3 and to 2 or 1.
+    assert estimated_sizes[:2] == [12, 6]
+
+
+def test_failed_send_holds_back_later_chunks_for_the_next_round(scheduler, node):
+    _, chain = node
+    calls = _fail_sends(scheduler, lambda n: n == 2)
+
+    committed = scheduler.commit(TOKEN_IDS, ROOT_HASHES)
+
+    assert committed == set(TOKEN_IDS)
+    broadcast = _broadcast(scheduler, chain)
+    # The nonce of the failed chunk is reused, so the received transactions leave no gap.
+    first = broadcast[0][0]
+    assert [nonce for nonce, _ in broadcast] == list(range(first, first + len(broadcast)))
+    # Round one sent chunk 1 and stopped at chunk 2; round two resent chunk 2 onwards.
+    assert len(calls) == len(broadcast) + 1
+    failed_nonce, failed_token_ids = scheduler.submitted[1][1:]
+    assert failed_nonce == first + 1
+    assert broadcast[1] == (first + 1, failed_token_ids)
+
+
+def test_chunks_that_keep_failing_are_given_up_after_the_last_round(scheduler, node, monkeypatch):
+    _, chain = node
+    monkeypatch.setattr(tx_scheduler, "TX_MAX_ROUNDS", 2)
+    calls = _fail_sends(scheduler, lambda n: True)
+
+    assert scheduler.commit(TOKEN_IDS, ROOT_HASHES) == set()
+    # Every round stops at its first failed send.
+    assert len(calls) == 2
+    assert chain.sent == []
+
+
+def test_reverted_chunk_is_requeued(scheduler, node):
+    _, chain = node
+    receipt = chain.receipt
+    reverted = []
+
+    def revert_first(tx_hash):
+        result = receipt(tx_hash)
+        if result is not None and not reverted:
+            reverted.append(tx_hash)
+            result["status"] = "0x0"
+        return result
+
+    chain.receipt = revert_first
+    committed = scheduler.commit(TOKEN_IDS, ROOT_HASHES)
+
+    assert committed == set(TOKEN_IDS)
+    first_chunk = scheduler.submitted[0][2]
+    # The reverted chunk went out again in a later transaction.
+    assert sum(1 for _, token_ids in _broadcast(scheduler, chain) if token_ids == first_chunk) == 2
+
+
+def test_total_gas_budget_defers_the_remaining_chunks(scheduler, node):
+    _, chain = node
+    first_chunk_gas = scheduler._plan_chunks(list(zip(TOKEN_IDS, ROOT_HASHES)), 300_000)[0][1]
+
+    committed = scheduler.commit(TOKEN_IDS, ROOT_HASHES, max_total_gas=first_chunk_gas + 1)
+
+    assert len(chain.sent) == 1
+    assert committed == set(_broadcast(scheduler, chain)[0][1])
+    assert committed < set(TOKEN_IDS)
+
+
+def test_summary_counts_only_the_updates_that_could_be_encoded(scheduler, node, capsys):
+    _, chain = node
+    compact = TxScheduler(
+        scheduler.w3, scheduler.w3.eth.contract(address=scheduler.contract.address, abi=COMPACT_CONTRACT_ABI),
+        scheduler.account, PRIVATE_KEY, compact=True,
+    )
+
+    committed = compact.commit(TOKEN_IDS, ROOT_HASHES[:-1] + ["not-a-reference"])
+
+    assert committed == set(TOKEN_IDS[:-1])
+    assert len(chain.digests) == len(TOKEN_IDS) - 1
+    output = capsys.readouterr().out
+    assert f"Committed {len(TOKEN_IDS) - 1} of {len(TOKEN_IDS) - 1} updates." in output
+    assert "1 updates were skipped" in output
@@ -0,0 +1,9 @@
+module github.com/Arefgh72/WalletStatusNFT-0G/tools/zg_upload_helper
+
+go 1.21
+
+require github.com/0glabs/0g-storage-client v0.0.0
+
+// Built against the same 0g-storage-client checkout the workflows clone next
+// to this repository; `go mod tidy` resolves the rest of its dependencies.
+replace github.com/0glabs/0g-storage-client => ../../0g-storage-client
@@ -0,0 +1,156 @@
+// Command zg_upload_helper is a resident 0G Storage uploader for nft_updater.
+//
+// The zg_storage CLI dials the RPC endpoint and the indexer again for every
+// file it uploads. This helper connects once and then uploads files named on
+// stdin, one JSON object per line, answering on stdout:
+//
+//	-> {"id": 1, "file": "/abs/path/1.png"}
+//	<- {"id": 1, "event": "submitted"}
+//	<- {"id": 1, "root": "0x..."}            (or {"id": 1, "error": "..."})
+//
+// It prints {"event": "ready"} once connected, uploads one file at a time and
+// exits when stdin is closed. The signer key is read from ZG_HELPER_KEY so it
+// never appears in process listings. Logs go to stderr.
+//
+// Usage: zg_upload_helper serve --url <evm rpc> --indexer <indexer rpc>
+package main
+
+import (
+	"bufio"
+	"context"
+	"encoding/json"
+	"flag"
+	"fmt"
+	"os"
+	"strings"
+	"sync"
+	"sync/atomic"
+
+	"github.com/0glabs/0g-storage-client/common"
+	"github.com/0glabs/0g-storage-client/common/blockchain"
+	"github.com/0glabs/0g-storage-client/core"
+	"github.com/0glabs/0g-storage-client/indexer"
+	"github.com/0glabs/0g-storage-client/transfer"
+	"github.com/openweb3/web3go"
+	"github.com/sirupsen/logrus"
+)
+
+// Files larger than this would be split into several roots; NFT images and
+// metadata never come close.
+const fragmentSize = 4 * 1024 * 1024 * 1024
+
+type request struct {
+	ID   int64  `json:"id"`
+	File string `json:"file"`
+}
+
+type message struct {
+	ID    int64  `json:"id,omitempty"`
+	Event string `json:"event,omitempty"`
+	Root  string `json:"root,omitempty"`
+	Error string `json:"error,omitempty"`
+}
+
+var (
+	stdout   = json.NewEncoder(os.Stdout)
+	stdoutMu sync.Mutex
+	// ID of the request being uploaded, for the log hook.
+	current atomic.Int64
+)
+
+func emit(m message) {
+	stdoutMu.Lock()
+	defer stdoutMu.Unlock()
+	_ = stdout.Encode(m)
+}
+
+// submittedHook turns the client's "transaction sent" log line into a
+// "submitted" event, so the caller can release the signer's nonce lock while
+// the segments are still uploading.
+type submittedHook struct{}
+
+func (submittedHook) Levels() []logrus.Level { return logrus.AllLevels }
+
+func (submittedHook) Fire(entry *logrus.Entry) error {
+	if strings.Contains(strings.ToLower(entry.Message), "succeeded to send transaction") {
+		emit(message{ID: current.Load(), Event: "submitted"})
+	}
+	return nil
+}
+
+func main() {
+	if len(os.Args) < 2 || os.Args[1] != "serve" {
+		fmt.Fprintln(os.Stderr, "usage: zg_upload_helper serve --url URL --indexer URL")
+		os.Exit(2)
+	}
+	flags := flag.NewFlagSet("serve", flag.ExitOnError)
+	rpcURL := flags.String("url", "", "EVM RPC endpoint")
+	indexerURL := flags.String("indexer", "", "storage indexer endpoint")
+	_ = flags.Parse(os.Args[2:])
+	key := os.Getenv("ZG_HELPER_KEY")
+	if *rpcURL == "" || *indexerURL == "" || key == "" {
+		emit(message{Event: "fatal", Error: "--url, --indexer and ZG_HELPER_KEY are required"})
+		os.Exit(2)
+	}
+
+	logrus.SetOutput(os.Stderr)
+	logrus.AddHook(submittedHook{})
+
+	ctx := context.Background()
+	w3client := blockchain.MustNewWeb3(*rpcURL, key)
+	defer w3client.Close()
+	indexerClient, err := indexer.NewClient(*indexerURL, indexer.IndexerClientOption{
+		LogOption: common.LogOption{Logger: logrus.StandardLogger()},
+	})
+	if err != nil {
+		emit(message{Event: "fatal", Error: err.Error()})
+		os.Exit(1)
+	}
+	defer indexerClient.Close()
+
+	// The same defaults as `zg_storage upload`.
+	opt := transfer.UploadOption{
+		FinalityRequired: transfer.TransactionPacked,
+		ExpectedReplica:  1,
+		Method:           "min",
+	}
+	emit(message{Event: "ready"})
+
+	scanner := bufio.NewScanner(os.Stdin)
+	for scanner.Scan() {
+		var req request
+		if err := json.Unmarshal(scanner.Bytes(), &req); err != nil {
+			emit(message{Event: "invalid", Error: err.Error()})
+			continue
+		}
+		current.Store(req.ID)
+		root, err := upload(ctx, w3client, indexerClient, req.File, opt)
+		if err != nil {
+			emit(message{ID: req.ID, Error: err.Error()})
+			continue
+		}
+		emit(message{ID: req.ID, Root: root})
+	}
+}
+
+// upload mirrors the CLI's upload command, reusing the connected clients.
+func upload(ctx context.Context, w3client *web3go.Client, indexerClient *indexer.Client, path string, opt transfer.UploadOption) (string, error) {
+	file, err := core.Open(path)
+	if err != nil {
+		return "", err
+	}
+	defer file.Close()
+
+	uploader, err := indexerClient.NewUploaderFromIndexerNodes(ctx, file.NumSegments(), w3client, opt.ExpectedReplica, nil, opt.Method)
+	if err != nil {
+		return "", err
+	}
+	_, roots, err := uploader.SplitableUpload(ctx, file, fragmentSize, opt)
+	if err != nil {
+		return "", err
+	}
+	if len(roots) == 0 {
+		return "", fmt.Errorf("upload returned no root")
+	}
+	return roots[0].Hex(), nil
+}
@@ -0,0 +1,61 @@
+import argparse
+import os
+
+# --- Load Environment Variables ---
+# Loaded before the engine import because the engine reads its settings at import time.
+from dotenv import load_dotenv
+load_dotenv()
+
+from nft_updater.chains import CHAINS
+from nft_updater.engine import run_chains
+from nft_updater.follower import follow_chains
+from nft_updater.shards import parse_shard
+
+# --- Configuration ---
+# Comma-separated chain keys from nft_updater/chains.py; defaults to every chain
+# whose contract address is configured in the environment.
+NFT_CHAINS = os.getenv("NFT_CHAINS", "")
+
+def main():
+    parser = argparse.ArgumentParser(description="Update Wallet Status NFTs on several chains in one process.")
+    parser.add_argument("--chains", default=NFT_CHAINS,
+                        help=f"comma-separated chains to update ({', '.join(CHAINS)})")
+    parser.add_argument("--shard", default=os.getenv("NFT_SHARD", ""),
+                        help="render and upload only shard i of N (e.g. 2/4) and write a manifest instead of committing")
+    parser.add_argument("--merge", action="store_true",
+                        help="validate the shard manifests and commit them on-chain from one signer")
+    parser.add_argument("--manifest-dir", default=None,
+                        help="where shard manifests are written and merged from (default: SHARD_MANIFEST_DIR)")
+    parser.add_argument("--follow", action="store_true",
+                        help="keep running: follow new blocks and update the tokens of holders that sent a transaction")
+    args = parser.parse_args()
+
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+    if shard and args.merge:
+        parser.error("--shard and --merge cannot be combined")
+    if args.follow and (shard or args.merge):
+        parser.error("--follow cannot be combined with --shard or --merge")
+
+    if args.chains:
+        chain_names = [name.strip() for name in args.chains.split(",") if name.strip()]
+    else:
+        chain_names = [name for name, chain in CHAINS.items() if chain.contract_address]
+    unknown = [name for name in chain_names if name not in CHAINS]
+    if unknown:
+        parser.error(f"unknown chain(s): {', '.join(unknown)}")
+    if not chain_names:
+        print("FATAL: No chains selected and no contract address environment variables are set.")
+        return
+
+    if args.follow:
+        follow_chains(chain_names)
+        return
+    run_chains(chain_names, shard=shard, manifest_dir=args.manifest_dir, merge=args.merge)
+
+if __name__ == "__main__":
+    main()